@@ -0,0 +1,90 @@
+"""
+Условные GET-запросы: ETag, Last-Modified, ответ 304 Not Modified
+
+ETag задачи строится из ее id и версии строки (столбец 'version'),
+ETag списка - из версии таблицы ('table_versions') и параметров страницы.
+Если клиент прислал совпадающий If-None-Match, тело ответа не формируется.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+from fastapi import Response, status
+
+
+def task_etag(row: Mapping[str, Any]) -> str:
+    """
+    Сильный ETag задачи: меняется при каждом изменении ее данных.
+    """
+    return f'"{row["id"]}.{row["version"]}"'
+
+
+def list_etag(version: int, *params: Any) -> str:
+    """
+    Сильный ETag страницы списка: версия таблицы и параметры, от которых зависит страница
+    (фильтры, ключ начала страницы, размер).
+    """
+    digest = hashlib.sha1(repr(params).encode()).hexdigest()[:16]
+    return f'"tasks.{version}.{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    """
+    Дата в формате заголовка Last-Modified. Дата без часового пояса считается UTC.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def validators(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    """
+    Заголовки ответа для последующих условных запросов.
+    """
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Для If-None-Match используется слабое сравнение: префикс W/ не учитывается
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+def not_modified(request_headers: Mapping[str, str], etag: str,
+                 last_modified: Optional[datetime] = None) -> bool:
+    """
+    Проверяет, есть ли у клиента актуальная копия ответа.
+    If-Modified-Since учитывается, только если нет If-None-Match.
+    """
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request_headers.get('if-modified-since')
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # Last-Modified передается с точностью до секунды
+    return last_modified.replace(microsecond=0) <= since
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    """
+    Ответ 304 без тела, с теми же валидаторами, что и у полного ответа.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
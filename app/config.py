@@ -1,13 +1,21 @@
 """Файл настроек приложения"""
 import os
 from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 @dataclass
 class LoggerConfig:
     """Конфигурация логгера"""
-    log_level: str = 'DEBUG'
-    db_log_level: str = 'DEBUG'
+    log_level: str = 'INFO'
+    db_log_level: str = 'INFO'
+    format: str = 'text'  # 'text' - строки для чтения, 'json' - одна json-строка на запись
+    # Запись в поток вывода в отдельном потоке (QueueHandler/QueueListener),
+    # поток запроса только кладет запись в очередь и не ждет медленного вывода
+    # (см. benchmarks/bench_logging.py)
+    queue: bool = True
+    # Доля записей уровня DEBUG, которые пишутся в журнал (1.0 - все)
+    debug_sample_rate: float = 1.0
 
 
 @dataclass
@@ -17,13 +25,150 @@ class DatabaseConfig:
     user_name: str = "user"
     password: str = "password"
     db_name: str = "task_hub"
+    # Пул соединений
+    pool_min_size: int = 1
+    pool_max_size: int = 10
+    pool_timeout: float = 5.0  # ожидание свободного соединения, сек
+    # Проверять соединение (ping) при каждой выдаче из пула. По умолчанию свободные
+    # соединения проверяются в фоне, раз в 'HealthConfig.check_interval'
+    pool_health_check: bool = False
+    pool_idle_timeout: float = 300.0  # закрывать соединения, простаивающие дольше, сек
+    # Лимит соединений всех рабочих процессов вместе (0 - без общего лимита),
+    # делится между 'ServerConfig.workers', но не больше 'pool_max_size' на процесс
+    max_connections: int = 0
+    # Подключение при запуске: попытки с экспоненциальной задержкой и прогрев пула
+    startup_attempts: int = 10
+    startup_backoff: float = 0.5  # задержка перед второй попыткой, сек, далее удваивается
+    startup_backoff_max: float = 10.0
+    warmup_connections: int = 2  # соединений, открываемых до готовности (не больше пула)
+    # Серверные подготовленные выражения, кэшируются для каждого соединения
+    prepared_statements: bool = True
+    statement_cache_size: int = 32
+    # Выполнение запросов: 'threadpool' - в пуле потоков, 'inline' - в цикле событий
+    executor: str = 'threadpool'
+    executor_workers: int = 10
+    # Реплики для чтения: 'host' или 'host:port', запись - всегда в 'host'.
+    # Пусто - все запросы к 'host'
+    replicas: List[str] = field(default_factory=list)
+    replica_selection: str = 'round_robin'  # 'round_robin' или 'least_loaded'
+    # Чтения клиента идут в 'host' столько секунд после его изменяющего запроса (cookie)
+    read_your_writes: float = 5.0
+
+
+@dataclass
+class StorageConfig:
+    """Конфигурация хранилища задач (app.services.repository)"""
+    # 'mysql' - база данных MySQL ('db'), 'memory' - в памяти процесса (один рабочий процесс),
+    # 'sqlite' - файл SQLite 'sqlite_path' (установка на одном узле)
+    backend: str = 'mysql'
+    sqlite_path: str = 'task_hub.db'
+    sqlite_busy_timeout: float = 5.0  # ожидание блокировки записи другим процессом, сек
+
+
+@dataclass
+class CacheConfig:
+    """Конфигурация кэша GET /tasks/{task_id}"""
+    backend: str = 'memory'  # 'memory' - в памяти процесса, 'redis', 'none' - без кэша
+    max_size: int = 10000
+    ttl: float = 60.0  # время жизни записи, сек
+    redis_url: str = 'redis://localhost:6379/0'
+    redis_prefix: str = 'task_hub:'
+
+
+@dataclass
+class SearchConfig:
+    """Конфигурация поиска GET /tasks/search"""
+    # 'mysql' - индекс FULLTEXT, 'memory' - индекс в памяти процесса (без FULLTEXT)
+    backend: str = 'memory'
+
+
+@dataclass
+class HealthConfig:
+    """Конфигурация проверок состояния (/health/live, /health/ready)"""
+    check_interval: float = 15.0  # фоновая проверка свободных соединений пула, сек
+    error_window: float = 60.0  # окно, за которое считается доля ошибок, сек
+    max_error_rate: float = 0.5  # при большей доле ошибок экземпляр не готов
+    min_samples: int = 10  # доля ошибок учитывается, если обращений в окне не меньше
+    max_saturation: float = 1.0  # доля занятых соединений пула, при которой экземпляр не готов
+    # Результат фоновой проверки устаревает через столько интервалов проверки
+    stale_checks: int = 3
+
+
+@dataclass
+class ProfilingConfig:
+    """Конфигурация профилирования запросов и журнала медленных запросов"""
+    enabled: bool = False  # профилировать все запросы
+    # Профилировать отдельный запрос: заголовок со значением 'admin_token' (пустой - запрещено)
+    header: str = 'X-Profile'
+    admin_token: str = field(default_factory=lambda: os.environ.get('PROFILE_TOKEN', ''))
+    # Доля профилируемых запросов, для которых сохраняется профиль функций
+    sample_rate: float = 0.0
+    profiler: str = 'cprofile'  # 'cprofile' или 'pyinstrument' (если установлен)
+    output_dir: str = ''  # каталог для профилей, '' - первые строки профиля в журнал
+    # Запросы к базе данных дольше порога пишутся в журнал 'slow_query', 0 - не писать
+    slow_query_ms: float = 200.0
+
+
+@dataclass
+class ApiConfig:
+    """Конфигурация API"""
+    page_size: int = 100  # размер страницы GET /tasks/ по умолчанию
+    max_page_size: int = 1000
+    export_batch_size: int = 1000  # строк за одно чтение при выгрузке GET /tasks/export
+    bulk_max_items: int = 10000  # максимум задач в одном запросе POST /tasks/bulk
+    bulk_chunk_size: int = 500  # строк в одном INSERT и одной транзакции
+
+
+@dataclass
+class BatchingConfig:
+    """Объединение POST /tasks/ в многострочные INSERT (app.services.batching)"""
+    enabled: bool = False
+    max_rows: int = 100  # задач в одном INSERT и одной транзакции
+    # Ожидание следующих задач после первой в пачке, мс. Пока записывается пачка,
+    # следующая набирается без ожидания
+    max_delay_ms: float = 2.0
+    max_queue: int = 10000  # задач в очереди, при переполнении - ответ 503
+
+
+def _cpu_count() -> int:
+    """Количество процессоров, доступных процессу (с учетом ограничений контейнера)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _default_workers(fallback: Optional[int] = None) -> int:
+    """WEB_CONCURRENCY из окружения (как у gunicorn/uvicorn), иначе 'fallback'
+    или количество процессоров"""
+    return int(os.environ.get('WEB_CONCURRENCY') or fallback or _cpu_count())
+
+
+@dataclass
+class ServerConfig:
+    """Конфигурация запуска (run.py)"""
+    host: str = '0.0.0.0'
+    port: int = 8000
+    workers: int = field(default_factory=_default_workers)
+    # Время на завершение текущих запросов при остановке и перезапуске процессов, сек
+    graceful_timeout: float = 30.0
+    # 'auto' - gunicorn, если установлен, иначе uvicorn; 'gunicorn'; 'uvicorn'
+    manager: str = 'auto'
 
 
 @dataclass
 class BaseConfig:
     """Базовая конфигурация"""
     db: DatabaseConfig = field(default_factory=DatabaseConfig)
+    storage: StorageConfig = field(default_factory=StorageConfig)
     log: LoggerConfig = field(default_factory=LoggerConfig)
+    api: ApiConfig = field(default_factory=ApiConfig)
+    batching: BatchingConfig = field(default_factory=BatchingConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    search: SearchConfig = field(default_factory=SearchConfig)
+    health: HealthConfig = field(default_factory=HealthConfig)
+    profiling: ProfilingConfig = field(default_factory=ProfilingConfig)
+    # Для разработки один процесс: кэш и поисковый индекс в памяти процесса согласованы
+    server: ServerConfig = field(default_factory=lambda: ServerConfig(workers=_default_workers(1)))
     config_type: str = 'dev'
 
 
@@ -32,10 +177,15 @@ class ProdConfig(BaseConfig):
     """Продакшн конфигурация"""
     db: DatabaseConfig = field(default_factory=lambda: DatabaseConfig(
         host="mysql",
-        db_name="task_hub"))
+        db_name="task_hub",
+        # По умолчанию MySQL принимает 151 соединение, оставляем запас для администрирования
+        max_connections=120))
     log: LoggerConfig = field(default_factory=lambda: LoggerConfig(
         log_level='ERROR',
-        db_log_level='ERROR'))
+        db_log_level='ERROR',
+        format='json'))
+    search: SearchConfig = field(default_factory=lambda: SearchConfig(backend='mysql'))
+    server: ServerConfig = field(default_factory=ServerConfig)
     config_type: str = 'prod'
 
 
@@ -2,31 +2,278 @@
 Модуль установки соединения с базой данных
 """
 
-from typing import Generator
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
 
 import mysql
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from mysql.connector import OperationalError
 
 from app.config import config
+from app.health import ErrorWindow
 from app.logger import db_log
+from app.metrics import POOL_WAIT
+from app.profiling import record
+from app.pool import ConnectionPool, PoolStats, PoolTimeoutError
+from app.statements import PreparedCursor, StatementCache, StatementStats
+
+
+# Функции, которые нужно вызвать после фиксации транзакции запроса: id(курсора) -> функции
+_commit_callbacks: Dict[int, List[Callable[[], None]]] = {}
+
+
+def on_commit(cursor, callback: Callable[[], None]) -> None:
+    """
+    Регистрирует функцию, которая будет вызвана после фиксации транзакции,
+    в которой работает курсор из 'DB.write_cursor'.
+    Если курсор получен не из 'DB.write_cursor', функция вызывается сразу.
+    """
+    callbacks = _commit_callbacks.get(id(cursor))
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
+
+
+# Экземпляры DB, пулы которых нужно сбросить в дочернем процессе после fork
+_instances: 'weakref.WeakSet[DB]' = weakref.WeakSet()
+# Пулы, унаследованные от родительского процесса (см. DB._forget_pool)
+_inherited: List[Any] = []
+
+
+def _after_fork_in_child() -> None:
+    for instance in list(_instances):
+        instance._after_fork()  # pylint: disable=protected-access
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+@contextmanager
+def commit_callbacks(cursor) -> Generator[List[Callable[[], None]], None, None]:
+    """
+    Собирает функции, зарегистрированные 'on_commit' для курсора, на время блока 'with'.
+    После фиксации транзакции их нужно вызвать через 'run_commit_callbacks'.
+    """
+    callbacks: List[Callable[[], None]] = []
+    _commit_callbacks[id(cursor)] = callbacks
+    try:
+        yield callbacks
+    finally:
+        _commit_callbacks.pop(id(cursor), None)
+
+
+def run_commit_callbacks(callbacks: List[Callable[[], None]]) -> None:
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:  # pylint: disable=broad-except
+            db_log.error('Ошибка в обработчике фиксации транзакции: %s', e)
 
 
 class DB:
     """
-    Класс для взаимодействия с базой данных
+    Класс для взаимодействия с базой данных.
+    Соединения выдаются из пула, каждый запрос получает собственное соединение.
+
+    Пул создается при первом обращении, а не при импорте: при запуске нескольких
+    рабочих процессов (run.py) каждый процесс открывает собственные соединения.
+    Если процесс создан через fork после создания пула, он создает новый пул,
+    а унаследованные соединения не использует и не закрывает.
     """
     initialized = False
 
-    def __init__(self):
+    def __init__(self, host: Optional[str] = None):
         """
-        Инициализирует класс DB и устанавливает соединение с базой данных,
-        если оно еще не было инициализировано.
+        Инициализирует класс DB, если он еще не был инициализирован.
+        Соединения с базой данных не открываются до первого запроса.
+
+        Args:
+            host (Optional[str]): Адрес реплики для чтения ('host' или 'host:port'),
+                по умолчанию - основной сервер 'config.db.host'. Экземпляр для реплики
+                создается всегда.
         """
-        if not DB.initialized:
+        if host is not None or not DB.initialized:
             db_log.debug('Class DB init process...')
-            self.db = self.connect()
-            DB.initialized = True
+            self.host = host
+            # Кэши подготовленных выражений: id(соединения) -> StatementCache
+            self._statements: Dict[int, StatementCache] = {}
+            self._pool: Optional[ConnectionPool] = None
+            self._pid: Optional[int] = None
+            self._pool_lock = threading.Lock()
+            # Пул прогрет при запуске (DB.start), процесс готов принимать запросы
+            self.ready = False
+            self.startup_error: Optional[str] = None
+            # Результат последней фоновой проверки соединений (DB.check) и доля ошибок
+            self.reachable: Optional[bool] = None
+            self.checked_at: Optional[float] = None
+            self.errors = ErrorWindow(config.health.error_window)
+            _instances.add(self)
+            if host is None:
+                DB.initialized = True
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """
+        Пул соединений текущего процесса.
+        """
+        if self._pool is None or self._pid != os.getpid():
+            with self._pool_lock:
+                if self._pool is None or self._pid != os.getpid():
+                    self._forget_pool()
+                    self._pool = self.create_pool()
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _forget_pool(self) -> None:
+        """
+        Отказывается от пула, созданного в родительском процессе.
+        Соединения нельзя закрыть или отдать сборщику мусора: mysql-connector при этом
+        закрывает сокет, общий с родительским процессом, и рвет его соединение.
+        """
+        if self._pool is not None:
+            _inherited.append(self._pool)
+            db_log.debug('Pool inherited from process %s is dropped', self._pid)
+        self._pool = None
+        self._statements = {}
+
+    def _after_fork(self) -> None:
+        # Блокировка могла быть захвачена другим потоком родительского процесса
+        self._pool_lock = threading.Lock()
+        self._forget_pool()
+        self.ready = False
+        self.reachable = None
+        self.checked_at = None
+        self.errors = ErrorWindow(config.health.error_window)
+
+    @staticmethod
+    def pool_size() -> Tuple[int, int]:
+        """
+        Размер пула одного рабочего процесса (min, max).
+        Если задан 'config.db.max_connections', соединения делятся между
+        'config.server.workers' процессами, иначе у каждого процесса до 'pool_max_size'.
+        """
+        max_size = config.db.pool_max_size
+        if config.db.max_connections:
+            max_size = min(max_size, max(1, config.db.max_connections // config.server.workers))
+        return min(config.db.pool_min_size, max_size), max_size
+
+    def create_pool(self) -> ConnectionPool:
+        """
+        Создает пул соединений по настройкам из 'config.db'.
+        """
+        min_size, max_size = self.pool_size()
+        pool = ConnectionPool(
+            factory=self.connect,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=config.db.pool_timeout,
+            health_check=config.db.pool_health_check,
+            idle_timeout=config.db.pool_idle_timeout,
+            validate=self.validate,
+            on_close=self._drop_statements,
+        )
+        db_log.debug('Pool created: %s', pool.stats())
+        return pool
+
+    def warm_up(self) -> int:
+        """
+        Создает пул и открывает в нем 'config.db.warmup_connections' соединений.
+
+        Returns:
+            int: Количество открытых соединений.
+        """
+        min_size, _ = self.pool_size()
+        return self.pool.warm_up(max(min_size, config.db.warmup_connections))
+
+    async def start(self) -> bool:
+        """
+        Подключается к базе данных при запуске приложения (lifespan).
+        Неудачные попытки повторяются с экспоненциально растущей задержкой,
+        не больше 'config.db.startup_attempts' раз. Соединения открываются в пуле потоков,
+        цикл событий не блокируется.
+
+        Returns:
+            bool: True, если пул прогрет ('self.ready'), False - попытки исчерпаны.
+        """
+        attempts = max(1, config.db.startup_attempts)
+        delay = config.db.startup_backoff
+        for attempt in range(1, attempts + 1):
+            try:
+                created = await run_in_threadpool(self.warm_up)
+            except Exception as e:  # pylint: disable=broad-except
+                self.startup_error = str(getattr(e, 'detail', e))
+                db_log.warning('Попытка подключения %s из %s не удалась: %s',
+                               attempt, attempts, self.startup_error)
+                if attempt == attempts:
+                    break
+                # Случайная доля задержки: рабочие процессы не переподключаются одновременно
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                delay = min(delay * 2, config.db.startup_backoff_max)
+            else:
+                self.ready = True
+                self.startup_error = None
+                db_log.info('Пул соединений готов, открыто соединений: %s', created)
+                return True
+
+        db_log.critical('Не удалось подключиться к базе данных за %s попыток', attempts)
+        return False
+
+    def check(self) -> Optional[bool]:
+        """
+        Фоновая проверка: проверяет свободные соединения пула, закрывает неисправные
+        и снова открывает соединения до 'config.db.warmup_connections'.
+        Если все соединения заняты запросами, доступность не меняется.
+
+        Returns:
+            Optional[bool]: Доступна ли база данных ('self.reachable').
+        """
+        try:
+            checked, broken = self.pool.check_idle()
+            created = self.warm_up()
+        except Exception as e:  # pylint: disable=broad-except
+            db_log.error('Фоновая проверка соединений: база данных недоступна: %s', e)
+            self.errors.record(False)
+            self.reachable = False
+        else:
+            if broken:
+                db_log.warning('Фоновая проверка: закрыто неисправных соединений %s из %s',
+                               broken, checked)
+            if checked > broken or created:
+                self.reachable = True
+                # Подключение восстановлено после неудачного запуска
+                self.ready = True
+        self.checked_at = time.monotonic()
+        return self.reachable
+
+    async def monitor(self) -> None:
+        """
+        Периодически выполняет 'check' в пуле потоков, пока задача не будет отменена.
+        """
+        interval = config.health.check_interval
+        if interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            await run_in_threadpool(self.check)
+
+    def pool_stats(self) -> Optional[PoolStats]:
+        """
+        Состояние пула текущего процесса, None - пул еще не создан.
+        В отличие от 'stats' не создает пул и не открывает соединений.
+        """
+        pool = self._pool
+        if pool is None or self._pid != os.getpid():
+            return None
+        return pool.stats()
 
     def connect(self):
         """
@@ -38,12 +285,16 @@ class DB:
         Raises:
             HTTPException: Если не удалось установить соединение с базой данных.
         """
+        host, _, port = (self.host or config.db.host).partition(':')
+        # Порт по умолчанию выбирает драйвер
+        address: Dict[str, Any] = {'host': host, 'port': int(port)} if port else {'host': host}
         try:
             db = mysql.connector.connect(
-                host=config.db.host,
+                **address,
                 user=config.db.user_name,
                 password=config.db.password,
                 database=config.db.db_name,
+                autocommit=True,
             )
             db_log.debug('DB created: %s', db)
             return db
@@ -54,60 +305,233 @@ class DB:
                                 detail='Не удалось установить соединение с базой данных'
                                 ) from e
 
-    def is_connected(self):
+    @staticmethod
+    def is_connected(conn) -> bool:
         """
         Проверяет, активно ли соединение с базой данных.
 
         Returns:
             bool: True, если соединение активно, False - нет.
         """
-        status = self.db.is_connected()
+        status = conn.is_connected()
         db_log.debug('DB is connected: %s', status)
         return status
 
-    def reconnect_(self, attempts):
+    @staticmethod
+    def reconnect_(conn, attempts):
         """
         Пере-подключается к базе данных.
 
         Args:
+            conn: Соединение с базой данных.
             attempts (int): Количество попыток переподключения.
         """
-        self.db.reconnect(attempts=attempts)
+        conn.reconnect(attempts=attempts)
         db_log.debug('DB reconnect...')
 
-    def get_cursor(self) -> Generator:
+    def validate(self, conn) -> bool:
+        """
+        Проверяет соединение (в фоновой проверке или при выдаче из пула, если включено
+        'config.db.pool_health_check'), при необходимости переподключается.
+        Если соединение восстановить не удалось, пул заменит его новым.
         """
-        Возвращает курсор базы данных.
+        if self.is_connected(conn):
+            return True
+        self.reconnect_(conn, attempts=3)
+        return self.is_connected(conn)
+
+    def acquire(self):
+        """
+        Получает соединение из пула.
+
+        Raises:
+            HTTPException: Нет свободных соединений или не удалось установить новое.
+        """
+        start = time.perf_counter()
+        try:
+            conn = self.pool.acquire()
+            waited = time.perf_counter() - start
+            POOL_WAIT.observe(waited)
+            record('pool_wait', waited)
+            return conn
+        except PoolTimeoutError as e:
+            POOL_WAIT.observe(time.perf_counter() - start)
+            self.errors.record(False)
+            db_log.error('Нет свободных соединений с базой данных: %s', self.pool.stats())
+            raise HTTPException(503, 'Нет свободных соединений с базой данных') from e
+        except Exception:
+            self.errors.record(False)
+            raise
+
+    def statements(self, conn) -> StatementCache:
+        """
+        Возвращает кэш подготовленных выражений соединения.
+        """
+        cache = self._statements.get(id(conn))
+        if cache is None:
+            cache = StatementCache(conn, max_size=config.db.statement_cache_size)
+            self._statements[id(conn)] = cache
+        return cache
+
+    def _drop_statements(self, conn) -> None:
+        cache = self._statements.pop(id(conn), None)
+        if cache is not None:
+            cache.close()
+
+    def statement_stats(self) -> StatementStats:
+        """
+        Суммарные счетчики кэшей подготовленных выражений всех соединений.
+        """
+        total = StatementStats()
+        for cache in list(self._statements.values()):
+            stats = cache.stats()
+            total.hits += stats.hits
+            total.misses += stats.misses
+            total.evictions += stats.evictions
+            total.size += stats.size
+        return total
+
+    def stats(self) -> PoolStats:
+        """
+        Возвращает состояние пула соединений (занятые, свободные, время ожидания).
+        """
+        return self.pool.stats()
+
+    def close(self) -> None:
+        """
+        Закрывает пул соединений текущего процесса.
+        """
+        self.ready = False
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.close()
+
+    def release(self, conn) -> None:
+        """
+        Возвращает соединение в пул в исходном состоянии: без открытой транзакции
+        и непрочитанных строк. Если привести соединение в порядок не удалось
+        (например, осталась непрочитанная выгрузка), оно закрывается.
+        """
+        # Соединение отработало запрос: обращение к базе данных успешно
+        self.errors.record(True)
+        try:
+            if conn.unread_result:
+                raise OperationalError('Unread result found')
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception as e:  # pylint: disable=broad-except
+            db_log.debug('Соединение не возвращается в пул: %s', e)
+            self.pool.discard(conn)
+        else:
+            self.pool.release(conn)
+
+    def _cursor(self, conn):
+        if config.db.prepared_statements:
+            return PreparedCursor(self.statements(conn))
+        return conn.cursor()
+
+    def _lost(self, conn, error: Exception) -> HTTPException:
+        """
+        Закрывает неисправное соединение и возвращает исключение для ответа 500.
+        """
+        db_log.debug('Не удалось установить соединение с базой данных: %s', error)
+        self.errors.record(False)
+        self.pool.discard(conn)
+        return HTTPException(status_code=500,
+                             detail='Не удалось установить соединение с базой данных')
+
+    @contextmanager
+    def connection(self) -> Generator:
+        """
+        Выдает соединение из пула на время блока 'with'.
+        Соединение работает в режиме autocommit, транзакциями управляет вызывающий код.
+        Незафиксированная транзакция откатывается при возврате в пул.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def get_connection(self) -> Generator:
+        """
+        Возвращает соединение из пула на время запроса (зависимость FastAPI).
+        Используется запросами, которые сами управляют транзакциями.
 
         Yields:
-            mysql.connector.cursor: Курсор базы данных.
+            Соединение с базой данных.
+        """
+        with self.connection() as conn:
+            yield conn
+
+    def read_cursor(self) -> Generator:
+        """
+        Возвращает курсор для запросов только на чтение (зависимость FastAPI).
+        Соединение работает в режиме autocommit: каждый запрос читает актуальный снимок данных,
+        транзакция не открывается и не фиксируется.
+
+        Yields:
+            PreparedCursor или mysql.connector.cursor: Курсор базы данных.
 
         Raises:
-            HTTPException:
-            Нне удалось установить соединение с базой данных,даже после переподключения.
+            HTTPException: Не удалось установить соединение с базой данных.
         """
-        if not self.is_connected():
-            self.reconnect_(attempts=3)
+        conn = self.acquire()
+        try:
+            cursor = self._cursor(conn)
+            yield cursor
+            cursor.close()
+
+        except OperationalError as e:
+            raise self._lost(conn, e) from e
+
+        except BaseException:
+            self.release(conn)
+            raise
 
-            if not self.is_connected():
-                db_log.error(
-                    'Не удалось установить соединение с базой данных, даже после переподключения')
-                raise HTTPException(500, 'Не удалось установить соединение с базой данных')
+        self.release(conn)
 
+    def write_cursor(self) -> Generator:
+        """
+        Возвращает курсор для изменяющих запросов (зависимость FastAPI).
+        Запрос выполняется в транзакции: при успешном завершении она фиксируется
+        и вызываются функции из 'on_commit', при исключении (в том числе HTTPException) -
+        откатывается.
+        Если включены подготовленные выражения ('config.db.prepared_statements'),
+        выдается PreparedCursor, использующий кэш выражений соединения.
+
+        Yields:
+            PreparedCursor или mysql.connector.cursor: Курсор базы данных.
+
+        Raises:
+            HTTPException: Не удалось установить соединение с базой данных.
+        """
+        conn = self.acquire()
+        cursor = None
+        callbacks: List[Callable[[], None]] = []
         try:
-            cursor = self.db.cursor()
+            conn.start_transaction()
+            cursor = self._cursor(conn)
             db_log.debug('Cursor received: %s', cursor)
+            _commit_callbacks[id(cursor)] = callbacks
             yield cursor
+            cursor.close()
+            # Сохраняем изменения
+            conn.commit()
+            db_log.debug('Database commit...')
 
         except OperationalError as e:
-            db_log.debug('Не удалось установить соединение с базой данных: %s', e)
-            raise HTTPException(status_code=500,
-                                detail='Не удалось установить соединение с базой данных'
-                                ) from e
+            raise self._lost(conn, e) from e
+
+        except BaseException:
+            db_log.debug('Database rollback...')
+            self.release(conn)
+            raise
 
         finally:
-            # Сохраняем изменения, закрываем курсор
-            self.db.commit()
-            db_log.debug('Database commit...')
-            result = cursor.close()
-            db_log.debug('Cursor closed: %s', result)
+            _commit_callbacks.pop(id(cursor), None)
+
+        self.release(conn)
+        run_commit_callbacks(callbacks)
+
+    # Прежнее имя зависимости: изменяющий запрос в транзакции
+    get_cursor = write_cursor
@@ -0,0 +1,43 @@
+"""
+Потоковая выгрузка задач в форматах NDJSON и JSON
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List
+
+from app.responses import encode
+
+NDJSON = 'ndjson'
+JSON = 'json'
+
+MEDIA_TYPES = {
+    NDJSON: 'application/x-ndjson',
+    JSON: 'application/json',
+}
+
+
+def dumps(value: Any) -> str:
+    """
+    Компактно сериализует значение в json.
+    """
+    return encode(value).decode()
+
+
+def encode_batches(batches: Iterable[List[Dict[str, Any]]], fmt: str) -> Iterator[str]:
+    """
+    Преобразует пачки записей в части ответа.
+    Одна пачка - одна часть, поэтому в памяти находится не больше одной пачки.
+
+    Формат 'ndjson' - одна задача в строке,
+    'json' - объект {"data": [...]}, как у GET /tasks/.
+    """
+    if fmt == NDJSON:
+        for batch in batches:
+            yield ''.join(dumps(row) + '\n' for row in batch)
+        return
+
+    yield '{"data":['
+    separator = ''
+    for batch in batches:
+        yield separator + ','.join(dumps(row) for row in batch)
+        separator = ','
+    yield ']}'
@@ -0,0 +1,114 @@
+"""
+Состояние соединения с базой данных для проверок /health
+
+Проверки не выполняют запросов к базе данных: они читают результат фоновой проверки
+соединений пула ('DB.monitor'), состояние пула и долю ошибок обращений
+к базе данных за последнее время.
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional
+
+from app.config import HealthConfig
+from app.pool import PoolStats
+
+
+@dataclass
+class ErrorRate:
+    """Обращения к базе данных за окно"""
+    window: float
+    total: int
+    errors: int
+
+    @property
+    def rate(self) -> float:
+        return self.errors / self.total if self.total else 0.0
+
+
+class ErrorWindow:
+    """
+    Потокобезопасный счетчик обращений и ошибок в скользящем окне 'window' секунд.
+    Обращения группируются по секундам, поэтому запись - O(1) и не зависит от нагрузки.
+    """
+
+    def __init__(self, window: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        # [секунда, обращений, ошибок], от старых к новым
+        self._buckets: Deque[List[int]] = deque()
+
+    def _expire(self, now: int) -> None:
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+    def record(self, ok: bool) -> None:
+        """
+        Учитывает обращение к базе данных: успешное или завершившееся ошибкой.
+        """
+        now = int(self.clock())
+        with self._lock:
+            if not self._buckets or self._buckets[-1][0] != now:
+                self._expire(now)
+                self._buckets.append([now, 0, 0])
+            bucket = self._buckets[-1]
+            bucket[1] += 1
+            if not ok:
+                bucket[2] += 1
+
+    def stats(self) -> ErrorRate:
+        """
+        Возвращает количество обращений и ошибок за окно.
+        """
+        with self._lock:
+            self._expire(int(self.clock()))
+            total = sum(bucket[1] for bucket in self._buckets)
+            errors = sum(bucket[2] for bucket in self._buckets)
+        return ErrorRate(window=self.window, total=total, errors=errors)
+
+
+def saturation(stats: PoolStats) -> float:
+    """
+    Доля занятых соединений от максимального размера пула.
+    """
+    return stats.in_use / stats.max_size if stats.max_size else 0.0
+
+
+def readiness_problems(started: bool,
+                       reachable: Optional[bool],
+                       checked_ago: Optional[float],
+                       pool: Optional[PoolStats],
+                       errors: ErrorRate,
+                       health_config: HealthConfig) -> List[str]:
+    """
+    Причины, по которым экземпляр не готов принимать запросы (пустой список - готов).
+
+    Args:
+        started (bool): Хранилище готово после запуска (для MySQL - пул прогрет).
+        reachable (Optional[bool]): Результат последней фоновой проверки, None - не было.
+        checked_ago (Optional[float]): Сколько секунд назад выполнялась фоновая проверка.
+        pool (Optional[PoolStats]): Состояние пула, None - пула нет (хранилище без пула).
+        errors (ErrorRate): Обращения к базе данных за окно.
+        health_config (HealthConfig): Пороги.
+    """
+    problems = []
+    if not started:
+        problems.append('Пул соединений с базой данных не прогрет')
+    if reachable is False:
+        problems.append('База данных недоступна')
+
+    interval = health_config.check_interval
+    if started and interval > 0 and checked_ago is not None \
+            and checked_ago > interval * health_config.stale_checks:
+        problems.append(f'Фоновая проверка соединений не выполнялась {checked_ago:.0f} с')
+
+    if pool is not None and pool.waiting and saturation(pool) >= health_config.max_saturation:
+        problems.append(f'Все соединения пула заняты, ожидают запросов: {pool.waiting}')
+
+    if errors.total >= health_config.min_samples and errors.rate > health_config.max_error_rate:
+        problems.append(f'Доля ошибок базы данных {errors.rate:.0%} '
+                        f'за {errors.window:.0f} с')
+    return problems
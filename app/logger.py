@@ -1,13 +1,190 @@
 """
 Создаем и настраиваем логгеры
+
+Формат записей задается 'config.log.format': 'text' - строки для чтения,
+'json' - одна json-строка на запись (время, уровень, логгер, сообщение, место в коде
+и поля из 'extra={"fields": {...}}').
+
+Если включено 'config.log.queue', обработчик только кладет запись в очередь
+(сообщение собирается из аргументов, но не форматируется), а форматирование и запись
+в поток вывода выполняет отдельный поток QueueListener. Поток запроса не ждет ввода-вывода.
+
+Записи уровня DEBUG можно прореживать: 'config.log.debug_sample_rate'.
 """
 
+import atexit
+import json
 import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+from app.config import LoggerConfig, config
+
+TEXT_FORMAT = '%(filename)s - %(levelname)s - %(message)s'
+
+# Атрибуты LogRecord, которые не относятся к полям записи
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class StderrHandler(logging.StreamHandler):
+    """
+    Пишет в текущий sys.stderr (он может быть заменен после настройки, например, pytest).
+    """
+
+    @property
+    def stream(self) -> Any:  # type: ignore[override]
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value: Any) -> None:
+        pass
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Текстовый формат, поля записи добавляются в конце строки в виде json.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            text = f'{text} {json.dumps(fields, ensure_ascii=False, default=str)}'
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Запись в виде одной json-строки.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'location': f'{record.filename}:{record.lineno}',
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        # Остальные атрибуты, переданные через 'extra'
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != 'fields':
+                entry.setdefault(key, value)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю 'rate' записей уровня DEBUG, записи других уровней - все.
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
 
-from app.config import config
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
 
-# Устанавливаем настройки обработчика по умолчанию
-logging.basicConfig(format='%(filename)s - %(levelname)s - %(message)s')
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler, который не форматирует запись в потоке запроса: собирается только
+    сообщение из аргументов (аргументы могут измениться после вызова), остальное
+    выполняет QueueListener. Очередь - в памяти процесса, запись не сериализуется
+    и не копируется: другие обработчики получат то же сообщение из 'getMessage'.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def replace_queue(self, records: 'queue.SimpleQueue[Any]') -> None:
+        """
+        Переключает обработчик на новую очередь (в дочернем процессе после fork).
+        """
+        self.queue = records
+
+
+_handler: Optional[logging.Handler] = None
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging(log_config: LoggerConfig) -> logging.Handler:
+    """
+    Устанавливает обработчик корневого логгера по настройкам (заменяет установленный ранее).
+
+    Returns:
+        logging.Handler: Обработчик, в который пишут логгеры приложения.
+    """
+    global _handler, _listener  # pylint: disable=global-statement
+    formatter: logging.Formatter
+    if log_config.format == 'json':
+        formatter = JsonFormatter()
+    elif log_config.format == 'text':
+        formatter = TextFormatter(TEXT_FORMAT)
+    else:
+        raise ValueError(f'Неизвестный формат журнала: {log_config.format}')
+
+    stop_logging()
+    output = StderrHandler()
+    output.setFormatter(formatter)
+    handler: logging.Handler = output
+    if log_config.queue:
+        records: 'queue.SimpleQueue[Any]' = queue.SimpleQueue()
+        handler = DeferredQueueHandler(records)
+        _listener = QueueListener(records, output)
+        _listener.start()
+    handler.addFilter(SamplingFilter(log_config.debug_sample_rate))
+
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+    root.addHandler(handler)
+    _handler = handler
+    return handler
+
+
+def stop_logging() -> None:
+    """
+    Останавливает поток записи журнала, записи из очереди дописываются.
+    """
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _after_fork_in_child() -> None:
+    # Поток записи не переживает fork: новый процесс запускает свой с новой очередью
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None and isinstance(_handler, DeferredQueueHandler):
+        records: 'queue.SimpleQueue[Any]' = queue.SimpleQueue()
+        _handler.replace_queue(records)
+        _listener = QueueListener(records, *_listener.handlers)
+        _listener.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(stop_logging)
+
+configure_logging(config.log)
 
 # Создаем логгер и устанавливаем уровень
 db_log = logging.getLogger('db')
@@ -19,11 +196,9 @@ log.setLevel(level=getattr(logging, config.log.log_level))
 log_api = logging.getLogger('api')
 log_api.setLevel(level=getattr(logging, config.log.log_level))
 
-# Фиксируем форматирование
-# formatter = logging.Formatter('%(filename)s - %(levelname)s - %(message)s')
-# Создаем обработчик вывода в консоль
-# console_handler = logging.StreamHandler()
-# Добавляем к нему форматирование
-# console_handler.setFormatter(formatter)
-# Добавляем обработчик к логгеру
-# db_log.addHandler(console_handler)
+# Профили запросов и медленные запросы к базе данных: пишутся всегда, когда включены
+profile_log = logging.getLogger('profile')
+profile_log.setLevel(logging.INFO)
+
+slow_log = logging.getLogger('slow_query')
+slow_log.setLevel(logging.WARNING)
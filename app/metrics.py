@@ -0,0 +1,316 @@
+"""
+Метрики в текстовом формате Prometheus (GET /metrics)
+
+Счетчики и гистограммы хранятся по потокам: каждый поток (цикл событий, потоки
+пула запросов) пишет в свой словарь без блокировок. Значения потоков складываются
+только при чтении метрик. Показатели пула соединений и кэша считываются при чтении
+функциями, зарегистрированными в 'Registry.gauge'.
+
+Время и количество HTTP-запросов считает ASGI middleware 'MetricsMiddleware'
+по шаблону пути найденного маршрута ('/tasks/{task_id}'), а не по фактическому пути.
+
+Метрики у каждого рабочего процесса свои (см. ServerConfig.workers).
+"""
+
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Sequence, Tuple
+
+Labels = Tuple[str, ...]
+ASGIApp = Callable[..., Awaitable[None]]
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Границы корзин гистограмм времени, сек
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Границы корзин количества строк
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """
+    Метрика с набором меток. Значения хранятся в словаре текущего потока:
+    метки -> значение.
+    """
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Labels, Any]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[Labels, Any]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: Dict[Labels, Any] = {}
+            # Блокировка нужна только при первом обращении потока к метрике
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _snapshots(self) -> List[Dict[Labels, Any]]:
+        with self._lock:
+            shards = list(self._shards)
+        # Копия словаря в CPython атомарна, поток-владелец может продолжать запись
+        return [dict(shard) for shard in shards]
+
+    @abstractmethod
+    def collect(self) -> List[str]:
+        """
+        Строки метрики в текстовом формате Prometheus.
+        """
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    """
+    Монотонно растущий счетчик.
+    """
+    kind = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Увеличивает счетчик с метками 'labels' на 'amount'"""
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        """Значения счетчика по меткам, сложенные по всем потокам"""
+        total: Dict[Labels, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                total[labels] = total.get(labels, 0) + value
+        return total
+
+    def collect(self) -> List[str]:
+        lines = self._header()
+        for labels, value in sorted(self.values().items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} '
+                         f'{_format_value(value)}')
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Гистограмма: количество наблюдений по корзинам, их сумма и количество.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Добавляет наблюдение 'value' в гистограмму с метками 'labels'"""
+        shard = self._shard()
+        # [наблюдений в каждой корзине..., в корзине +Inf, сумма]
+        entry = shard.get(labels)
+        if entry is None:
+            entry = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def time(self, *labels: str) -> '_Timer':
+        """
+        Измеряет время выполнения блока 'with'.
+        """
+        return _Timer(self, labels)
+
+    def values(self) -> Dict[Labels, List[float]]:
+        """Наблюдения по корзинам и их сумма по меткам, сложенные по всем потокам"""
+        total: Dict[Labels, List[float]] = {}
+        for shard in self._snapshots():
+            for labels, entry in shard.items():
+                entry = list(entry)
+                current = total.get(labels)
+                if current is None:
+                    total[labels] = entry
+                else:
+                    total[labels] = [a + b for a, b in zip(current, entry)]
+        return total
+
+    def collect(self) -> List[str]:
+        lines = self._header()
+        bounds = self.buckets + (math.inf,)
+        names = self.labelnames + ('le',)
+        for labels, entry in sorted(self.values().items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, entry):
+                cumulative += count
+                label_text = _format_labels(names, labels + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{label_text} {_format_value(cumulative)}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(entry[-1])}')
+            lines.append(f'{self.name}_count{label_text} {_format_value(cumulative)}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Gauge(_Metric):
+    """
+    Показатель, который вычисляется при чтении метрик функцией 'callback'.
+    Функция возвращает пары (метки, значение). Накопленные значения (например,
+    счетчики пула соединений) отдаются с типом 'kind'='counter'.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[Labels, float]]], kind: str = 'gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def collect(self) -> List[str]:
+        lines = self._header()
+        for labels, value in self.callback():
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} '
+                         f'{_format_value(value)}')
+        return lines
+
+
+class Registry:
+    """
+    Набор метрик процесса.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Any) -> Any:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Метрика уже зарегистрирована: {metric.name}')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Регистрирует счетчик"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Регистрирует гистограмму с границами корзин 'buckets'"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str],
+              callback: Callable[[], Iterable[Tuple[Labels, float]]],
+              kind: str = 'gauge') -> Gauge:
+        """Регистрирует показатель, вычисляемый функцией 'callback' при чтении метрик"""
+        return self._register(Gauge(name, documentation, labelnames, callback, kind))
+
+    def unregister(self, name: str) -> None:
+        """Удаляет метрику 'name', если она зарегистрирована"""
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        """
+        Все метрики в текстовом формате Prometheus.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'Обработано HTTP-запросов', ('method', 'route', 'status'))
+HTTP_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Время обработки HTTP-запроса', ('method', 'route'))
+QUERY_LATENCY = REGISTRY.histogram(
+    'db_query_duration_seconds', 'Время выполнения метода TaskService', ('method',))
+QUERY_ERRORS = REGISTRY.counter(
+    'db_query_errors_total', 'Методы TaskService, завершившиеся исключением', ('method',))
+QUERY_ROWS = REGISTRY.histogram(
+    'db_query_rows', 'Строк, возвращенных методом TaskService', ('method',), ROWS_BUCKETS)
+POOL_WAIT = REGISTRY.histogram(
+    'db_pool_wait_seconds', 'Ожидание соединения из пула')
+CREATE_BATCH_ROWS = REGISTRY.histogram(
+    'db_create_batch_rows', 'Задач в одной пачке объединенных POST /tasks/', (), ROWS_BUCKETS)
+DB_READS = REGISTRY.counter(
+    'db_reads_total', 'Чтения по серверам базы данных (основной или реплика) и причине выбора',
+    ('target', 'reason'))
+
+
+# Метка для запросов, не подошедших ни под один маршрут (число меток ограничено)
+UNMATCHED = '<unmatched>'
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: количество и время обработки HTTP-запросов по маршрутам.
+    Время включает передачу тела ответа (в том числе потоковой выгрузки).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: ASGIApp, send: ASGIApp) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Маршрутизатор добавляет найденный маршрут в scope
+            route = getattr(scope.get('route'), 'path', UNMATCHED)
+            method = scope['method']
+            HTTP_LATENCY.observe(time.perf_counter() - start, method, route)
+            HTTP_REQUESTS.inc(method, route, str(status))
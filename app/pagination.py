@@ -0,0 +1,84 @@
+"""
+Курсоры для постраничной выдачи (keyset pagination)
+
+Курсор - непрозрачная для клиента строка, в которой закодированы
+значения ключа последней выданной записи.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, Sequence
+
+from fastapi import HTTPException
+
+
+def encode_cursor(key: Dict[str, Any]) -> str:
+    """
+    Кодирует ключ последней записи страницы в курсор.
+    """
+    raw = json.dumps(key, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """
+    Декодирует курсор, полученный от клиента.
+
+    Raises:
+        HTTPException: 400, если курсор поврежден.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        key = json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise HTTPException(400, detail='Некорректный курсор') from e
+
+    if not isinstance(key, dict):
+        raise HTTPException(400, detail='Некорректный курсор')
+    return key
+
+
+def encode_page_key(key: Dict[str, Any], sort: str) -> str:
+    """
+    Кодирует ключ последней записи страницы вместе с порядком сортировки.
+    Даты передаются в формате ISO 8601.
+    """
+    values = {column: value.isoformat() if isinstance(value, datetime) else value
+              for column, value in key.items()}
+    return encode_cursor({'sort': sort, **values})
+
+
+def decode_page_key(token: str, sort: str, columns: Sequence[str]) -> Dict[str, Any]:
+    """
+    Декодирует курсор страницы и проверяет, что он выдан для той же сортировки.
+    Курсоры без 'sort' выдавались для сортировки по id.
+    'id' - целое число, 'score' - число, остальные столбцы - даты.
+
+    Raises:
+        HTTPException: 400, если курсор поврежден или получен для другой сортировки.
+    """
+    data = decode_cursor(token)
+    if data.get('sort', 'id') != sort:
+        raise HTTPException(400, detail='Курсор получен для другой сортировки')
+
+    key: Dict[str, Any] = {}
+    for column in columns:
+        value = data.get(column)
+        try:
+            if column == 'id':
+                if not isinstance(value, int):
+                    raise ValueError(value)
+                key[column] = value
+            elif column == 'score':
+                if not isinstance(value, (int, float)):
+                    raise ValueError(value)
+                key[column] = float(value)
+            else:
+                if not isinstance(value, str):
+                    raise ValueError(value)
+                key[column] = datetime.fromisoformat(value)
+        except (TypeError, ValueError) as e:
+            raise HTTPException(400, detail='Некорректный курсор') from e
+    return key
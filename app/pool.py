@@ -0,0 +1,330 @@
+"""
+Пул соединений с базой данных
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Generator, List, Optional, Tuple
+
+from app.logger import db_log
+
+
+class PoolTimeoutError(Exception):
+    """
+    Не удалось получить соединение из пула за отведенное время.
+    """
+
+
+@dataclass
+class PoolStats:
+    """Состояние пула соединений"""
+    size: int
+    in_use: int
+    idle: int
+    waiting: int
+    max_size: int
+    acquired: int
+    timeouts: int
+    wait_time_total: float
+    wait_time_max: float
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений.
+
+    Соединения создаются функцией 'factory' по мере необходимости,
+    но не больше 'max_size'. При выдаче соединение проверяется функцией 'validate'
+    (если включено 'health_check'), неисправные соединения закрываются и заменяются новыми.
+    Соединения, простаивающие дольше 'idle_timeout', закрываются,
+    пока в пуле остается не меньше 'min_size' соединений.
+    """
+
+    def __init__(self,
+                 factory: Callable[[], Any],
+                 min_size: int = 1,
+                 max_size: int = 10,
+                 timeout: float = 5.0,
+                 health_check: bool = True,
+                 idle_timeout: float = 300.0,
+                 validate: Optional[Callable[[Any], bool]] = None,
+                 on_close: Optional[Callable[[Any], None]] = None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f'Некорректный размер пула: min={min_size}, max={max_size}')
+
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check = health_check
+        self.idle_timeout = idle_timeout
+        self.validate = validate or (lambda conn: conn.is_connected())
+        self.on_close = on_close
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        # Свободные соединения: (соединение, время возврата в пул)
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._acquired = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+        for _ in range(min_size):
+            with self._lock:
+                self._size += 1
+            self._idle.append((self._create(), time.monotonic()))
+
+    def _create(self) -> Any:
+        """
+        Создает новое соединение. Место в пуле должно быть заранее занято
+        увеличением 'self._size', при ошибке оно освобождается.
+        """
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._available.notify()
+            raise
+
+    def _close(self, conn: Any) -> None:
+        """
+        Закрывает соединение, ошибки при закрытии игнорируются.
+        """
+        try:
+            if self.on_close is not None:
+                self.on_close(conn)
+            conn.close()
+        except Exception as e:  # pylint: disable=broad-except
+            db_log.debug('Ошибка при закрытии соединения: %s', e)
+
+    def _is_healthy(self, conn: Any) -> bool:
+        try:
+            return bool(self.validate(conn))
+        except Exception as e:  # pylint: disable=broad-except
+            db_log.debug('Проверка соединения завершилась ошибкой: %s', e)
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        """
+        Выдает соединение из пула.
+
+        Args:
+            timeout (float): Максимальное время ожидания, по умолчанию 'self.timeout'.
+
+        Returns:
+            Соединение с базой данных.
+
+        Raises:
+            PoolTimeoutError: Если свободное соединение не появилось за 'timeout' секунд.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            conn = None
+            create = False
+
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError('Пул соединений закрыт')
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f'Нет свободных соединений в течение {timeout} с')
+                    self._waiting += 1
+                    try:
+                        self._available.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    # LIFO: берем самое "горячее" соединение,
+                    # давно простаивающие остаются в начале очереди и закрываются reap_idle
+                    conn, _ = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+
+            if create:
+                conn = self._create()
+            elif self.health_check and not self._is_healthy(conn):
+                db_log.debug('Соединение не прошло проверку и будет заменено: %s', conn)
+                self.discard(conn)
+                continue
+
+            waited = time.monotonic() - started
+            with self._lock:
+                self._acquired += 1
+                self._wait_time_total += waited
+                self._wait_time_max = max(self._wait_time_max, waited)
+            return conn
+
+    def release(self, conn: Any) -> None:
+        """
+        Возвращает соединение в пул.
+        """
+        with self._lock:
+            if not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._available.notify()
+                conn = None
+        if conn is not None:
+            self.discard(conn)
+        self.reap_idle()
+
+    def discard(self, conn: Any) -> None:
+        """
+        Закрывает выданное соединение и исключает его из пула
+        (например, после ошибки соединения).
+        """
+        self._close(conn)
+        with self._lock:
+            self._size -= 1
+            self._available.notify()
+
+    def reap_idle(self) -> int:
+        """
+        Закрывает соединения, простаивающие дольше 'idle_timeout'.
+
+        Returns:
+            int: Количество закрытых соединений.
+        """
+        expired: List[Any] = []
+        now = time.monotonic()
+        with self._lock:
+            while (self._idle and self._size - len(expired) > self.min_size
+                   and now - self._idle[0][1] > self.idle_timeout):
+                expired.append(self._idle.popleft()[0])
+            self._size -= len(expired)
+
+        for conn in expired:
+            self._close(conn)
+        if expired:
+            db_log.debug('Закрыто простаивающих соединений: %s', len(expired))
+        return len(expired)
+
+    def check_idle(self) -> Tuple[int, int]:
+        """
+        Проверяет свободные соединения функцией 'validate' (фоновая проверка
+        вместо проверки при каждой выдаче). Неисправные соединения закрываются.
+        Соединение забирается из пула только на время своей проверки и возвращается
+        на прежнее место с прежним временем простоя.
+
+        Returns:
+            Tuple[int, int]: Количество проверенных и закрытых соединений.
+        """
+        with self._lock:
+            pending = len(self._idle)
+
+        checked = broken = 0
+        position = 0
+        for _ in range(pending):
+            with self._lock:
+                if self._closed or position >= len(self._idle):
+                    break
+                conn, released = self._idle[position]
+                del self._idle[position]
+
+            checked += 1
+            if not self._is_healthy(conn):
+                db_log.debug('Соединение не прошло фоновую проверку: %s', conn)
+                broken += 1
+                self.discard(conn)
+                continue
+
+            with self._lock:
+                if not self._closed:
+                    self._idle.insert(min(position, len(self._idle)), (conn, released))
+                    self._available.notify()
+                    conn = None
+            if conn is not None:
+                self.discard(conn)
+            position += 1
+        return checked, broken
+
+    def warm_up(self, count: int) -> int:
+        """
+        Заранее открывает соединения, пока в пуле не станет 'count' соединений
+        (но не больше 'max_size'), и оставляет их свободными.
+
+        Returns:
+            int: Количество открытых соединений.
+
+        Raises:
+            Ошибка 'factory', если соединение открыть не удалось
+            (уже открытые соединения остаются в пуле).
+        """
+        created = 0
+        while True:
+            with self._lock:
+                if self._closed or self._size >= min(count, self.max_size):
+                    break
+                self._size += 1
+            conn = self._create()
+            with self._lock:
+                if not self._closed:
+                    self._idle.append((conn, time.monotonic()))
+                    self._available.notify()
+                    conn = None
+            if conn is not None:
+                self.discard(conn)
+                break
+            created += 1
+        if created:
+            db_log.debug('Открыто соединений при прогреве пула: %s', created)
+        return created
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Generator:
+        """
+        Выдает соединение на время блока 'with' и возвращает его в пул.
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> PoolStats:
+        """
+        Возвращает текущее состояние пула.
+        """
+        with self._lock:
+            return PoolStats(
+                size=self._size,
+                in_use=self._size - len(self._idle),
+                idle=len(self._idle),
+                waiting=self._waiting,
+                max_size=self.max_size,
+                acquired=self._acquired,
+                timeouts=self._timeouts,
+                wait_time_total=self._wait_time_total,
+                wait_time_max=self._wait_time_max,
+            )
+
+    def close(self) -> None:
+        """
+        Закрывает все свободные соединения, выданные закрываются при возврате.
+        """
+        with self._lock:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._available.notify_all()
+
+        for conn in idle:
+            self._close(conn)
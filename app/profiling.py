@@ -0,0 +1,349 @@
+"""
+Профилирование запросов и журнал медленных запросов к базе данных
+
+Профилирование включается для всех запросов ('config.profiling.enabled') или для отдельного
+запроса заголовком 'config.profiling.header' со значением 'config.profiling.admin_token'.
+Для профилируемого запроса 'ProfilingMiddleware' собирает время этапов:
+
+    total       - весь запрос до начала отправки ответа;
+    validation  - до вызова функции эндпоинта: разбор запроса, pydantic, зависимости
+                  (без ожидания соединения);
+    pool_wait   - ожидание соединения из пула;
+    handler     - функция эндпоинта;
+    service     - методы TaskService (запросы, чтение строк, построение строк);
+    sql         - выполнение SQL ('execute');
+    rows        - построение строк ответа из кортежей курсора;
+    encode      - сериализация ответа в json.
+
+Этапы вложены друг в друга (sql и rows входят в service, service и encode - в handler)
+и возвращаются в заголовке 'Server-Timing', а также пишутся в журнал 'profile'
+(поля записи - 'extra={"fields": ...}', см. app.logger). Для доли 'sample_rate'
+профилируемых запросов сохраняется профиль функций (cProfile или pyinstrument).
+cProfile видит только поток цикла событий, в том числе другие запросы, выполняемые
+в это время.
+
+'execute' выполняет запрос TaskService и пишет в журнал 'slow_query' запросы
+дольше 'config.profiling.slow_query_ms'.
+"""
+
+import asyncio
+import contextvars
+import functools
+import hmac
+import io
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Generator, List, Optional, Sequence
+
+from fastapi.routing import APIRoute
+
+from app.config import ProfilingConfig, config
+from app.logger import profile_log, slow_log
+
+ASGIApp = Callable[..., Any]
+
+# Профиль текущего запроса, None - запрос не профилируется
+_profile: contextvars.ContextVar[Optional['Profile']] = contextvars.ContextVar(
+    'profile', default=None)
+# Метод TaskService, который выполняет запрос (для журнала медленных запросов)
+_method: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('method', default=None)
+
+# Этапы в порядке вывода в Server-Timing
+PHASES = ('total', 'validation', 'pool_wait', 'handler', 'service', 'sql', 'rows', 'encode')
+# Длина текста запроса в журнале медленных запросов
+STATEMENT_LIMIT = 1000
+
+
+class Profile:
+    """
+    Время этапов одного запроса. Этапы могут записываться из потоков пула.
+    """
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.handler_started: Optional[float] = None
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] += seconds
+            self.counts[name] += 1
+
+    def finish(self) -> Dict[str, float]:
+        """
+        Время этапов в миллисекундах.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            phases = dict(self.phases)
+        phases['total'] = now - self.started
+        if self.handler_started is not None:
+            phases['validation'] = max(
+                0.0, self.handler_started - self.started - phases.get('pool_wait', 0.0))
+        return {name: round(phases[name] * 1000, 3) for name in PHASES if name in phases}
+
+
+def current() -> Optional[Profile]:
+    """
+    Профиль текущего запроса или None.
+    """
+    return _profile.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """
+    Добавляет время этапа 'name' в профиль текущего запроса, если запрос профилируется.
+    """
+    profile = _profile.get()
+    if profile is not None:
+        profile.add(name, seconds)
+
+
+class phase:  # pylint: disable=invalid-name
+    """
+    Измеряет время блока 'with' как этап профиля текущего запроса.
+    Если запрос не профилируется, время не измеряется.
+    """
+    __slots__ = ('name', 'profile', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.profile = _profile.get()
+        self.start = 0.0
+
+    def __enter__(self) -> 'phase':
+        if self.profile is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self.profile is not None:
+            self.profile.add(self.name, time.perf_counter() - self.start)
+
+
+def service_method(name: str) -> contextvars.Token:
+    """
+    Отмечает метод TaskService, выполняющийся в текущем контексте.
+    """
+    return _method.set(name)
+
+
+def reset_service_method(token: contextvars.Token) -> None:
+    _method.reset(token)
+
+
+def execute(cursor: Any, query: str, params: Optional[Sequence[Any]] = None) -> None:
+    """
+    Выполняет запрос курсором, учитывает время в профиле и пишет медленные запросы в журнал.
+    """
+    start = time.perf_counter()
+    try:
+        if params is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query, params)
+    finally:
+        elapsed = time.perf_counter() - start
+        record('sql', elapsed)
+        threshold = config.profiling.slow_query_ms
+        if threshold and elapsed * 1000 >= threshold:
+            _log_slow(cursor, query, params, elapsed)
+
+
+def _log_slow(cursor: Any, query: str, params: Optional[Sequence[Any]], elapsed: float) -> None:
+    profile = _profile.get()
+    rowcount = getattr(cursor, 'rowcount', None)
+    entry = {
+        'event': 'slow_query',
+        'method': _method.get(),
+        'duration_ms': round(elapsed * 1000, 3),
+        'threshold_ms': config.profiling.slow_query_ms,
+        'statement': ' '.join(query.split())[:STATEMENT_LIMIT],
+        # Значения параметров не пишутся: в них могут быть данные пользователей
+        'params': 0 if params is None else len(params),
+        'rowcount': rowcount if isinstance(rowcount, int) else None,
+        'request': None if profile is None else f'{profile.method} {profile.path}',
+    }
+    slow_log.warning('slow_query', extra={'fields': entry})
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Маршрут, который отмечает в профиле запроса начало и время выполнения функции эндпоинта.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        endpoint = self.dependant.call
+        if not asyncio.iscoroutinefunction(endpoint):
+            return
+
+        @functools.wraps(endpoint)
+        async def call(*call_args: Any, **call_kwargs: Any) -> Any:
+            profile = _profile.get()
+            if profile is None:
+                return await endpoint(*call_args, **call_kwargs)
+            profile.handler_started = start = time.perf_counter()
+            try:
+                return await endpoint(*call_args, **call_kwargs)
+            finally:
+                profile.add('handler', time.perf_counter() - start)
+
+        # Обработчик маршрута берет функцию из 'dependant' при каждом запросе
+        self.dependant.call = call
+
+
+def _header(scope: Dict[str, Any], name: str) -> Optional[str]:
+    name_bytes = name.lower().encode()
+    for key, value in scope.get('headers', ()):
+        if key == name_bytes:
+            return value.decode('latin-1')
+    return None
+
+
+def _server_timing(phases: Dict[str, float]) -> bytes:
+    return ', '.join(f'{name};dur={value}' for name, value in phases.items()).encode()
+
+
+# Профилировщик функций в процессе может работать только один
+_sampling_lock = threading.Lock()
+_sampling = False
+
+
+class _Sampler:
+    """
+    Профиль функций одного запроса: cProfile или pyinstrument.
+    """
+
+    def __init__(self, profiling_config: ProfilingConfig):
+        self.config = profiling_config
+        self.profiler: Any = None
+
+    def start(self) -> None:
+        if self.config.profiler == 'pyinstrument':
+            # Необязательная зависимость, нужна только для этого режима
+            # pylint: disable-next=import-outside-toplevel
+            from pyinstrument import Profiler  # type: ignore[import-not-found]
+            self.profiler = Profiler(async_mode='enabled')
+            self.profiler.start()
+        else:
+            import cProfile  # pylint: disable=import-outside-toplevel
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self, profile: Profile) -> None:
+        if self.config.profiler == 'pyinstrument':
+            self.profiler.stop()
+            self._save(profile, 'html', self.profiler.output_html, self.profiler.output_text)
+        else:
+            self.profiler.disable()
+            self._save(profile, 'prof', None, self._stats_text)
+
+    def _stats_text(self) -> str:
+        import pstats  # pylint: disable=import-outside-toplevel
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(25)
+        return stream.getvalue()
+
+    def _save(self, profile: Profile, extension: str, render: Optional[Callable[[], str]],
+              text: Callable[[], str]) -> None:
+        if not self.config.output_dir:
+            profile_log.info('Профиль %s %s:\n%s', profile.method, profile.path, text())
+            return
+
+        os.makedirs(self.config.output_dir, exist_ok=True)
+        name = '_'.join(filter(None, profile.path.split('/'))) or 'root'
+        path = os.path.join(self.config.output_dir,
+                            f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-'
+                            f'{profile.method}-{name}.{extension}')
+        if render is None:
+            self.profiler.dump_stats(path)
+        else:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(render())
+        profile_log.info('Профиль %s %s сохранен: %s', profile.method, profile.path, path)
+
+
+@contextmanager
+def sampling(profiling_config: ProfilingConfig, profile: Profile) -> Generator[bool, None, None]:
+    """
+    Записывает профиль функций блока 'with', если профилировщик процесса свободен.
+
+    Yields:
+        bool: True, если профиль функций записывается.
+    """
+    global _sampling  # pylint: disable=global-statement
+    with _sampling_lock:
+        busy, _sampling = _sampling, True
+    if busy:
+        yield False
+        return
+    try:
+        sampler = _Sampler(profiling_config)
+        sampler.start()
+        try:
+            yield True
+        finally:
+            sampler.stop(profile)
+    finally:
+        _sampling = False
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware профилирования запросов. Запросы, которые не профилируются,
+    проходят без изменений (проверяется только заголовок).
+    """
+
+    def __init__(self, app: ASGIApp, profiling_config: Optional[ProfilingConfig] = None):
+        self.app = app
+        self.config = profiling_config or config.profiling
+
+    def enabled(self, scope: Dict[str, Any]) -> bool:
+        if self.config.enabled:
+            return True
+        if not self.config.admin_token:
+            return False
+        value = _header(scope, self.config.header)
+        return value is not None and hmac.compare_digest(value.encode(),
+                                                         self.config.admin_token.encode())
+
+    async def __call__(self, scope: Dict[str, Any], receive: ASGIApp, send: ASGIApp) -> None:
+        if scope['type'] != 'http' or not self.enabled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope['method'], scope['path'])
+        token = _profile.set(profile)
+        sampled = bool(self.config.sample_rate) and random.random() < self.config.sample_rate
+        result: List[Dict[str, float]] = []
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            if message['type'] == 'http.response.start':
+                phases = profile.finish()
+                result.append(phases)
+                message = {**message, 'headers': [*message.get('headers', ()),
+                                                  (b'server-timing', _server_timing(phases))]}
+            await send(message)
+
+        try:
+            with sampling(self.config, profile) if sampled else nullcontext(False):
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            _profile.reset(token)
+            phases = result[0] if result else profile.finish()
+            profile_log.info('profile', extra={'fields': {
+                'event': 'profile',
+                'request': f'{profile.method} {profile.path}',
+                'route': getattr(scope.get('route'), 'path', None),
+                'phases_ms': phases,
+                'calls': dict(profile.counts),
+            }})
@@ -0,0 +1,160 @@
+"""
+Чтение с реплик базы данных ('config.db.replicas')
+
+Изменяющие запросы выполняются на основном сервере, чтения TaskService - на репликах:
+по кругу ('round_robin') или на реплике с наименьшей загрузкой пула ('least_loaded').
+Реплика, которая не готова по тем же признакам, что и /health/ready (не подключена,
+недоступна по фоновой проверке, пул переполнен, много ошибок), пропускается; если
+здоровых реплик нет, чтение выполняется на основном сервере.
+
+Реплики отстают от основного сервера. Чтобы клиент видел свои изменения, после успешного
+изменяющего запроса он получает cookie со временем изменения, и 'config.db.read_your_writes'
+секунд его чтения выполняются на основном сервере (ReadYourWritesMiddleware).
+"""
+
+import itertools
+import math
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import DatabaseConfig, config
+from app.database import DB
+from app.health import readiness_problems
+from app.logger import db_log
+from app.metrics import DB_READS
+
+ROUND_ROBIN = 'round_robin'
+LEAST_LOADED = 'least_loaded'
+
+COOKIE = 'task_hub_written'
+WRITE_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+
+# Чтения текущего запроса выполняются на основном сервере
+_primary: ContextVar[bool] = ContextVar('read_primary', default=False)
+
+
+def written_at(scope: Scope) -> Optional[float]:
+    """
+    Время последнего изменения из cookie запроса, None - cookie нет или она неверна.
+    """
+    for name, value in scope['headers']:
+        if name != b'cookie':
+            continue
+        for item in value.decode('latin-1').split(';'):
+            key, _, written = item.strip().partition('=')
+            if key == COOKIE:
+                try:
+                    return float(written)
+                except ValueError:
+                    return None
+    return None
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware: чтение своих изменений при чтении с реплик.
+    Успешный ответ на изменяющий запрос получает cookie со временем изменения. Пока с него
+    не прошло 'window' секунд, чтения этого клиента выполняются на основном сервере.
+    """
+
+    def __init__(self, app: ASGIApp, window: float):
+        self.app = app
+        self.window = window
+        self._max_age = math.ceil(window)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        written = written_at(scope)
+        token = _primary.set(written is not None and time.time() - written < self.window)
+
+        async def send_with_cookie(message: Message) -> None:
+            if message['type'] == 'http.response.start' and message['status'] < 400:
+                cookie = f'{COOKIE}={time.time():.3f}; Max-Age={self._max_age}; Path=/; ' \
+                         'HttpOnly; SameSite=Lax'
+                message = {**message, 'headers': [*message.get('headers', ()),
+                                                  (b'set-cookie', cookie.encode('latin-1'))]}
+            await send(message)
+
+        try:
+            write = scope['method'] in WRITE_METHODS
+            await self.app(scope, receive, send_with_cookie if write else send)
+        finally:
+            _primary.reset(token)
+
+
+def load(db: DB) -> float:
+    """
+    Загрузка пула: доля занятых соединений вместе с ожидающими запросами.
+    """
+    stats = db.pool_stats()
+    if stats is None or not stats.max_size:
+        return 0.0
+    return (stats.in_use + stats.waiting) / stats.max_size
+
+
+class ReplicaSet:
+    """
+    Основной сервер и реплики для чтения.
+    """
+
+    def __init__(self, primary: DB, replicas: List[DB], selection: str = ROUND_ROBIN):
+        if selection not in (ROUND_ROBIN, LEAST_LOADED):
+            raise ValueError(f'Неизвестный способ выбора реплики: {selection}')
+        self.primary = primary
+        self.replicas = replicas
+        self.selection = selection
+        self._next = itertools.count()
+
+    @staticmethod
+    def healthy(db: DB) -> bool:
+        """
+        Реплика готова принимать запросы (признаки /health/ready).
+        """
+        checked_ago = None if db.checked_at is None else time.monotonic() - db.checked_at
+        return not readiness_problems(db.ready, db.reachable, checked_ago, db.pool_stats(),
+                                      db.errors.stats(), config.health)
+
+    def pick(self) -> Tuple[DB, str]:
+        """
+        Выбирает сервер для чтения.
+
+        Returns:
+            (сервер, причина выбора): 'replica', 'read_your_writes' или 'no_healthy_replica'.
+        """
+        if _primary.get():
+            return self.primary, 'read_your_writes'
+
+        healthy = [replica for replica in self.replicas if self.healthy(replica)]
+        if not healthy:
+            return self.primary, 'no_healthy_replica'
+
+        # Обход начинается со следующей реплики: при равной загрузке чтения чередуются
+        start = next(self._next) % len(healthy)
+        if self.selection == ROUND_ROBIN:
+            return healthy[start], 'replica'
+        return min(healthy[start:] + healthy[:start], key=load), 'replica'
+
+    @staticmethod
+    def name(db: DB) -> str:
+        return db.host or 'primary'
+
+    def count(self, db: DB, reason: str) -> None:
+        DB_READS.inc(self.name(db), reason)
+
+
+def create_replicas(primary: DB, db_config: DatabaseConfig) -> Optional[ReplicaSet]:
+    """
+    Создает набор реплик по настройкам, None - реплики не заданы.
+    """
+    if not db_config.replicas:
+        return None
+    replicas = ReplicaSet(primary, [DB(host) for host in db_config.replicas],
+                          db_config.replica_selection)
+    db_log.debug('Replicas: %s, selection: %s', db_config.replicas, db_config.replica_selection)
+    return replicas
@@ -0,0 +1,57 @@
+"""
+Быстрая сериализация ответов API в json
+
+Ответы роутеров - словари и строки базы данных ('app.rows.Row') из str, int, float, None
+и datetime, поэтому рекурсивный обход 'jsonable_encoder' не нужен: значения сразу сериализуются
+в байты. Если установлен orjson, используется он, иначе - стандартный json
+с преобразованием дат в ISO 8601.
+"""
+
+import datetime
+import json
+from types import ModuleType
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+
+from app.profiling import phase
+from app.rows import Row
+
+# Необязательная зависимость, без нее (None) используется стандартный json
+orjson: Optional[ModuleType]
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+
+def json_default(value: Any) -> Any:
+    """
+    Сериализация типов, которые не поддерживает json (даты из MySQL, строки 'Row').
+    """
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Row):
+        return value._asdict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def encode(value: Any) -> bytes:
+    """
+    Компактно сериализует значение в json (UTF-8).
+    """
+    if orjson is not None:
+        # Даты и строки 'Row' (dataclass) orjson сериализует сам, даты - в формате isoformat
+        return orjson.dumps(value, default=json_default)
+    return json.dumps(value, default=json_default, ensure_ascii=False,
+                      separators=(',', ':')).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse, который сериализует содержимое функцией 'encode'.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with phase('encode'):
+            return encode(content)
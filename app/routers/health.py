@@ -0,0 +1,106 @@
+"""
+Проверки состояния сервиса для оркестратора
+
+GET /ready - процесс готов принимать запросы: хранилище задач подготовлено при запуске
+приложения (lifespan, 'TaskRepository.start', для MySQL - прогрет пул соединений).
+Пока хранилище не готово, ответ 503, и трафик на этот экземпляр не направляется.
+
+GET /health/live - процесс жив и цикл событий отвечает, от базы данных не зависит.
+GET /health/ready - готовность с подробностями: доступность базы данных по фоновой
+проверке соединений ('TaskRepository.monitor'), загрузка пула и доля ошибок
+за последнее время.
+
+Проверки не выполняют запросов к базе данных.
+"""
+
+import time
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Response, status
+
+from app.config import config
+from app.health import readiness_problems, saturation
+from app.responses import FastJSONResponse
+from app.routers.tasks import repository
+from app.schemes.task import ErrorMessage, SuccessMessage
+
+router = APIRouter()
+
+STARTED = time.monotonic()
+
+
+@router.get("/ready",
+            summary="Готовность к приему запросов",
+            responses={
+                200: {"model": SuccessMessage},
+                503: {"model": ErrorMessage},
+            })
+async def ready() -> Response:
+    """
+    Возвращает 200, если хранилище задач готово (пул соединений прогрет), иначе 503.
+    """
+    storage = repository.status()
+    if not storage.ready:
+        detail = 'Нет соединения с базой данных'
+        if storage.startup_error:
+            detail = f'{detail}: {storage.startup_error}'
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail)
+
+    return FastJSONResponse(content={'detail': 'ready'})
+
+
+@router.get("/health/live", summary="Процесс жив")
+async def live() -> Response:
+    """
+    Возвращает 200, пока процесс обрабатывает запросы.
+    """
+    return FastJSONResponse(content={'status': 'ok',
+                                     'uptime': round(time.monotonic() - STARTED, 3)})
+
+
+@router.get("/health/ready",
+            summary="Готовность и состояние базы данных",
+            responses={503: {"description": "Экземпляр не готов, причины в 'problems'"}})
+async def health_ready() -> Response:
+    """
+    Возвращает 200, если экземпляр готов принимать запросы, иначе 503.\n
+    В ответе: доступность базы данных по последней фоновой проверке, состояние пула
+    соединений и доля ошибок обращений к базе данных за окно 'config.health.error_window'.
+    """
+    storage = repository.status()
+    pool, errors = storage.pool, storage.errors
+    checked_ago = None if storage.checked_at is None else time.monotonic() - storage.checked_at
+    problems = readiness_problems(storage.ready, storage.reachable, checked_ago, pool, errors,
+                                  config.health)
+
+    database: Dict[str, Any] = {
+        'backend': config.storage.backend,
+        'started': storage.ready,
+        'reachable': storage.reachable,
+        'checked_ago': None if checked_ago is None else round(checked_ago, 3),
+        'error': storage.startup_error,
+        # Нездоровая реплика не влияет на готовность: чтения идут на основной сервер
+        'replicas': storage.replicas,
+    }
+    body = {
+        'status': 'fail' if problems else 'ok',
+        'problems': problems,
+        'database': database,
+        'pool': None if pool is None else {
+            'size': pool.size,
+            'in_use': pool.in_use,
+            'idle': pool.idle,
+            'waiting': pool.waiting,
+            'max_size': pool.max_size,
+            'saturation': round(saturation(pool), 3),
+            'timeouts': pool.timeouts,
+        },
+        'errors': {
+            'window': errors.window,
+            'total': errors.total,
+            'errors': errors.errors,
+            'rate': round(errors.rate, 3),
+        },
+    }
+    code = status.HTTP_503_SERVICE_UNAVAILABLE if problems else status.HTTP_200_OK
+    return FastJSONResponse(content=body, status_code=code)
@@ -0,0 +1,76 @@
+"""
+GET /metrics - метрики процесса в текстовом формате Prometheus
+
+Кроме счетчиков запросов и гистограмм времени (app.metrics) здесь регистрируются
+показатели, которые считываются при каждом запросе метрик: состояние пула соединений,
+подготовленных выражений и кэша GET /tasks/{task_id}.
+"""
+
+from typing import Iterator, Tuple
+
+from fastapi import APIRouter, Response
+
+from app.metrics import CONTENT_TYPE, REGISTRY, Labels
+from app.routers.tasks import repository
+
+router = APIRouter()
+
+Sample = Iterator[Tuple[Labels, float]]
+
+
+def _pool(*fields: str) -> Sample:
+    # Пул не создается ради метрик: до первого подключения значений нет
+    stats = repository.pool_stats()
+    if stats is not None:
+        for field in fields:
+            yield (field,), getattr(stats, field)
+
+
+def _pool_wait_max() -> Sample:
+    stats = repository.pool_stats()
+    if stats is not None:
+        yield (), stats.wait_time_max
+
+
+def _statements() -> Sample:
+    stats = repository.statement_stats()
+    if stats is not None:
+        yield ('hit',), stats.hits
+        yield ('miss',), stats.misses
+
+
+def _cache(*fields: str) -> Sample:
+    if repository.cache is not None:
+        stats = repository.cache.stats()
+        for field in fields:
+            yield (field,), getattr(stats, field)
+
+
+def _cache_hit_ratio() -> Sample:
+    if repository.cache is not None:
+        stats = repository.cache.stats()
+        lookups = stats.hits + stats.misses
+        yield (), stats.hits / lookups if lookups else 0.0
+
+
+REGISTRY.gauge('db_pool_connections', 'Соединения пула по состоянию', ('state',),
+               lambda: _pool('size', 'in_use', 'idle', 'waiting', 'max_size'))
+REGISTRY.gauge('db_pool_events_total', 'Выдано соединений и ожиданий, завершившихся таймаутом',
+               ('event',), lambda: _pool('acquired', 'timeouts'), kind='counter')
+REGISTRY.gauge('db_pool_wait_max_seconds', 'Наибольшее ожидание соединения из пула', (),
+               _pool_wait_max)
+REGISTRY.gauge('db_prepared_statements_total', 'Обращения к кэшу подготовленных выражений',
+               ('result',), _statements, kind='counter')
+REGISTRY.gauge('cache_events_total', 'События кэша GET /tasks/{task_id}', ('event',),
+               lambda: _cache('hits', 'misses', 'evictions', 'expirations', 'invalidations'),
+               kind='counter')
+REGISTRY.gauge('cache_hit_ratio', 'Доля попаданий в кэш GET /tasks/{task_id}', (),
+               _cache_hit_ratio)
+
+
+@router.get("/metrics", summary="Метрики в формате Prometheus", include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Возвращает метрики процесса в текстовом формате Prometheus.
+    """
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
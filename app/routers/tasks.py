@@ -2,26 +2,46 @@
 CRUD API сервисы для /tasks
 
 Все входные данные проверяются pydantic. Схемы хранятся в app.schemes
-В каждой функции получаем курсор для работы с базой данных 'cursor=Depends(db.get_cursor)'
-и передаем его классу для работы с базой данных 'db_service'
+Задачи читаются и изменяются через хранилище 'repository' (app.services.repository,
+выбирается 'config.storage.backend'). Соединениями и транзакциями управляет хранилище:
+изменение фиксируется при успехе и откатывается при ошибке.
 
 В конце работы функции формируем ответный словарь,
-преобразуем в json и отправляем.
+преобразуем в json ('FastJSONResponse', без jsonable_encoder) и отправляем.
 """
 
-from fastapi import APIRouter, Depends, Response, status
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Generator, List, Literal, Optional, Tuple
 
-from app.schemes.task import ErrorMessage, SuccessMessage
-from app.database import DB
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.conditional import (list_etag, not_modified, not_modified_response, task_etag,
+                             validators)
+from app.config import config
+from app.schemes.task import (BulkChangeResponse, BulkCreateResponse, BulkDelete, BulkUpdate,
+                              ErrorMessage, SuccessMessage)
+from app.export import MEDIA_TYPES, NDJSON, encode_batches
 from app.logger import log_api
-from app.schemes.task import TaskValidation, TaskResponse, TasksListResponse
-from app.services.mysql import TaskService
+from app.pagination import decode_page_key, encode_page_key
+from app.profiling import ProfiledRoute
+from app.responses import FastJSONResponse
+from app.schemes.task import (PATTERN, SearchResponse, SortOrder, TaskFilters, TaskValidation,
+                              TaskResponse, TasksListResponse)
+from app.services.repository import SORT_KEYS
+from app.services.storage import create_repository
+
+# Маршруты отмечают время функции эндпоинта в профиле запроса (app.profiling)
+router = APIRouter(route_class=ProfiledRoute)
+# Соединения с базой данных открываются при запуске рабочего процесса (lifespan)
+repository = create_repository(config.storage, config.cache, config.search,
+                               config.server.workers, config.batching)
 
-router = APIRouter()
-db_service = TaskService()
-db = DB()
+# Сортировка, для которой выдаются курсоры страниц поиска
+SEARCH = 'search'
 
 
 @router.post("/",
@@ -32,20 +52,216 @@ db = DB()
                  409: {"model": ErrorMessage},
                  201: {"model": SuccessMessage},
              })
-async def create(data: TaskValidation, cursor=Depends(db.get_cursor)) -> Response:
+async def create(data: TaskValidation) -> Response:
     """
     Создает новую задачу.\n
     Поле taskname должно быть уникальным.
     """
 
-    log_api.debug(f'data: {data}')
+    log_api.debug('data: %s', data)
     # Создаем запись в базе данных.
-    await db_service.create(cursor, data)
+    await repository.create(data)
 
     # Формируем response, преобразовываем в json и отправляем.
     response_data = {'detail': 'Task created successfully'}
-    json_data = jsonable_encoder(response_data)
-    return JSONResponse(content=json_data)
+    return FastJSONResponse(content=response_data)
+
+
+def export_chunks(fmt: str) -> Generator[str, None, None]:
+    """
+    Читает задачи пачками из хранилища и отдает части ответа.
+    Соединение занято, пока клиент читает выгрузку.
+    """
+    batches = repository.iter_all(config.api.export_batch_size)
+    try:
+        yield from encode_batches(batches, fmt)
+    finally:
+        batches.close()
+
+
+async def stream_export(fmt: str) -> AsyncIterator[str]:
+    """
+    Выполняет чтение выгрузки в пуле потоков.
+    Если клиент отключился, генератор закрывается сразу, и соединение возвращается в пул.
+    """
+    chunks = export_chunks(fmt)
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            yield chunk
+    finally:
+        await run_in_threadpool(chunks.close)
+
+
+async def read_bulk_items(request: Request
+                          ) -> Tuple[List[Tuple[int, TaskValidation]], List[Dict[str, Any]]]:
+    """
+    Читает тело пакетного запроса: json-массив или NDJSON (Content-Type: application/x-ndjson).
+    Каждый элемент проверяется отдельно, ошибка в одном элементе не отменяет остальные.
+
+    Returns:
+        Прошедшие проверку элементы с их позициями в запросе и результаты (422) для остальных.
+    """
+    raw_items: List[Any] = []
+    if request.headers.get('content-type', '').startswith(MEDIA_TYPES[NDJSON]):
+        # Разбираем поток построчно, не дожидаясь всего тела
+        buffer = b''
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            raw_items.extend(line for line in lines if line.strip())
+            if len(raw_items) > config.api.bulk_max_items:
+                break
+        if buffer.strip():
+            raw_items.append(buffer)
+    else:
+        try:
+            raw_items = json.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(422, detail='Тело запроса должно быть json-массивом') from e
+        if not isinstance(raw_items, list):
+            raise HTTPException(422, detail='Тело запроса должно быть json-массивом')
+
+    if len(raw_items) > config.api.bulk_max_items:
+        raise HTTPException(413, detail=f'Не больше {config.api.bulk_max_items} задач в запросе')
+
+    items, errors = [], []
+    for index, raw in enumerate(raw_items):
+        try:
+            if isinstance(raw, bytes):
+                item = TaskValidation.model_validate_json(raw)
+            else:
+                item = TaskValidation.model_validate(raw)
+            items.append((index, item))
+        except ValidationError as e:
+            detail = '; '.join(error['msg'] for error in e.errors())
+            errors.append({'index': index, 'status': 422, 'detail': detail})
+
+    return items, errors
+
+
+@router.post("/bulk",
+             summary="Пакетное создание задач",
+             status_code=status.HTTP_200_OK,
+             response_description="Successful Response",
+             response_model=BulkCreateResponse,
+             openapi_extra={
+                 "requestBody": {
+                     "required": True,
+                     "content": {
+                         "application/json": {"schema": {
+                             "type": "array",
+                             "items": {"$ref": "#/components/schemas/TaskValidation"}}},
+                         MEDIA_TYPES[NDJSON]: {"schema": {"type": "string"}},
+                     },
+                 },
+             })
+async def create_bulk(body=Depends(read_bulk_items)) -> Response:
+    """
+    Создает задачи из json-массива или NDJSON-потока.\n
+    Задачи вставляются многострочными INSERT, одна пачка - одна транзакция.\n
+    Результат возвращается для каждой задачи: 201 - создана,
+    409 - задача с таким названием уже существует, 422 - ошибка валидации.
+    """
+    # Тело читается зависимостью до получения соединения,
+    # чтобы соединение не было занято на время загрузки
+    items, errors = body
+
+    results = await repository.create_bulk([item for _, item in items],
+                                           config.api.bulk_chunk_size)
+
+    # Возвращаем результатам позиции элементов в исходном запросе
+    for (index, _), result in zip(items, results):
+        result['index'] = index
+    results = sorted(results + errors, key=lambda result: result['index'])
+
+    created = sum(1 for result in results if result['status'] == status.HTTP_201_CREATED)
+    response_data = {'created': created, 'failed': len(results) - created, 'data': results}
+    return FastJSONResponse(content=response_data)
+
+
+@router.patch("/bulk",
+              summary="Пакетное обновление задач",
+              status_code=status.HTTP_200_OK,
+              response_description="Successful Response",
+              response_model=BulkChangeResponse)
+async def update_bulk(data: BulkUpdate) -> Response:
+    """
+    Изменяет поля description и/или category у задач из списка ids
+    или у всех задач категории category.\n
+    Все изменения выполняются в одной транзакции.
+    Не найденные id возвращаются в missing_ids, ошибка 404 не возникает.
+    """
+    if data.ids is not None and len(data.ids) > config.api.bulk_max_items:
+        raise HTTPException(413, detail=f'Не больше {config.api.bulk_max_items} id в запросе')
+
+    response_data = await repository.update_bulk(
+        data.changes.model_dump(exclude_unset=True), data.ids, data.category,
+        config.api.bulk_chunk_size)
+    return FastJSONResponse(content=response_data)
+
+
+@router.delete("/bulk",
+               summary="Пакетное удаление задач",
+               status_code=status.HTTP_200_OK,
+               response_description="Successful Response",
+               response_model=BulkChangeResponse)
+async def delete_bulk(data: BulkDelete) -> Response:
+    """
+    Удаляет задачи из списка ids или все задачи категории category в одной транзакции.\n
+    Не найденные id возвращаются в missing_ids, ошибка 404 не возникает.
+    """
+    if data.ids is not None and len(data.ids) > config.api.bulk_max_items:
+        raise HTTPException(413, detail=f'Не больше {config.api.bulk_max_items} id в запросе')
+
+    response_data = await repository.delete_bulk(data.ids, data.category,
+                                                 config.api.bulk_chunk_size)
+    return FastJSONResponse(content=response_data)
+
+
+@router.get("/export",
+            summary="Потоковая выгрузка всех задач",
+            response_description="Successful Response",
+            responses={
+                200: {"content": {MEDIA_TYPES[NDJSON]: {}}},
+            })
+async def export(fmt: Literal['ndjson', 'json'] = Query(default=NDJSON, alias='format')
+                 ) -> Response:
+    """
+    Выгружает все задачи в порядке возрастания id.\n
+    format=ndjson - одна задача в строке, format=json - объект {"data": [...]}.\n
+    Ответ передается частями по мере чтения из базы данных.
+    """
+    return StreamingResponse(stream_export(fmt), media_type=MEDIA_TYPES[fmt])
+
+
+@router.get("/search",
+            summary="Полнотекстовый поиск задач",
+            status_code=status.HTTP_200_OK,
+            response_description="Successful Response",
+            response_model=SearchResponse)
+async def search(q: str = Query(min_length=1, max_length=200,
+                                description='Слова для поиска в taskname и description'),
+                 limit: int = Query(default=config.api.page_size,
+                                    ge=1, le=config.api.max_page_size),
+                 page_cursor: Optional[str] = Query(
+                     default=None, alias='cursor',
+                     description="Значение 'next_cursor' из предыдущего ответа")
+                 ) -> Response:
+    """
+    Ищет задачи, в названии или описании которых есть слова из q.\n
+    Задачи упорядочены по релевантности (поле score), затем по id.\n
+    Следующая страница запрашивается с тем же q и параметром cursor из поля next_cursor.
+    """
+    after = None
+    if page_cursor is not None:
+        after = decode_page_key(page_cursor, SEARCH, ('score', 'id'))
+
+    data, next_key = await repository.search(q, limit, after)
+
+    # Формируем response, преобразовываем в json и отправляем.
+    next_cursor = encode_page_key(next_key, SEARCH) if next_key is not None else None
+    response_data = {'data': data, 'next_cursor': next_cursor}
+    return FastJSONResponse(content=response_data)
 
 
 @router.get("/{task_id}",
@@ -53,19 +269,39 @@ async def create(data: TaskValidation, cursor=Depends(db.get_cursor)) -> Respons
             response_model=TaskResponse,
             response_description="Successful Response",
             responses={
+                304: {"description": "Not Modified"},
                 404: {"model": ErrorMessage},
             })
-async def get_one(task_id: int, cursor=Depends(db.get_cursor)) -> Response:
+async def get_one(task_id: int, request: Request) -> Response:
     """
     Получаем информацию о задаче заданным task_id.\n
-    При отсутствии задачи с таким id, получим ошибку 404.
+    При отсутствии задачи с таким id, получим ошибку 404.\n
+    Ответ содержит ETag и Last-Modified. Если задача не менялась
+    (If-None-Match или If-Modified-Since), возвращается 304 без тела.
     """
-    data = await db_service.get_one(cursor, task_id)
+    row = await repository.get_one(task_id)
+    headers = validators(task_etag(row), row.get('updated_at'))
+    if not_modified(request.headers, headers['ETag'], row.get('updated_at')):
+        return not_modified_response(headers)
 
     # Формируем response, преобразовываем в json и отправляем.
-    response_data = {'data': data[0]}
-    json_data = jsonable_encoder(response_data)
-    return JSONResponse(content=json_data)
+    response_data = {'data': row}
+    return FastJSONResponse(content=response_data, headers=headers)
+
+
+def task_filters(category: Optional[str] = Query(default=None, max_length=100,
+                                                pattern=PATTERN),
+                 created_after: Optional[datetime] = Query(
+                     default=None, description='Созданные не раньше этой даты'),
+                 created_before: Optional[datetime] = Query(
+                     default=None, description='Созданные раньше этой даты'),
+                 sort: SortOrder = Query(default='id', description="'-' - по убыванию")
+                 ) -> TaskFilters:
+    """
+    Фильтры и сортировка списка задач из параметров запроса.
+    """
+    return TaskFilters(category=category, created_after=created_after,
+                       created_before=created_before, sort=sort)
 
 
 @router.get("/", summary="Получение информации о всех задачах",
@@ -73,19 +309,54 @@ async def get_one(task_id: int, cursor=Depends(db.get_cursor)) -> Response:
             response_description="Successful Response",
             response_model=TasksListResponse,
             responses={
+                304: {"description": "Not Modified"},
                 404: {"model": ErrorMessage},
             })
-async def get_all(cursor=Depends(db.get_cursor)) -> Response:
+async def get_all(request: Request,
+                  limit: int = Query(default=config.api.page_size,
+                                     ge=1, le=config.api.max_page_size),
+                  after_id: Optional[int] = Query(default=None, ge=0),
+                  page_cursor: Optional[str] = Query(
+                      default=None, alias='cursor',
+                      description="Значение 'next_cursor' из предыдущего ответа"),
+                  filters: TaskFilters = Depends(task_filters)) -> Response:
     """
-    Получаем информацию о всех задачах.\n
-    При отсутствии задач, получим ошибку 404.
+    Получаем информацию о задачах постранично.\n
+    Фильтры: category, created_after (включительно), created_before (не включительно).\n
+    Сортировка sort: id, -id, creation_date, -creation_date ('-' - по убыванию).\n
+    Следующая страница запрашивается с параметром cursor из поля next_cursor ответа
+    и теми же фильтрами (или after_id - id последней полученной задачи при sort=id).\n
+    При отсутствии задач, получим ошибку 404.\n
+    Если с прошлого запроса задачи не менялись (If-None-Match), возвращается 304 без тела.
     """
-    data: list = await db_service.get_all(cursor)
+    columns = SORT_KEYS[filters.sort.lstrip('-')]
+    after = None
+    if page_cursor is not None:
+        if after_id is not None:
+            raise HTTPException(400, detail='Укажите только один параметр: cursor или after_id')
+        after = decode_page_key(page_cursor, filters.sort, columns)
+    elif after_id is not None:
+        if filters.sort != 'id':
+            raise HTTPException(400, detail='after_id можно указать только при sort=id')
+        after = {'id': after_id}
+
+    # Версия таблицы читается до выборки: если задачи изменятся между запросами,
+    # страница получит устаревший ETag и следующий запрос ее перечитает
+    headers = None
+    table_version = await repository.table_version()
+    if table_version is not None:
+        version, updated_at = table_version
+        etag = list_etag(version, filters.model_dump_json(), after, limit)
+        headers = validators(etag, updated_at)
+        if not_modified(request.headers, headers['ETag'], updated_at):
+            return not_modified_response(headers)
+
+    data, next_key = await repository.get_all(limit, after, filters)
 
     # Формируем response, преобразовываем в json и отправляем.
-    response_data = {'data': data}
-    json_data = jsonable_encoder(response_data)
-    return JSONResponse(content=json_data)
+    next_cursor = encode_page_key(next_key, filters.sort) if next_key is not None else None
+    response_data = {'data': data, 'next_cursor': next_cursor}
+    return FastJSONResponse(content=response_data, headers=headers)
 
 
 @router.put("/{task_id}",
@@ -96,19 +367,18 @@ async def get_all(cursor=Depends(db.get_cursor)) -> Response:
                 409: {"model": ErrorMessage},
                 200: {"model": SuccessMessage},
             })
-async def update(data: TaskValidation, task_id: int, cursor=Depends(db.get_cursor)) -> Response:
+async def update(data: TaskValidation, task_id: int) -> Response:
     """
     Обновляет информацию о задаче с заданным id\n
     Поле taskname обязательно и должно быть уникальным.\n
     При отсутствии задачи с таким id, получим ошибку 404
     """
     # Создаем запись в базе данных.
-    await db_service.update(cursor, data, task_id)
+    await repository.update(data, task_id)
 
     # Формируем response, преобразовываем в json и отправляем.
     response_data = {'detail': 'Task updated successfully'}
-    json_data = jsonable_encoder(response_data)
-    return JSONResponse(content=json_data)
+    return FastJSONResponse(content=response_data)
 
 
 @router.delete("/{task_id}",
@@ -118,9 +388,9 @@ async def update(data: TaskValidation, task_id: int, cursor=Depends(db.get_curso
                responses={
                    404: {"model": ErrorMessage}
                })
-async def delete(task_id: int, cursor=Depends(db.get_cursor)) -> None:
+async def delete(task_id: int) -> None:
     """
     Удаляет задачу с заданным id.\n
     При отсутствии задачи с таким id, получим ошибку 404.
     """
-    await db_service.delete(cursor, task_id)
+    await repository.delete(task_id)
@@ -0,0 +1,123 @@
+"""
+Компактное представление строк результата запроса
+
+Вместо словаря на каждую строку ('dict(zip(columns, row))') строка хранится в объекте
+класса со '__slots__', который создается один раз для каждого набора столбцов
+(результата запроса) и кэшируется. Объект занимает в несколько раз меньше памяти,
+чем словарь, и сериализуется orjson напрямую, как dataclass.
+
+Для совместимости строка поддерживает чтение как словарь: row['id'], row.get(...),
+dict(row), сравнение со словарем.
+"""
+
+import dataclasses
+import keyword
+import threading
+from itertools import starmap
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.profiling import phase
+
+
+class Row:
+    """
+    Базовый класс строк. Поля задаются в подклассах, созданных 'row_type'.
+    """
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self._fields else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def values(self) -> List[Any]:
+        return [getattr(self, name) for name in self._fields]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(name, getattr(self, name)) for name in self._fields]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._fields
+
+    def _asdict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Row, dict)):
+            return self._asdict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __reduce__(self) -> Tuple[Callable[..., 'Row'], Tuple[Any, ...]]:
+        # Классы строк создаются динамически, поэтому pickle (кэш в Redis)
+        # восстанавливает строку по набору столбцов
+        return make_row, (self._fields, tuple(self.values()))
+
+
+_types: Dict[Tuple[str, ...], Callable[..., Any]] = {}
+_lock = threading.Lock()
+
+
+def _dict_type(columns: Tuple[str, ...]) -> Callable[..., Dict[str, Any]]:
+    return lambda *values: dict(zip(columns, values))
+
+
+def row_type(columns: Sequence[str]) -> Callable[..., Any]:
+    """
+    Возвращает класс строки для набора столбцов, создает его при первом обращении.
+    Если имена столбцов нельзя использовать как атрибуты, строки остаются словарями.
+    """
+    columns = tuple(columns)
+    factory = _types.get(columns)
+    if factory is not None:
+        return factory
+
+    with _lock:
+        factory = _types.get(columns)
+        if factory is None:
+            if all(name.isidentifier() and not keyword.iskeyword(name)
+                   and not name.startswith('_') for name in columns) \
+                    and len(set(columns)) == len(columns):
+                factory = dataclasses.make_dataclass(
+                    'TaskRow', columns, bases=(Row,), slots=True, eq=False)
+                factory._fields = columns  # type: ignore[attr-defined]
+            else:
+                factory = _dict_type(columns)
+            _types[columns] = factory
+    return factory
+
+
+def make_row(columns: Sequence[str], values: Sequence[Any]) -> Any:
+    """
+    Создает одну строку из имен столбцов и значений.
+    """
+    return row_type(columns)(*values)
+
+
+def columns_of(description: Optional[Sequence[Sequence[Any]]]) -> Tuple[str, ...]:
+    """
+    Имена столбцов из 'cursor.description'.
+    """
+    return tuple(column[0] for column in description or ())
+
+
+def make_rows(description: Sequence[Sequence[Any]], rows: Iterable[Sequence[Any]]) -> List[Any]:
+    """
+    Преобразует кортежи, полученные из курсора, в строки.
+    """
+    with phase('rows'):
+        return list(starmap(row_type(columns_of(description)), rows))
@@ -2,9 +2,10 @@
 Создаем модели данных для валидации pydantic
 """
 
-from typing import Optional, List
+from datetime import datetime
+from typing import Literal, Optional, List
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 PATTERN = r'^[a-zA-Zа-яА-Я0-9 _]+$'
 
@@ -23,6 +24,21 @@ class TaskValidation(BaseModel):
         examples=['Hobby', 'Study'])
 
 
+# Допустимые порядки сортировки списка задач, '-' - по убыванию
+SortOrder = Literal['id', '-id', 'creation_date', '-creation_date']
+
+
+class TaskFilters(BaseModel):
+    """
+    Фильтры и сортировка списка задач.
+    Интервал дат полуоткрытый: created_after <= creation_date < created_before.
+    """
+    category: Optional[str] = Field(default=None, max_length=100, pattern=PATTERN)
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    sort: SortOrder = 'id'
+
+
 class TaskView(BaseModel):
     """
     Схема отображения задания.
@@ -32,13 +48,81 @@ class TaskView(BaseModel):
     description: str = Field(examples=['Draw a picture', 'Do homework'], default=None)
     category: str = Field(examples=['Hobby', 'Study'], default=None)
     creation_date: str = Field(examples=["2023-12-11T19:35:46"])
+    version: int = Field(examples=[1], default=None,
+                         description='Версия задачи, растет при каждом изменении')
+    updated_at: str = Field(examples=["2023-12-11T19:35:46.123456"], default=None)
 
 class TasksListResponse(BaseModel):
     data: List[TaskView]
+    next_cursor: Optional[str] = Field(
+        default=None, examples=['eyJpZCI6MTAwfQ'],
+        description='Курсор следующей страницы, null - страница последняя')
+
+class SearchHit(TaskView):
+    score: float = Field(examples=[1.73], description='Релевантность, больше - лучше')
+
+class SearchResponse(BaseModel):
+    data: List[SearchHit]
+    next_cursor: Optional[str] = Field(
+        default=None, examples=['eyJzb3J0Ijoic2VhcmNoIn0'],
+        description='Курсор следующей страницы, null - страница последняя')
 
 class TaskResponse(BaseModel):
     data: TaskView
 
+class BulkItemResult(BaseModel):
+    """
+    Результат обработки одного элемента пакетного запроса.
+    """
+    index: int = Field(examples=[0], description='Позиция элемента в запросе')
+    status: int = Field(examples=[201, 409])
+    detail: str = Field(examples=['Task created successfully'])
+
+class BulkCreateResponse(BaseModel):
+    created: int = Field(examples=[99])
+    failed: int = Field(examples=[1])
+    data: List[BulkItemResult]
+
+class BulkSelection(BaseModel):
+    """
+    Выбор задач для пакетного изменения: список id или категория.
+    """
+    ids: Optional[List[int]] = Field(default=None, min_length=1, examples=[[1, 2, 3]])
+    category: Optional[str] = Field(
+        default=None, max_length=100, pattern=PATTERN, examples=['Hobby'],
+        description='Все задачи с этой категорией')
+
+    @model_validator(mode='after')
+    def check_selection(self):
+        if (self.ids is None) == (self.category is None):
+            raise ValueError("Укажите одно из полей: 'ids' или 'category'")
+        return self
+
+class BulkChanges(BaseModel):
+    """
+    Новые значения полей при пакетном обновлении (taskname уникален и не меняется).
+    """
+    description: Optional[str] = Field(
+        default=None, max_length=500, pattern=PATTERN, examples=['Do homework'])
+    category: Optional[str] = Field(
+        default=None, max_length=100, pattern=PATTERN, examples=['Study'])
+
+    @model_validator(mode='after')
+    def check_changes(self):
+        if not self.model_fields_set:
+            raise ValueError('Не указано ни одного изменяемого поля')
+        return self
+
+class BulkDelete(BulkSelection):
+    pass
+
+class BulkUpdate(BulkSelection):
+    changes: BulkChanges
+
+class BulkChangeResponse(BaseModel):
+    affected: int = Field(examples=[2])
+    missing_ids: List[int] = Field(examples=[[3]], description='Не найденные id')
+
 class ErrorMessage(BaseModel):
     detail: str = Field(examples=['Error description'])
 
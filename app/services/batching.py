@@ -0,0 +1,188 @@
+"""
+Объединение создания задач в пачки (config.batching)
+
+POST /tasks/ не выполняет INSERT и фиксацию транзакции сам: задача ставится в очередь
+процесса, фоновая задача собирает из очереди пачку (не больше 'max_rows' задач, не дольше
+'max_delay_ms' после первой) и вставляет ее одним многострочным INSERT в одной транзакции
+('TaskRepository.create_bulk'). Каждый запрос получает свой результат: 201 или 409, если
+название занято (в том числе задачей, стоящей раньше в той же пачке).
+
+Под нагрузкой одна фиксация приходится на пачку, а не на задачу. Задержка ограничена:
+запрос ждет не больше 'max_delay_ms' и записи одной пачки, а при переполнении очереди
+сразу получает 503.
+"""
+
+import asyncio
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.config import BatchingConfig
+from app.logger import db_log
+from app.metrics import CREATE_BATCH_ROWS
+from app.pool import PoolStats
+from app.schemes.task import TaskFilters, TaskValidation
+from app.services.repository import Page, StorageStatus, TaskRepository
+from app.statements import StatementStats
+
+# Задача и ожидающий ее результата запрос
+Pending = Tuple[TaskValidation, 'asyncio.Future[None]']
+
+
+class BatchingRepository(TaskRepository):
+    """
+    Хранилище, объединяющее 'create' в пачки. Остальные методы выполняет 'inner'.
+    Пока фоновая задача не запущена ('start') или уже остановлена ('drain'),
+    задачи создаются по одной.
+    """
+
+    def __init__(self, inner: TaskRepository, batching_config: BatchingConfig):
+        self.inner = inner
+        self.max_rows = max(1, batching_config.max_rows)
+        self.max_delay = batching_config.max_delay_ms / 1000
+        self.max_queue = batching_config.max_queue
+        # Очередь задач, None - метка остановки ('drain')
+        self._queue: Optional['asyncio.Queue[Optional[Pending]]'] = None
+        self._flusher: Optional['asyncio.Task[None]'] = None
+
+    def __repr__(self) -> str:
+        return f'BatchingRepository({self.inner!r}, max_rows={self.max_rows})'
+
+    @property
+    def cache(self) -> Optional[Any]:  # type: ignore[override]
+        return self.inner.cache
+
+    async def start(self) -> bool:
+        self._queue = asyncio.Queue(self.max_queue)
+        self._flusher = asyncio.create_task(self._run(self._queue))
+        return await self.inner.start()
+
+    async def monitor(self) -> None:
+        await self.inner.monitor()
+
+    async def drain(self) -> None:
+        """
+        Записывает задачи, оставшиеся в очереди, и останавливает фоновую задачу.
+        """
+        queue, flusher = self._queue, self._flusher
+        if queue is None or flusher is None:
+            return
+        # Новые задачи создаются по одной, фоновая задача записывает очередь
+        # до метки остановки (None) без ожидания 'max_delay_ms' и завершается
+        self._queue = None
+        await queue.put(None)
+        await flusher
+        self._flusher = None
+        await self.inner.drain()
+
+    def close(self) -> None:
+        self.inner.close()
+
+    def status(self) -> StorageStatus:
+        return self.inner.status()
+
+    def pool_stats(self) -> Optional[PoolStats]:
+        return self.inner.pool_stats()
+
+    def statement_stats(self) -> Optional[StatementStats]:
+        return self.inner.statement_stats()
+
+    async def create(self, data: TaskValidation) -> None:
+        queue = self._queue
+        if queue is None:
+            await self.inner.create(data)
+            return
+
+        future: 'asyncio.Future[None]' = asyncio.get_running_loop().create_future()
+        try:
+            queue.put_nowait((data, future))
+        except asyncio.QueueFull as e:
+            db_log.warning('Очередь создания задач переполнена: %s', queue.qsize())
+            raise HTTPException(503, detail='Очередь записи переполнена') from e
+        await future
+
+    async def _run(self, queue: 'asyncio.Queue[Optional[Pending]]') -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_rows:
+                # Сначала забираем задачи, уже стоящие в очереди
+                if not queue.empty():
+                    item = queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    await self._flush(batch)
+                    return
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Pending]) -> None:
+        CREATE_BATCH_ROWS.observe(len(batch))
+        try:
+            results = await self.inner.create_bulk([data for data, _ in batch], len(batch))
+        except Exception as e:  # pylint: disable=broad-except
+            if not isinstance(e, HTTPException):
+                db_log.error('Не удалось записать пачку задач: %s', e)
+            for _, future in batch:
+                if not future.done():
+                    # Каждому запросу - свое исключение: трассировки не смешиваются
+                    future.set_exception(
+                        HTTPException(e.status_code, detail=e.detail, headers=e.headers)
+                        if isinstance(e, HTTPException)
+                        else HTTPException(500, detail='Unknown database error'))
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Запрос мог быть отменен (клиент отключился), задача все равно создана
+            if future.done():
+                continue
+            if result['status'] == 201:
+                future.set_result(None)
+            else:
+                future.set_exception(HTTPException(result['status'], detail=result['detail']))
+
+    async def create_bulk(self, items: List[TaskValidation],
+                          chunk_size: int) -> List[Dict[str, Any]]:
+        return await self.inner.create_bulk(items, chunk_size)
+
+    async def update_bulk(self, changes: Dict[str, Any], ids: Optional[List[int]],
+                          category: Optional[str], chunk_size: int) -> Dict[str, Any]:
+        return await self.inner.update_bulk(changes, ids, category, chunk_size)
+
+    async def delete_bulk(self, ids: Optional[List[int]], category: Optional[str],
+                          chunk_size: int) -> Dict[str, Any]:
+        return await self.inner.delete_bulk(ids, category, chunk_size)
+
+    async def get_all(self, limit: int, after: Optional[Dict[str, Any]] = None,
+                      filters: Optional[TaskFilters] = None) -> Page:
+        return await self.inner.get_all(limit, after, filters)
+
+    async def search(self, query: str, limit: int,
+                     after: Optional[Dict[str, Any]] = None) -> Page:
+        return await self.inner.search(query, limit, after)
+
+    async def get_one(self, task_id: int) -> Any:
+        return await self.inner.get_one(task_id)
+
+    async def table_version(self) -> Optional[Tuple[int, Any]]:
+        return await self.inner.table_version()
+
+    async def update(self, data: TaskValidation, task_id: int) -> None:
+        await self.inner.update(data, task_id)
+
+    async def delete(self, task_id: int) -> None:
+        await self.inner.delete(task_id)
+
+    def iter_all(self, batch_size: int) -> Generator[List[Any], None, None]:
+        return self.inner.iter_all(batch_size)
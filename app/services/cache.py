@@ -0,0 +1,222 @@
+"""
+Кэш записей для TaskService.get_one
+
+Чтобы в кэш не попала строка, прочитанная до фиксации удаления или изменения,
+у каждого ключа есть версия. Читающий запоминает версию до обращения к базе данных
+и сохраняет результат, только если версия не изменилась.
+Пишущий сбрасывает ключ (увеличивает версию) до изменения и еще раз после фиксации транзакции.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from app.config import CacheConfig
+from app.logger import db_log
+
+MEMORY = 'memory'
+REDIS = 'redis'
+NONE = 'none'
+
+
+@dataclass
+class CacheStats:
+    """Счетчики кэша"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    size: Optional[int] = None
+
+
+class LRUCache:
+    """
+    Кэш в памяти процесса: ограничен по размеру (вытесняются давно неиспользуемые ключи)
+    и по времени жизни записи.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._data: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        # Версии сброшенных ключей. Версии выдаются из общего счетчика,
+        # для отсутствующих ключей действует версия '_floor'
+        self._versions: Dict[str, int] = {}
+        self._counter = 0
+        self._floor = 0
+        self._stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Возвращает значение или None, если ключа нет или срок его жизни истек.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+
+            expires, value = entry
+            if expires <= self.clock():
+                del self._data[key]
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def version(self, key: str) -> int:
+        """
+        Текущая версия ключа, запоминается перед чтением из базы данных.
+        """
+        with self._lock:
+            return self._versions.get(key, self._floor)
+
+    def set(self, key: str, value: Any, version: int) -> bool:
+        """
+        Сохраняет значение, если версия ключа не изменилась с момента 'version()'.
+
+        Returns:
+            bool: True, если значение сохранено.
+        """
+        with self._lock:
+            if self._versions.get(key, self._floor) != version:
+                return False
+
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._stats.evictions += 1
+            return True
+
+    def invalidate(self, key: str) -> None:
+        """
+        Удаляет ключ и меняет его версию.
+        """
+        with self._lock:
+            self._counter += 1
+            self._versions[key] = self._counter
+            if len(self._versions) > self.max_size:
+                # Поднимаем версию всех ключей разом, чтобы словарь версий не рос
+                self._versions.clear()
+                self._floor = self._counter
+            self._data.pop(key, None)
+            self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        """
+        Удаляет все ключи.
+        """
+        with self._lock:
+            self._counter += 1
+            self._floor = self._counter
+            self._versions.clear()
+            self._data.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**{**self._stats.__dict__, 'size': len(self._data)})
+
+
+class RedisCache:
+    """
+    Кэш в Redis (или совместимом хранилище), общий для нескольких процессов.
+    Версия ключа хранится в Redis рядом со значением и проверяется при чтении.
+
+    Args:
+        client: Клиент с методами get, mget, set(px=...), incr, expire, delete.
+    """
+
+    def __init__(self, client: Any, ttl: float = 60.0, prefix: str = 'task_hub:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def _keys(self, key: str) -> Tuple[str, str]:
+        return f'{self.prefix}{key}', f'{self.prefix}version:{key}'
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self._stats, counter, getattr(self._stats, counter) + 1)
+
+    def get(self, key: str) -> Optional[Any]:
+        data_key, version_key = self._keys(key)
+        raw, current = self.client.mget([data_key, version_key])
+        if raw is None:
+            self._count('misses')
+            return None
+
+        version, value = pickle.loads(raw)
+        if version != int(current or 0):
+            # Значение сохранено читающим, который разминулся со сбросом ключа
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        return value
+
+    def version(self, key: str) -> int:
+        return int(self.client.get(self._keys(key)[1]) or 0)
+
+    def set(self, key: str, value: Any, version: int) -> bool:
+        data_key, _ = self._keys(key)
+        # Время жизни в миллисекундах: 'ex' в секундах округлял бы ttl < 1 до 0
+        self.client.set(data_key, pickle.dumps((version, value)), px=int(self.ttl * 1000))
+        return True
+
+    def invalidate(self, key: str) -> None:
+        data_key, version_key = self._keys(key)
+        self.client.incr(version_key)
+        # Версия должна жить дольше любого значения, сохраненного с предыдущей версией
+        self.client.expire(version_key, int(self.ttl) + 60)
+        self.client.delete(data_key)
+        self._count('invalidations')
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**self._stats.__dict__)
+
+
+def create_cache(cache_config: CacheConfig, workers: int = 1) -> Optional[Any]:
+    """
+    Создает кэш по настройкам, для backend 'none' возвращает None.
+    Кэш в памяти процесса не сбрасывается изменениями в других рабочих процессах,
+    поэтому при 'workers' > 1 он отключается.
+    """
+    if cache_config.backend == NONE:
+        return None
+
+    if cache_config.backend == MEMORY and workers > 1:
+        db_log.warning("Кэш 'memory' отключен: рабочих процессов %s, используйте 'redis'",
+                       workers)
+        return None
+
+    cache: Union[LRUCache, RedisCache]
+    if cache_config.backend == MEMORY:
+        cache = LRUCache(max_size=cache_config.max_size, ttl=cache_config.ttl)
+
+    elif cache_config.backend == REDIS:
+        # Необязательная зависимость, нужна только для этого режима
+        # pylint: disable-next=import-outside-toplevel
+        import redis  # type: ignore[import-untyped]
+        cache = RedisCache(redis.Redis.from_url(cache_config.redis_url),
+                           ttl=cache_config.ttl, prefix=cache_config.redis_prefix)
+
+    else:
+        raise ValueError(f'Неизвестный тип кэша: {cache_config.backend}')
+
+    db_log.debug('Cache created: %s', cache)
+    return cache
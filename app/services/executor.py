@@ -0,0 +1,61 @@
+"""
+Выполнение блокирующих запросов к базе данных вне цикла событий
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.logger import db_log
+
+INLINE = 'inline'
+THREADPOOL = 'threadpool'
+
+
+class QueryExecutor:
+    """
+    Выполняет синхронные функции работы с базой данных.
+
+    В режиме 'threadpool' функция выполняется в ограниченном пуле потоков,
+    и медленный запрос не блокирует цикл событий uvicorn.
+    В режиме 'inline' функция вызывается прямо в цикле событий (прежнее поведение).
+    """
+
+    def __init__(self, mode: str = THREADPOOL, max_workers: int = 10):
+        if mode not in (INLINE, THREADPOOL):
+            raise ValueError(f'Неизвестный режим выполнения запросов: {mode}')
+
+        self.mode = mode
+        self._pool: Optional[ThreadPoolExecutor] = None
+        if mode == THREADPOOL:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='db-query')
+        db_log.debug('QueryExecutor created: mode=%s, workers=%s', mode, max_workers)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Выполняет 'func(*args)' и возвращает результат.
+        Контекстные переменные запроса передаются в поток.
+        """
+        if self._pool is None:
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, func, *args)
+        future = loop.run_in_executor(self._pool, call)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Поток нельзя прервать: дожидаемся завершения запроса,
+            # чтобы соединение не вернулось в пул, пока курсор еще используется
+            await asyncio.wait([future])
+            raise
+
+    def shutdown(self) -> None:
+        """
+        Останавливает пул потоков.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
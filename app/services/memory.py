@@ -0,0 +1,327 @@
+"""
+Хранилище задач в памяти процесса (config.storage.backend = 'memory')
+
+Для разработки, тестов и небольших установок без базы данных. Данные теряются
+при перезапуске и не видны другим рабочим процессам.
+
+Задача хранится кортежем в порядке столбцов 'COLUMNS'. Индексы:
+    id       - словарь id -> задача и отсортированный список id (порядок и keyset-страницы);
+    taskname - уникальный словарь название -> id (409 при повторе);
+    category - категория -> отсортированный список id задач категории.
+
+Даты создания не убывают с ростом id, поэтому порядок (creation_date, id) совпадает
+с порядком id, и страницы по обеим сортировкам и фильтры по датам находятся
+двоичным поиском в списке id: O(log n + limit), без просмотра таблицы.
+"""
+
+import bisect
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.logger import db_log
+from app.rows import row_type
+from app.schemes.task import TaskFilters, TaskValidation
+from app.services.repository import (COLUMNS, CREATED, DUPLICATE, EXPORT_COLUMNS, SORT_KEYS,
+                                     Page, StorageStatus, TaskRepository, list_page, split_ids,
+                                     timed, utc)
+from app.services.search import InvertedIndex, split_page
+
+NAMES = tuple(COLUMNS.split(', '))
+ID, TASKNAME, DESCRIPTION, CATEGORY, CREATION_DATE, VERSION, UPDATED_AT = range(len(NAMES))
+EXPORT = len(EXPORT_COLUMNS.split(', '))
+
+Task = Tuple[Any, ...]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _position(ids: List[int], key: Callable[[int], Any], value: Any, right: bool = False) -> int:
+    search = bisect.bisect_right if right else bisect.bisect_left
+    return search(ids, value, key=key)
+
+
+class MemoryRepository(TaskRepository):
+    """
+    Хранилище задач в памяти процесса. Изменения атомарны (общая блокировка),
+    повторы названий и ответы на отсутствующие задачи - как у MySQLRepository.
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = _now):
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._tasks: Dict[int, Task] = {}
+        self._ids: List[int] = []
+        self._names: Dict[str, int] = {}
+        self._categories: Dict[Optional[str], List[int]] = defaultdict(list)
+        self._search = InvertedIndex()
+        self._last_id = 0
+        self._last_created = datetime.min
+        # Версия таблицы для ETag списков
+        self._version = 0
+        self._updated_at = clock()
+        self._row = row_type(NAMES)
+        self._export_row = row_type(NAMES[:EXPORT])
+        self._hit = row_type(NAMES + ('score',))
+        db_log.debug('MemoryRepository created')
+
+    def status(self) -> StorageStatus:
+        return StorageStatus(ready=True, reachable=True)
+
+    # Индексы. Вызываются под блокировкой
+
+    def _changed(self, now: datetime, count: int = 1) -> None:
+        self._version += count
+        self._updated_at = now
+
+    def _insert(self, data: TaskValidation, now: datetime) -> int:
+        self._last_id += 1
+        task_id = self._last_id
+        # Дата создания с точностью до секунды, как TIMESTAMP в MySQL, и не убывает
+        self._last_created = max(self._last_created, now.replace(microsecond=0))
+        self._tasks[task_id] = (task_id, data.taskname, data.description, data.category,
+                                self._last_created, 1, now)
+        self._ids.append(task_id)
+        self._names[data.taskname] = task_id
+        self._categories[data.category].append(task_id)
+        self._search.add(task_id, f'{data.taskname} {data.description or ""}')
+        return task_id
+
+    def _replace(self, task: Task, changes: Dict[str, Any], now: datetime) -> bool:
+        """
+        Изменяет столбцы задачи. Версия задачи растет, только если данные изменились.
+
+        Returns:
+            bool: Изменились ли данные.
+        """
+        values = list(task)
+        for column, value in changes.items():
+            values[NAMES.index(column)] = value
+        if values[TASKNAME:CREATION_DATE] == list(task[TASKNAME:CREATION_DATE]):
+            return False
+
+        task_id = task[ID]
+        values[VERSION] = task[VERSION] + 1
+        values[UPDATED_AT] = now
+        if values[TASKNAME] != task[TASKNAME]:
+            del self._names[task[TASKNAME]]
+            self._names[values[TASKNAME]] = task_id
+        if values[CATEGORY] != task[CATEGORY]:
+            self._unlink(self._categories, task[CATEGORY], task_id)
+            bisect.insort(self._categories[values[CATEGORY]], task_id)
+        self._tasks[task_id] = tuple(values)
+        self._search.add(task_id, f'{values[TASKNAME]} {values[DESCRIPTION] or ""}')
+        return True
+
+    def _remove(self, task_id: int) -> None:
+        task = self._tasks.pop(task_id)
+        del self._ids[bisect.bisect_left(self._ids, task_id)]
+        del self._names[task[TASKNAME]]
+        self._unlink(self._categories, task[CATEGORY], task_id)
+        self._search.remove(task_id)
+
+    @staticmethod
+    def _unlink(index: Dict[Optional[str], List[int]], key: Optional[str], task_id: int) -> None:
+        ids = index[key]
+        del ids[bisect.bisect_left(ids, task_id)]
+        if not ids:
+            del index[key]
+
+    # Изменения
+
+    def _create(self, data: TaskValidation) -> None:
+        with self._lock:
+            if data.taskname in self._names:
+                db_log.debug('Task с таким названием уже существует: %s', data.taskname)
+                raise HTTPException(409, detail=DUPLICATE)
+            now = self.clock()
+            self._insert(data, now)
+            self._changed(now)
+
+    def _create_bulk(self, items: List[TaskValidation]) -> List[Dict[str, Any]]:
+        results = []
+        with self._lock:
+            now = self.clock()
+            created = 0
+            for index, item in enumerate(items):
+                # Повтор названия внутри запроса - такой же конфликт, как с существующей задачей
+                if item.taskname in self._names:
+                    results.append({'index': index, 'status': 409, 'detail': DUPLICATE})
+                    continue
+                self._insert(item, now)
+                created += 1
+                results.append({'index': index, 'status': 201, 'detail': CREATED})
+            if created:
+                self._changed(now, created)
+        return results
+
+    def _found(self, ids: Optional[List[int]], category: Optional[str],
+               missing: List[int]) -> List[int]:
+        if ids is not None:
+            return split_ids(ids, self._tasks, missing)
+        return list(self._categories.get(category, ()))
+
+    def _update_bulk(self, changes: Dict[str, Any], ids: Optional[List[int]],
+                     category: Optional[str]) -> Dict[str, Any]:
+        missing: List[int] = []
+        with self._lock:
+            found = self._found(ids, category, missing)
+            now = self.clock()
+            changed = sum(self._replace(self._tasks[task_id], changes, now) for task_id in found)
+            if changed:
+                self._changed(now, changed)
+        return {'affected': len(found), 'missing_ids': missing}
+
+    def _delete_bulk(self, ids: Optional[List[int]], category: Optional[str]) -> Dict[str, Any]:
+        missing: List[int] = []
+        with self._lock:
+            found = self._found(ids, category, missing)
+            for task_id in found:
+                self._remove(task_id)
+            if found:
+                self._changed(self.clock(), len(found))
+        return {'affected': len(found), 'missing_ids': missing}
+
+    def _update(self, data: TaskValidation, task_id: int) -> None:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is not None and self._names.get(data.taskname, task_id) != task_id:
+                db_log.debug('Task с таким названием уже существует: %s', data.taskname)
+                raise HTTPException(409, detail='Task already exist')
+
+            now = self.clock()
+            # Как и в MySQL, задача без изменений не считается обновленной
+            if task is None or not self._replace(task, data.model_dump(), now):
+                db_log.debug('Количество обновленных строк на равно 1')
+                raise HTTPException(400, detail='Задач обновлено: 0')
+            self._changed(now)
+
+    def _delete(self, task_id: int) -> None:
+        with self._lock:
+            if task_id not in self._tasks:
+                db_log.debug("Task not found, task_id: %s", task_id)
+                raise HTTPException(404, detail='Task not found')
+            self._remove(task_id)
+            self._changed(self.clock())
+
+    # Чтение
+
+    def _get_one(self, task_id: int) -> List[Any]:
+        task = self._tasks.get(task_id)
+        if task is None:
+            db_log.debug("Task not found, task_id: %s", task_id)
+            raise HTTPException(404, detail='Task not found')
+        return [self._row(*task)]
+
+    def _get_all(self, limit: int, after: Optional[Dict[str, Any]],
+                 filters: TaskFilters) -> Page:
+        descending = filters.sort.startswith('-')
+        columns = SORT_KEYS[filters.sort.lstrip('-')]
+        tasks = self._tasks
+
+        def by_date(task_id: int) -> datetime:
+            return tasks[task_id][CREATION_DATE]
+
+        def by_key(task_id: int) -> Tuple[Any, ...]:
+            task = tasks[task_id]
+            return (task[CREATION_DATE], task_id) if len(columns) == 2 else (task_id,)
+
+        with self._lock:
+            if filters.category is not None:
+                ids = self._categories.get(filters.category, [])
+            else:
+                ids = self._ids
+
+            # Границы фильтра по датам и ключа страницы в списке, упорядоченном по id
+            low, high = 0, len(ids)
+            if filters.created_after is not None:
+                low = _position(ids, by_date, utc(filters.created_after))
+            if filters.created_before is not None:
+                high = _position(ids, by_date, utc(filters.created_before))
+            if after is not None:
+                value = tuple(after[column] for column in columns)
+                if descending:
+                    high = min(high, _position(ids, by_key, value))
+                else:
+                    low = max(low, _position(ids, by_key, value, right=True))
+
+            # На одну запись больше, чтобы узнать, есть ли следующая страница
+            if descending:
+                page = ids[max(low, high - limit - 1):high][::-1]
+            else:
+                page = ids[low:min(high, low + limit + 1)] if low < high else []
+            rows = [self._row(*tasks[task_id]) for task_id in page]
+
+        return list_page(rows, limit, after, filters)
+
+    def _search_page(self, query: str, limit: int, after: Optional[Dict[str, Any]]) -> Page:
+        key = (after['score'], after['id']) if after is not None else None
+        with self._lock:
+            found = self._search.search(query, limit + 1, key)
+            hits = [self._hit(*self._tasks[task_id], score) for score, task_id in found]
+        if not hits:
+            return [], None
+        return split_page(hits, limit)
+
+    def _table_version(self) -> Tuple[int, Any]:
+        with self._lock:
+            return self._version, self._updated_at
+
+    # Интерфейс хранилища. Одиночные операции - микросекунды, выполняются в цикле событий,
+    # пакетные - в пуле потоков
+
+    async def create(self, data: TaskValidation) -> None:
+        timed('create', self._create, data)
+
+    async def create_bulk(self, items: List[TaskValidation],
+                          chunk_size: int) -> List[Dict[str, Any]]:
+        return await run_in_threadpool(timed, 'create_bulk', self._create_bulk, items)
+
+    async def update_bulk(self, changes: Dict[str, Any], ids: Optional[List[int]],
+                          category: Optional[str], chunk_size: int) -> Dict[str, Any]:
+        return await run_in_threadpool(timed, 'update_bulk', self._update_bulk, changes,
+                                       ids, category)
+
+    async def delete_bulk(self, ids: Optional[List[int]], category: Optional[str],
+                          chunk_size: int) -> Dict[str, Any]:
+        return await run_in_threadpool(timed, 'delete_bulk', self._delete_bulk, ids, category)
+
+    async def get_all(self, limit: int, after: Optional[Dict[str, Any]] = None,
+                      filters: Optional[TaskFilters] = None) -> Page:
+        return timed('get_all', self._get_all, limit, after, filters or TaskFilters())
+
+    async def search(self, query: str, limit: int,
+                     after: Optional[Dict[str, Any]] = None) -> Page:
+        return timed('search', self._search_page, query, limit, after)
+
+    async def get_one(self, task_id: int) -> Any:
+        return timed('get_one', self._get_one, task_id)[0]
+
+    async def table_version(self) -> Optional[Tuple[int, Any]]:
+        return timed('table_version', self._table_version)
+
+    async def update(self, data: TaskValidation, task_id: int) -> None:
+        timed('update', self._update, data, task_id)
+
+    async def delete(self, task_id: int) -> None:
+        timed('delete', self._delete, task_id)
+
+    def iter_all(self, batch_size: int) -> Generator[List[Any], None, None]:
+        last_id = 0
+        while True:
+            # Блокировка берется на одну пачку: изменения между пачками видны в выгрузке,
+            # как при чтении небуферизованным курсором
+            with self._lock:
+                start = bisect.bisect_right(self._ids, last_id)
+                batch = [self._export_row(*self._tasks[task_id][:EXPORT])
+                         for task_id in self._ids[start:start + batch_size]]
+            if not batch:
+                return
+            last_id = batch[-1]['id']
+            yield batch
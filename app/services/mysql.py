@@ -1,40 +1,159 @@
 """
 Модуль взаимодействия с базой данный Mysql
 """
-from typing import List, Dict, Any
+import asyncio
+from contextlib import contextmanager
+from functools import partial
+from itertools import starmap
+from typing import (List, Dict, Any, Callable, Generator, Iterator, Optional, Protocol,
+                    Sequence, Tuple, cast)
 
 from mysql.connector import IntegrityError
-from mysql.connector.cursor import CursorBase
 from fastapi import HTTPException
 
+from app.config import config
+from app.database import DB, on_commit
 from app.logger import db_log
-from app.schemes.task import TaskValidation
+from app.metrics import QUERY_LATENCY, QUERY_ROWS
+from app.pool import PoolStats
+from app.profiling import execute
+from app.replicas import ReplicaSet, create_replicas
+from app.rows import columns_of, make_rows, row_type
+from app.schemes.task import TaskFilters, TaskValidation
+from app.services.executor import QueryExecutor
+from app.services.repository import (COLUMNS, CREATED, DUPLICATE, EXPORT_COLUMNS, SORT_KEYS,
+                                     Page, StorageStatus, TaskRepository, list_page, split_ids,
+                                     timed, utc)
+from app.services.search import MySQLSearch
+from app.statements import StatementStats
+
+# Под каждый порядок сортировки 'SORT_KEYS' (в том числе с фильтром по категории)
+# есть составной индекс в init.sql
+
+
+class Cursor(Protocol):
+    """
+    Курсор, с которым работают запросы TaskService: курсор mysql-connector
+    или app.services.sqlite.Cursor. Запросы выполняются через app.profiling.execute.
+    """
+
+    @property
+    def description(self) -> Optional[Sequence[Any]]: ...
+
+    @property
+    def rowcount(self) -> int: ...
+
+    @property
+    def lastrowid(self) -> Optional[int]: ...
+
+    def fetchall(self) -> List[Any]: ...
+
+    def fetchmany(self, size: int) -> List[Any]: ...
+
+    def fetchone(self) -> Optional[Any]: ...
+
+
+def bump_table_version(cursor: Cursor) -> None:
+    """
+    Увеличивает версию таблицы 'tasks' (ETag списков) один раз за транзакцию.
+    Строка 'table_versions' общая для всех изменяющих запросов и заблокирована
+    до фиксации транзакции, поэтому запрос выполняется последним перед фиксацией.
+    """
+    query = 'UPDATE table_versions SET version = version + 1 WHERE name = %s'
+
+    db_log.debug('QUERY: %s', query)
+    execute(cursor, query, ('tasks',))
 
 
 class TaskService:
     """
     Класс для взаимодействия с базой данных Mysql.
+
+    Методы синхронные и выполняют запросы курсором или соединением вызывающего:
+    хранилище (MySQLRepository, SQLiteRepository) вызывает их через 'executor'
+    (по умолчанию в пуле потоков, см. 'config.db.executor').
+
+    Если задан 'cache', get_one сначала ищет запись в кэше,
+    изменяющие методы сбрасывают записи до изменения и после фиксации транзакции.
+    Поисковый индекс 'search' обновляется после фиксации транзакции.
     """
 
-    def __init__(self):
+    def __init__(self, executor: Optional[QueryExecutor] = None, cache: Optional[Any] = None,
+                 search: Optional[Any] = None):
         db_log.debug('Class TaskService init process...')
+        self.executor = executor or QueryExecutor(mode=config.db.executor,
+                                                  max_workers=config.db.executor_workers)
+        self.cache = cache
+        # Поисковый индекс, см. app.services.search
+        self.index = search or MySQLSearch()
+
+    @staticmethod
+    def cache_key(task_id: int) -> str:
+        return f'task:{task_id}'
+
+    def _invalidate(self, cursor: Cursor, task_id: int) -> None:
+        """
+        Сбрасывает запись в кэше сейчас и еще раз после фиксации транзакции 'cursor':
+        до фиксации читающие запросы еще видят старую строку и могут снова положить ее в кэш.
+        """
+        cache = self.cache
+        if cache is None:
+            return
+        key = self.cache_key(task_id)
+        cache.invalidate(key)
+        on_commit(cursor, lambda: cache.invalidate(key))
+
+    def _reindex(self, cursor: Cursor, task_id: int, data: TaskValidation) -> None:
+        on_commit(cursor, lambda: self.index.add(task_id, data.taskname, data.description))
+
+    def _unindex(self, cursor: Cursor, task_id: int) -> None:
+        on_commit(cursor, lambda: self.index.remove(task_id))
+
+    def _invalidate_many(self, task_ids: List[int]) -> None:
+        if self.cache is not None:
+            for task_id in task_ids:
+                self.cache.invalidate(self.cache_key(task_id))
 
     @staticmethod
-    async def create(cursor: CursorBase, data: TaskValidation) -> None:
+    def iter_all(cursor: Cursor,
+                 batch_size: int) -> Generator[List[Dict[str, Any]], None, None]:
+        """
+        Выдает все записи таблицы 'tasks' пачками по 'batch_size' записей.
+
+        Метод синхронный: строки читаются из небуферизованного курсора по мере выдачи,
+        поэтому его нужно вызывать вне цикла событий (например, из StreamingResponse).
+        """
+        query = f'SELECT {EXPORT_COLUMNS} FROM tasks ORDER BY id'
+
+        db_log.debug('QUERY: %s', query)
+        with QUERY_LATENCY.time('export'):
+            execute(cursor, query)
+        # Класс строки определяется один раз для всей выгрузки
+        row = row_type(columns_of(cursor.description))
+
+        while True:
+            # Время чтения каждой пачки, без времени отправки ее клиенту
+            with QUERY_LATENCY.time('export_batch'):
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            QUERY_ROWS.observe(len(rows), 'export_batch')
+            yield list(starmap(row, rows))
+
+    def create(self, cursor: Cursor, data: TaskValidation) -> None:
         """
         Создает одну запись в базе данных.
         """
         try:
-            query = 'INSERT INTO tasks (taskname, description, category) ' \
-                    f"VALUES ('{data.taskname}', '{data.description}', '{data.category}')"
+            query = 'INSERT INTO tasks (taskname, description, category) VALUES (%s, %s, %s)'
 
             db_log.debug('QUERY: %s', query)
-            cursor.execute(query)
+            execute(cursor, query, (data.taskname, data.description, data.category))
 
         except IntegrityError as e:
             if 'Duplicate' in str(e):
                 db_log.debug('Task с таким названием уже существует: %s', e)
-                raise HTTPException(409, detail='Task с таким названием уже существует') from e
+                raise HTTPException(409, detail=DUPLICATE) from e
 
         # Проверяем количество удаленных строк, если удалилась 1, то все ок
         rowcount = cursor.rowcount
@@ -45,61 +164,377 @@ class TaskService:
             db_log.debug('Количество созданных строк на равно 1')
             raise HTTPException(500, detail='Unknown database error')
 
-    async def get_all(self, cursor: CursorBase) -> List[Dict[str, Any]]:
+        # Строка вставлена, значит id задан
+        task_id = cast(int, cursor.lastrowid)
+        bump_table_version(cursor)
+        self._invalidate(cursor, task_id)
+        self._reindex(cursor, task_id, data)
+
+    def create_bulk(self, connection: Any, items: List[TaskValidation],
+                    chunk_size: int) -> List[Dict[str, Any]]:
+        """
+        Создает записи пачками по 'chunk_size': одна пачка - один многострочный INSERT
+        и одна транзакция.
+
+        Returns:
+            Результат для каждого элемента 'items': {'index', 'status', 'detail'},
+            где 'index' - позиция в 'items', 'status' - 201 или 409.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        seen = set()
+
+        cursor = connection.cursor()
+        try:
+            for start in range(0, len(items), chunk_size):
+                chunk = []
+                for index in range(start, min(start + chunk_size, len(items))):
+                    # Повтор названия внутри запроса - такой же конфликт, как с записью в базе
+                    if items[index].taskname in seen:
+                        results[index] = {'index': index, 'status': 409, 'detail': DUPLICATE}
+                    else:
+                        seen.add(items[index].taskname)
+                        chunk.append(index)
+
+                self._insert_chunk(connection, cursor, items, chunk, results)
+        finally:
+            cursor.close()
+
+        # Результат есть у каждого элемента: повтор в запросе или итог его пачки
+        return cast(List[Dict[str, Any]], results)
+
+    def _insert_chunk(self, connection: Any, cursor: Cursor, items: List[TaskValidation],
+                      chunk: List[int], results: List[Optional[Dict[str, Any]]]) -> None:
         """
-        Возвращает все найденные записи в таблице 'tasks'
+        Вставляет одну пачку и фиксирует транзакцию.
+        Уже существующие названия отсеиваются заранее одним SELECT,
+        если же конфликт возник из-за параллельной вставки, пачка вставляется построчно.
         """
-        query = 'SELECT id, taskname, description, category, creation_date FROM tasks'
+        if not chunk:
+            return
 
+        connection.start_transaction()
+        placeholders = ', '.join(['%s'] * len(chunk))
+        query = f'SELECT taskname FROM tasks WHERE taskname IN ({placeholders})'
         db_log.debug('QUERY: %s', query)
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        execute(cursor, query, [items[index].taskname for index in chunk])
+        existing = {row[0] for row in cursor.fetchall()}
+
+        new = []
+        rows: List[Any] = []
+        for index in chunk:
+            if items[index].taskname in existing:
+                results[index] = {'index': index, 'status': 409, 'detail': DUPLICATE}
+            else:
+                new.append(index)
+
+        if new:
+            insert = 'INSERT INTO tasks (taskname, description, category) VALUES '
+            params = [value for index in new for value in
+                      (items[index].taskname, items[index].description, items[index].category)]
+            try:
+                query = insert + ', '.join(['(%s, %s, %s)'] * len(new))
+                db_log.debug('QUERY: %s', query)
+                execute(cursor, query, params)
+                created = new
+
+            except IntegrityError as e:
+                if 'Duplicate' not in str(e):
+                    raise
+                db_log.debug('Конфликт при вставке пачки, вставляем построчно: %s', e)
+                connection.rollback()
+                connection.start_transaction()
+
+                created = []
+                for index in new:
+                    item = items[index]
+                    try:
+                        execute(cursor, insert + '(%s, %s, %s)',
+                                (item.taskname, item.description, item.category))
+                        created.append(index)
+                    except IntegrityError as row_error:
+                        if 'Duplicate' not in str(row_error):
+                            raise
+                        results[index] = {'index': index, 'status': 409, 'detail': DUPLICATE}
+
+            for index in created:
+                results[index] = {'index': index, 'status': 201, 'detail': CREATED}
+            db_log.debug('Количество созданных строк в пачке: %s', len(created))
+            if created:
+                # id строк многострочного INSERT по lastrowid не определить
+                rows = self._indexed_rows(cursor, 'taskname',
+                                          [items[index].taskname for index in created])
+                bump_table_version(cursor)
+
+        connection.commit()
+        for task_id, taskname, description in rows:
+            self.index.add(task_id, taskname, description)
+
+    def _indexed_rows(self, cursor: Cursor, column: str, values: List[Any]) -> List[Any]:
+        """
+        id, taskname и description строк, у которых 'column' входит в 'values',
+        для поискового индекса. Пустой список, если индексу изменения не нужны.
+        """
+        if not self.index.updates:
+            return []
+        query = f"SELECT id, taskname, description FROM tasks WHERE {column} IN " \
+                f"({', '.join(['%s'] * len(values))})"
+        db_log.debug('QUERY: %s', query)
+        execute(cursor, query, values)
+        return cursor.fetchall()
+
+    def update_bulk(self, connection: Any, changes: Dict[str, Any], ids: Optional[List[int]],
+                    category: Optional[str], chunk_size: int) -> Dict[str, Any]:
+        """
+        Изменяет поля 'changes' у задач с заданными 'ids' или категорией 'category'.
+        Все изменения выполняются в одной транзакции запросами 'WHERE id IN (...)'
+        по 'chunk_size' id.
+
+        Returns:
+            {'affected': количество измененных задач, 'missing_ids': не найденные id}
+        """
+        # Имена столбцов берутся из схемы BulkChanges, значения передаются параметрами
+        columns = ', '.join(f'{column} = %s' for column in changes)
+        # Поисковый индекс нужно обновить, только если изменился текст задачи
+        return self._change_bulk(connection, f'UPDATE tasks SET {columns} WHERE id IN ',
+                                list(changes.values()), ids, category, chunk_size,
+                                reindex='taskname' in changes or 'description' in changes)
+
+    def delete_bulk(self, connection: Any, ids: Optional[List[int]],
+                    category: Optional[str], chunk_size: int) -> Dict[str, Any]:
+        """
+        Удаляет задачи с заданными 'ids' или категорией 'category' в одной транзакции.
+
+        Returns:
+            {'affected': количество удаленных задач, 'missing_ids': не найденные id}
+        """
+        return self._change_bulk(connection, 'DELETE FROM tasks WHERE id IN ',
+                                [], ids, category, chunk_size, unindex=True)
+
+    def _change_bulk(self, connection: Any, statement: str, params: List[Any],
+                     ids: Optional[List[int]], category: Optional[str], chunk_size: int,
+                     reindex: bool = False, unindex: bool = False) -> Dict[str, Any]:
+        """
+        'reindex' - измененные строки заново добавляются в поисковый индекс,
+        'unindex' - удаленные строки убираются из него.
+        """
+        affected: List[int] = []
+        missing: List[int] = []
+        rows: List[Any] = []
+
+        cursor = connection.cursor()
+        try:
+            connection.start_transaction()
+            for chunk in self._locked_chunks(cursor, ids, category, chunk_size, missing):
+                query = statement + f"({', '.join(['%s'] * len(chunk))})"
+                db_log.debug('QUERY: %s', query)
+                self._invalidate_many(chunk)
+                execute(cursor, query, params + chunk)
+                affected.extend(chunk)
+                if reindex:
+                    rows.extend(self._indexed_rows(cursor, 'id', chunk))
+
+            if affected:
+                bump_table_version(cursor)
+            connection.commit()
+            # Транзакция фиксируется здесь же, повторно сбрасываем кэш после фиксации
+            self._invalidate_many(affected)
+            for task_id, taskname, description in rows:
+                self.index.add(task_id, taskname, description)
+            if unindex:
+                for task_id in affected:
+                    self.index.remove(task_id)
+            db_log.debug('Пакетное изменение: задач %s, не найдено %s',
+                         len(affected), len(missing))
+
+        except BaseException:
+            connection.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+        return {'affected': len(affected), 'missing_ids': missing}
+
+    @staticmethod
+    def _locked_chunks(cursor: Cursor, ids: Optional[List[int]], category: Optional[str],
+                       chunk_size: int, missing: List[int]) -> Iterator[List[int]]:
+        """
+        Выдает id существующих задач пачками и блокирует эти строки до конца транзакции.
+        Не найденные id добавляются в 'missing'.
+        """
+        if ids is not None:
+            unique = sorted(set(ids))
+            for start in range(0, len(unique), chunk_size):
+                chunk = unique[start:start + chunk_size]
+                query = f"SELECT id FROM tasks WHERE id IN ({', '.join(['%s'] * len(chunk))}) " \
+                        'FOR UPDATE'
+                db_log.debug('QUERY: %s', query)
+                execute(cursor, query, chunk)
+                found = split_ids(chunk, {row[0] for row in cursor.fetchall()}, missing)
+                if found:
+                    yield found
+            return
+
+        # Фильтр по категории: идем по id пачками (keyset), не читая всю выборку сразу
+        last_id = 0
+        while True:
+            query = 'SELECT id FROM tasks WHERE category = %s AND id > %s ' \
+                    'ORDER BY id LIMIT %s FOR UPDATE'
+            db_log.debug('QUERY: %s', query)
+            execute(cursor, query, (category, last_id, chunk_size))
+            locked = [row[0] for row in cursor.fetchall()]
+            if locked:
+                yield locked
+            if len(locked) < chunk_size:
+                return
+            last_id = locked[-1]
+
+    @staticmethod
+    def list_query(filters: TaskFilters, after: Optional[Dict[str, Any]],
+                   limit: int) -> Tuple[str, List[Any]]:
+        """
+        Строит запрос страницы списка: фильтры и продолжение после ключа 'after' (keyset)
+        передаются в SQL, чтобы выборка читалась по индексу.
+        """
+        descending = filters.sort.startswith('-')
+        key = SORT_KEYS[filters.sort.lstrip('-')]
+        compare = '<' if descending else '>'
+
+        conditions: List[str] = []
+        params: List[Any] = []
+        if filters.category is not None:
+            conditions.append('category = %s')
+            params.append(filters.category)
+        if filters.created_after is not None:
+            conditions.append('creation_date >= %s')
+            params.append(utc(filters.created_after))
+        if filters.created_before is not None:
+            conditions.append('creation_date < %s')
+            params.append(utc(filters.created_before))
+
+        if after is None and key == ('id',) and not descending:
+            # Первая страница по возрастанию id - тот же текст запроса, что и у следующих
+            after = {'id': 0}
+        if after is not None:
+            if key == ('id',):
+                conditions.append(f'id {compare} %s')
+                params.append(after['id'])
+            else:
+                # Раскрытое сравнение (creation_date, id) > (%s, %s): так MySQL
+                # использует диапазон по индексу
+                conditions.append(f'(creation_date {compare} %s '
+                                  f'OR (creation_date = %s AND id {compare} %s))')
+                params.extend([after['creation_date'], after['creation_date'], after['id']])
+
+        direction = ' DESC' if descending else ''
+        query = f'SELECT {COLUMNS} FROM tasks'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY ' + ', '.join(column + direction for column in key) + ' LIMIT %s'
+        params.append(limit)
+        return query, params
+
+    @classmethod
+    def get_all(cls, cursor: Cursor, limit: int, after: Optional[Dict[str, Any]] = None,
+                filters: Optional[TaskFilters] = None
+                ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Возвращает страницу записей таблицы 'tasks', подходящих под 'filters',
+        не больше 'limit' записей в порядке 'filters.sort'.
+        Страница начинается после записи с ключом 'after' (см. 'SORT_KEYS').
+
+        Returns:
+            Записи страницы и ключ последней записи, если есть следующая страница, иначе None.
+        """
+        filters = filters or TaskFilters()
+        # Запрашиваем на одну запись больше, чтобы узнать, есть ли следующая страница
+        query, params = cls.list_query(filters, after, limit + 1)
 
+        db_log.debug('QUERY: %s', query)
+        execute(cursor, query, tuple(params))
+        rows = cursor.fetchall()
 
-        if rows and cursor.description is not None:
-            # Получаем заголовки столбцов
-            columns = [column[0] for column in cursor.description]
+        # Строки с классом, общим для всех строк с тем же набором столбцов
+        if not rows or cursor.description is None:
+            rows = []
         else:
-            db_log.debug("Table 'tasks' is empty")
-            raise HTTPException(404, detail='No tasks yet')
+            rows = make_rows(cursor.description, rows)
+        return list_page(rows, limit, after, filters)
 
-        # Соединяем заголовки с их значениями построчно и возвращаем
-        data = [dict(zip(columns, row)) for row in rows]
-        return data
+    def search(self, cursor: Cursor, query: str, limit: int,
+               after: Optional[Dict[str, Any]] = None
+               ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Ищет задачи по словам в taskname и description.
+        Записи упорядочены по релевантности ('score'), страница начинается
+        после записи с ключом 'after' ({'score', 'id'}).
 
+        Returns:
+            Записи страницы и ключ последней записи, если есть следующая страница, иначе None.
+        """
+        return self.index.search(cursor, COLUMNS, query, limit, after)
 
-    async def get_one(self, cursor: CursorBase, task_id: int) -> List[Dict[str, Any]]:
+    @staticmethod
+    def table_version(cursor: Cursor) -> Optional[Tuple[int, Any]]:
         """
-        Возвращает одну запись с заданным 'task_id'.
+        Возвращает версию таблицы 'tasks' и время ее последнего изменения.
+        Версия растет один раз за каждую изменяющую транзакцию (bump_table_version).
+
+        Returns:
+            (версия, время изменения) или None, если версия таблицы не ведется.
         """
+        query = 'SELECT version, updated_at FROM table_versions WHERE name = %s'
 
-        query = 'SELECT id, taskname, description, category, creation_date FROM tasks ' \
-                f'WHERE id = {task_id}'
+        db_log.debug('QUERY: %s', query)
+        execute(cursor, query, ('tasks',))
+        rows = cursor.fetchall()
+        if not rows:
+            return None
+        return rows[0][0], rows[0][1]
+
+    def get_one(self, cursor: Cursor, task_id: int,
+                fill_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Возвращает одну запись с заданным 'task_id'.
+        'fill_cache' = False - прочитанная строка не кладется в кэш (чтение с реплики:
+        отстающая реплика может вернуть старую или уже удаленную строку).
+        """
+        version = None
+        if self.cache is not None:
+            key = self.cache_key(task_id)
+            row = self.cache.get(key)
+            if row is not None:
+                return [row]
+            # Запоминаем версию до чтения: если запись изменят, пока мы читаем,
+            # прочитанная строка в кэш не попадет
+            if fill_cache:
+                version = self.cache.version(key)
+
+        query = f'SELECT {COLUMNS} FROM tasks WHERE id = %s'
 
         db_log.debug('QUERY: %s', query)
-        cursor.execute(query)
+        execute(cursor, query, (task_id,))
 
         rows = cursor.fetchall()
-        if rows and cursor.description is not None:
-            # Получаем заголовки столбцов
-            columns = [column[0] for column in cursor.description]
-        else:
+        if not rows or cursor.description is None:
             db_log.debug("Task not found, task_id: %s", task_id)
             raise HTTPException(404, detail='Task not found')
 
-        # Соединяем заголовки с их значениями построчно
-        data = [dict(zip(columns, row)) for row in rows]
+        data = make_rows(cursor.description, rows)
+
+        if self.cache is not None and fill_cache:
+            self.cache.set(self.cache_key(task_id), data[0], version)
         return data
 
-    @staticmethod
-    async def delete(cursor: CursorBase, task_id: int) -> None:
+    def delete(self, cursor: Cursor, task_id: int) -> None:
         """
         Удаляет одну запись с заданным 'task_id'.
         """
-        query = f'DELETE FROM tasks WHERE id = {task_id}'
+        query = 'DELETE FROM tasks WHERE id = %s'
 
         db_log.debug('QUERY: %s', query)
-        cursor.execute(query)
+        self._invalidate(cursor, task_id)
+        execute(cursor, query, (task_id,))
 
         # Проверяем количество удаленных строк, если удалилась 1, то все ок
         rowcount = cursor.rowcount
@@ -114,20 +549,20 @@ class TaskService:
             db_log.debug('Количество обновленных строк на равно 1')
             raise HTTPException(500, detail='Unknown database error')
 
-    @staticmethod
-    async def update(cursor: CursorBase, data: TaskValidation, task_id: int) -> None:
+        bump_table_version(cursor)
+        self._unindex(cursor, task_id)
+
+    def update(self, cursor: Cursor, data: TaskValidation, task_id: int) -> None:
         """
         Обновляет одну запись в базе данных.
         """
+        self._invalidate(cursor, task_id)
         try:
-            query = 'UPDATE tasks ' \
-                    f"SET taskname='{data.taskname}', " \
-                    f"description='{data.description}', " \
-                    f"category='{data.category}' " \
-                    f"WHERE id = {task_id}"
+            query = 'UPDATE tasks SET taskname = %s, description = %s, category = %s ' \
+                    'WHERE id = %s'
 
             db_log.debug('QUERY: %s', query)
-            cursor.execute(query)
+            execute(cursor, query, (data.taskname, data.description, data.category, task_id))
 
         except IntegrityError as e:
             if 'Duplicate' in str(e):
@@ -141,3 +576,165 @@ class TaskService:
         if cursor.rowcount != 1:
             db_log.debug('Количество обновленных строк на равно 1')
             raise HTTPException(400, detail='Задач обновлено: 0')
+
+        bump_table_version(cursor)
+        self._reindex(cursor, task_id, data)
+
+
+class MySQLRepository(TaskRepository):
+    """
+    Хранилище задач в MySQL.
+
+    Каждый метод выполняется одним вызовом в потоке 'executor': соединение берется из пула,
+    запросы выполняет TaskService, затем изменения фиксируются (или откатываются)
+    и соединение возвращается в пул. Цикл событий не ждет ни пула, ни базы данных.
+    """
+
+    def __init__(self, db: Optional[DB] = None, service: Optional[TaskService] = None,
+                 cache: Optional[Any] = None, search: Optional[Any] = None,
+                 replicas: Optional[ReplicaSet] = None):
+        self.db = db or DB()
+        self.service = service or TaskService(cache=cache, search=search)
+        # Реплики для чтения ('config.db.replicas'), None - все запросы к основному серверу
+        self.replicas = replicas or create_replicas(self.db, config.db)
+
+    @property
+    def cache(self) -> Optional[Any]:  # type: ignore[override]
+        return self.service.cache
+
+    async def start(self) -> bool:
+        return await self.db.start()
+
+    async def monitor(self) -> None:
+        if self.replicas is None:
+            await self.db.monitor()
+            return
+        # Реплики подключаются в фоне: готовность экземпляра зависит только от основного
+        # сервера, пока реплики не готовы, чтения выполняются на нем
+        await asyncio.gather(self.db.monitor(),
+                             *(self._watch(replica) for replica in self.replicas.replicas))
+
+    @staticmethod
+    async def _watch(replica: DB) -> None:
+        await replica.start()
+        await replica.monitor()
+
+    def close(self) -> None:
+        self.db.close()
+        if self.replicas is not None:
+            for replica in self.replicas.replicas:
+                replica.close()
+
+    def status(self) -> StorageStatus:
+        return StorageStatus(ready=self.db.ready, startup_error=self.db.startup_error,
+                             reachable=self.db.reachable, checked_at=self.db.checked_at,
+                             pool=self.db.pool_stats(), errors=self.db.errors.stats(),
+                             replicas=None if self.replicas is None else {
+                                 self.replicas.name(replica): self.replicas.healthy(replica)
+                                 for replica in self.replicas.replicas})
+
+    def pool_stats(self) -> Optional[PoolStats]:
+        return self.db.pool_stats()
+
+    def statement_stats(self) -> Optional[StatementStats]:
+        return self.db.statement_stats()
+
+    def _with(self, resource: Callable[[], Any], method: str,
+              func: Callable[..., Any], *args: Any) -> Any:
+        # 'resource' - зависимость DB (генератор): курсор или соединение на время вызова
+        with contextmanager(resource)() as cursor:
+            return timed(method, func, cursor, *args)
+
+    async def _read(self, method: str, func: Callable[..., Any], *args: Any,
+                    replica_func: Optional[Callable[..., Any]] = None) -> Any:
+        """
+        Чтение с реплики или основного сервера. На реплике вместо 'func' выполняется
+        'replica_func', если задан.
+        """
+        if self.replicas is None:
+            return await self.service.executor.run(self._with, self.db.read_cursor,
+                                                   method, func, *args)
+
+        db, reason = self.replicas.pick()
+        try:
+            result = await self.service.executor.run(
+                self._with, db.read_cursor, method,
+                func if db is self.db or replica_func is None else replica_func, *args)
+        except HTTPException as e:
+            if db is self.db or e.status_code < 500:
+                raise
+            # Реплика не выдала соединение или разорвала его: чтение повторяется
+            # на основном сервере
+            db_log.warning('Чтение с реплики %s не удалось (%s), повтор на основном сервере',
+                           self.replicas.name(db), e.detail)
+            if e.status_code == 500 and config.health.check_interval > 0:
+                # Реплика пропускается до фоновой проверки, которая вернет ее в работу
+                db.reachable = False
+            self.replicas.count(self.db, 'failover')
+            return await self.service.executor.run(self._with, self.db.read_cursor,
+                                                   method, func, *args)
+        self.replicas.count(db, reason)
+        return result
+
+    async def _write(self, method: str, func: Callable[..., Any], *args: Any) -> Any:
+        return await self.service.executor.run(self._with, self.db.write_cursor,
+                                               method, func, *args)
+
+    async def _bulk(self, method: str, func: Callable[..., Any], *args: Any) -> Any:
+        # Транзакциями пакетных изменений управляет TaskService
+        return await self.service.executor.run(self._with, self.db.get_connection,
+                                               method, func, *args)
+
+    async def create(self, data: TaskValidation) -> None:
+        await self._write('create', self.service.create, data)
+
+    async def create_bulk(self, items: List[TaskValidation],
+                          chunk_size: int) -> List[Dict[str, Any]]:
+        return await self._bulk('create_bulk', self.service.create_bulk, items, chunk_size)
+
+    async def update_bulk(self, changes: Dict[str, Any], ids: Optional[List[int]],
+                          category: Optional[str], chunk_size: int) -> Dict[str, Any]:
+        return await self._bulk('update_bulk', self.service.update_bulk, changes, ids,
+                                category, chunk_size)
+
+    async def delete_bulk(self, ids: Optional[List[int]], category: Optional[str],
+                          chunk_size: int) -> Dict[str, Any]:
+        return await self._bulk('delete_bulk', self.service.delete_bulk, ids, category,
+                                chunk_size)
+
+    async def get_all(self, limit: int, after: Optional[Dict[str, Any]] = None,
+                      filters: Optional[TaskFilters] = None) -> Page:
+        return await self._read('get_all', self.service.get_all, limit, after,
+                                filters or TaskFilters())
+
+    async def search(self, query: str, limit: int,
+                     after: Optional[Dict[str, Any]] = None) -> Page:
+        index = self.service.index
+        if self.replicas is not None and not index.loaded:
+            # Индекс в памяти загружается с основного сервера: реплика может отставать
+            await self.service.executor.run(self._with, self.db.read_cursor, 'search',
+                                            index.load)
+        return await self._read('search', self.service.search, query, limit, after)
+
+    async def get_one(self, task_id: int) -> Any:
+        # Кэш заполняется только строками основного сервера
+        rows = await self._read('get_one', self.service.get_one, task_id,
+                                replica_func=partial(self.service.get_one, fill_cache=False))
+        return rows[0]
+
+    async def table_version(self) -> Optional[Tuple[int, Any]]:
+        return await self._read('table_version', self.service.table_version)
+
+    async def update(self, data: TaskValidation, task_id: int) -> None:
+        await self._write('update', self.service.update, data, task_id)
+
+    async def delete(self, task_id: int) -> None:
+        await self._write('delete', self.service.delete, task_id)
+
+    def iter_all(self, batch_size: int) -> Generator[List[Any], None, None]:
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield from self.service.iter_all(cursor, batch_size)
+            finally:
+                cursor.close()
@@ -0,0 +1,288 @@
+"""
+Хранилище задач: интерфейс, через который маршруты /tasks читают и изменяют задачи
+
+Маршруты не получают соединений и курсоров: каждый метод хранилища сам берет
+соединение, выполняет запросы (изменения - в одной транзакции) и возвращает его.
+Реализации выбираются 'config.storage.backend' (app.services.storage.create_repository):
+
+    mysql  - MySQL через пул соединений (app.services.mysql.MySQLRepository);
+    memory - таблица в памяти процесса с индексами по id, taskname и category
+             (app.services.memory.MemoryRepository), без базы данных;
+    sqlite - файл SQLite в режиме WAL (app.services.sqlite.SQLiteRepository)
+             для установки на одном узле.
+
+Ошибки у всех реализаций одинаковые: HTTPException 404 - задачи нет, 409 - название занято,
+500 - ошибка базы данных.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Container, Dict, Generator, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.health import ErrorRate
+from app.logger import db_log
+from app.metrics import QUERY_ERRORS, QUERY_LATENCY, QUERY_ROWS
+from app.pool import PoolStats
+from app.profiling import record, reset_service_method, service_method
+from app.schemes.task import TaskFilters, TaskValidation
+from app.statements import StatementStats
+
+CREATED = 'Task created successfully'
+DUPLICATE = 'Task с таким названием уже существует'
+# Столбцы задачи в ответах API: 'version' и 'updated_at' нужны для ETag и Last-Modified
+COLUMNS = 'id, taskname, description, category, creation_date, version, updated_at'
+# Столбцы выгрузки GET /tasks/export
+EXPORT_COLUMNS = 'id, taskname, description, category, creation_date'
+# Столбцы ключа страницы для каждого порядка сортировки. Ключ уникален за счет id
+SORT_KEYS = {
+    'id': ('id',),
+    'creation_date': ('creation_date', 'id'),
+}
+# Методы, для которых в метриках учитывается количество возвращенных строк
+READ_METHODS = frozenset({'get_all', 'get_one', 'search'})
+
+# Записи страницы и ключ последней записи, если есть следующая страница
+Page = Tuple[List[Any], Optional[Dict[str, Any]]]
+
+
+def utc(value: datetime) -> datetime:
+    """
+    Даты хранятся в UTC без часового пояса.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def split_ids(ids: Iterable[int], existing: Container[int], missing: List[int]) -> List[int]:
+    """
+    Найденные (есть в 'existing') id из 'ids' без повторов по возрастанию.
+    Не найденные id добавляются в 'missing'.
+    """
+    found: List[int] = []
+    for task_id in sorted(set(ids)):
+        (found if task_id in existing else missing).append(task_id)
+    return found
+
+
+def list_page(rows: List[Any], limit: int, after: Optional[Dict[str, Any]],
+              filters: TaskFilters) -> Page:
+    """
+    Страница GET /tasks/ из прочитанных строк: строк читается на одну больше 'limit',
+    лишняя строка означает, что есть следующая страница.
+
+    Raises:
+        HTTPException: 404, если задач нет совсем (без фильтров и 'after').
+    """
+    if not rows:
+        if after or filters.category is not None or filters.created_after is not None \
+                or filters.created_before is not None:
+            # Страница после последней записи или ничего не подошло под фильтры
+            return [], None
+        db_log.debug("Table 'tasks' is empty")
+        raise HTTPException(404, detail='No tasks yet')
+
+    data = rows[:limit]
+    next_key = None
+    if len(rows) > limit:
+        next_key = {column: data[-1][column] for column in SORT_KEYS[filters.sort.lstrip('-')]}
+    return data, next_key
+
+
+def timed(method: str, func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Выполняет метод хранилища и записывает метрики: время, ошибки и количество
+    возвращенных строк. Время добавляется в профиль запроса (этап 'service'),
+    если запрос профилируется.
+    """
+    token = service_method(method)
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    except Exception:
+        QUERY_ERRORS.inc(method)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        QUERY_LATENCY.observe(elapsed, method)
+        record('service', elapsed)
+        reset_service_method(token)
+    # Страница (строки, ключ следующей страницы) или список строк
+    rows = result[0] if isinstance(result, tuple) else result
+    if method in READ_METHODS and isinstance(rows, list):
+        QUERY_ROWS.observe(len(rows), method)
+    return result
+
+
+@dataclass
+class StorageStatus:
+    """Состояние хранилища для проверок /ready и /health"""
+    ready: bool  # хранилище готово принимать запросы
+    startup_error: Optional[str] = None
+    reachable: Optional[bool] = None  # результат последней фоновой проверки
+    checked_at: Optional[float] = None  # время последней фоновой проверки (time.monotonic)
+    pool: Optional[PoolStats] = None  # None - у хранилища нет пула или он еще не создан
+    errors: ErrorRate = field(default_factory=lambda: ErrorRate(window=0.0, total=0, errors=0))
+    replicas: Optional[Dict[str, bool]] = None  # реплика для чтения -> готова, None - реплик нет
+
+
+class TaskRepository(ABC):
+    """
+    Хранилище задач.
+    """
+    # Кэш GET /tasks/{task_id} (app.services.cache), None - без кэша
+    cache: Optional[Any] = None
+
+    async def start(self) -> bool:
+        """
+        Подготовка при запуске приложения (lifespan).
+
+        Returns:
+            bool: True, если хранилище готово принимать запросы.
+        """
+        return True
+
+    async def monitor(self) -> None:
+        """
+        Фоновая проверка хранилища до отмены задачи (lifespan).
+        """
+
+    async def drain(self) -> None:
+        """
+        Завершает отложенные изменения при остановке приложения, до 'close'.
+        """
+
+    def close(self) -> None:
+        """
+        Освобождает ресурсы при остановке приложения.
+        """
+
+    @abstractmethod
+    def status(self) -> StorageStatus:
+        """
+        Состояние хранилища для проверок /ready и /health.
+        """
+
+    def pool_stats(self) -> Optional[PoolStats]:
+        """
+        Состояние пула соединений, None - пула нет или он еще не создан.
+        """
+        return None
+
+    def statement_stats(self) -> Optional[StatementStats]:
+        """
+        Счетчики подготовленных выражений, None - хранилище их не использует.
+        """
+        return None
+
+    @abstractmethod
+    async def create(self, data: TaskValidation) -> None:
+        """
+        Создает задачу.
+
+        Raises:
+            HTTPException: 409, если задача с таким названием уже есть.
+        """
+
+    @abstractmethod
+    async def create_bulk(self, items: List[TaskValidation],
+                          chunk_size: int) -> List[Dict[str, Any]]:
+        """
+        Создает задачи пачками по 'chunk_size'.
+
+        Returns:
+            Результат для каждого элемента 'items': {'index', 'status', 'detail'},
+            где 'index' - позиция в 'items', 'status' - 201 или 409.
+        """
+
+    @abstractmethod
+    async def update_bulk(self, changes: Dict[str, Any], ids: Optional[List[int]],
+                          category: Optional[str], chunk_size: int) -> Dict[str, Any]:
+        """
+        Изменяет поля 'changes' у задач с заданными 'ids' или категорией 'category'
+        в одной транзакции.
+
+        Returns:
+            {'affected': количество найденных задач, 'missing_ids': не найденные id}
+        """
+
+    @abstractmethod
+    async def delete_bulk(self, ids: Optional[List[int]], category: Optional[str],
+                          chunk_size: int) -> Dict[str, Any]:
+        """
+        Удаляет задачи с заданными 'ids' или категорией 'category' в одной транзакции.
+
+        Returns:
+            {'affected': количество удаленных задач, 'missing_ids': не найденные id}
+        """
+
+    @abstractmethod
+    async def get_all(self, limit: int, after: Optional[Dict[str, Any]] = None,
+                      filters: Optional[TaskFilters] = None) -> Page:
+        """
+        Возвращает страницу задач, подходящих под 'filters', не больше 'limit' задач
+        в порядке 'filters.sort'. Страница начинается после задачи с ключом 'after'
+        (см. 'SORT_KEYS').
+
+        Raises:
+            HTTPException: 404, если задач нет совсем (без фильтров и 'after').
+        """
+
+    @abstractmethod
+    async def search(self, query: str, limit: int,
+                     after: Optional[Dict[str, Any]] = None) -> Page:
+        """
+        Ищет задачи по словам в taskname и description. Задачи упорядочены
+        по релевантности ('score'), страница начинается после ключа 'after' ({'score', 'id'}).
+        """
+
+    @abstractmethod
+    async def get_one(self, task_id: int) -> Any:
+        """
+        Возвращает задачу с заданным 'task_id' (столбцы 'COLUMNS').
+
+        Raises:
+            HTTPException: 404, если задачи нет.
+        """
+
+    @abstractmethod
+    async def table_version(self) -> Optional[Tuple[int, Any]]:
+        """
+        Возвращает версию таблицы задач и время ее последнего изменения.
+
+        Returns:
+            (версия, время изменения) или None, если версия не ведется.
+        """
+
+    @abstractmethod
+    async def update(self, data: TaskValidation, task_id: int) -> None:
+        """
+        Обновляет задачу.
+
+        Raises:
+            HTTPException: 409 - название занято другой задачей,
+                400 - задача не найдена или данные не изменились.
+        """
+
+    @abstractmethod
+    async def delete(self, task_id: int) -> None:
+        """
+        Удаляет задачу.
+
+        Raises:
+            HTTPException: 404, если задачи нет.
+        """
+
+    @abstractmethod
+    def iter_all(self, batch_size: int) -> Generator[List[Any], None, None]:
+        """
+        Выдает все задачи (столбцы 'EXPORT_COLUMNS') в порядке id пачками по 'batch_size'.
+
+        Метод синхронный и может блокировать поток: его нужно вызывать вне цикла событий.
+        Ресурсы (соединение) заняты, пока генератор не исчерпан или не закрыт.
+        """
+
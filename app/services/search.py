@@ -0,0 +1,255 @@
+"""
+Полнотекстовый поиск задач по taskname и description
+
+'mysql' - индекс FULLTEXT (init.sql) и MATCH ... AGAINST в режиме естественного языка.
+'memory' - инвертированный индекс в памяти процесса, для разработки и тестов без FULLTEXT.
+Индекс строится из таблицы 'tasks' при первом поиске и обновляется после фиксации
+изменений через TaskService. Индекс у каждого процесса свой.
+
+Результаты упорядочены по релевантности (score) по убыванию, затем по id,
+страницы продолжаются после ключа (score, id) последней записи.
+"""
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config import SearchConfig
+from app.logger import db_log
+from app.profiling import execute
+from app.rows import columns_of, make_rows, row_type
+
+MEMORY = 'memory'
+MYSQL = 'mysql'
+
+# Слова из букв и цифр, в том числе кириллицы
+_TOKEN = re.compile(r'\w+')
+
+Page = Tuple[List[Any], Optional[Dict[str, Any]]]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Разбивает текст на слова в нижнем регистре.
+    """
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def split_page(rows: List[Any], limit: int) -> Page:
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = {'score': rows[-1]['score'], 'id': rows[-1]['id']}
+    return rows, next_key
+
+
+class MySQLSearch:
+    """
+    Поиск по индексу FULLTEXT (taskname, description).
+    Индекс поддерживает MySQL, поэтому методы загрузки и обновления ничего не делают.
+    """
+    loaded = True
+    # Изменения задач (add, remove) индексу не нужны
+    updates = False
+
+    def load(self, cursor: Any) -> None:
+        pass
+
+    def search(self, cursor: Any, columns: str, query: str, limit: int,
+               after: Optional[Dict[str, Any]]) -> Page:
+        match = 'MATCH (taskname, description) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+        sql = f'SELECT {columns}, {match} AS score FROM tasks WHERE {match}'
+        params: List[Any] = [query, query]
+        if after is not None:
+            # HAVING сравнивает уже вычисленный score, MATCH не выполняется повторно
+            sql += ' HAVING score < %s OR (score = %s AND id > %s)'
+            params.extend([after['score'], after['score'], after['id']])
+        sql += ' ORDER BY score DESC, id LIMIT %s'
+        params.append(limit + 1)
+
+        db_log.debug('QUERY: %s', sql)
+        execute(cursor, sql, tuple(params))
+        rows = cursor.fetchall()
+        if not rows or cursor.description is None:
+            return [], None
+
+        return split_page(make_rows(cursor.description, rows), limit)
+
+    def add(self, task_id: int, taskname: str, description: Optional[str]) -> None:
+        pass
+
+    def remove(self, task_id: int) -> None:
+        pass
+
+    def reset(self) -> None:
+        pass
+
+
+class InvertedIndex:
+    """
+    Инвертированный индекс: слово -> {id задачи: сколько раз слово встречается}.
+    Релевантность - сумма tf * idf по словам запроса (как в FULLTEXT MySQL,
+    подходит задача, в которой есть хотя бы одно слово запроса).
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._documents: Dict[int, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, task_id: int, text: str) -> None:
+        self.remove(task_id)
+        counts = Counter(tokenize(text))
+        for word, count in counts.items():
+            self._postings[word][task_id] = count
+        self._documents[task_id] = set(counts)
+
+    def remove(self, task_id: int) -> None:
+        for word in self._documents.pop(task_id, ()):
+            postings = self._postings[word]
+            postings.pop(task_id, None)
+            if not postings:
+                del self._postings[word]
+
+    def search(self, query: str, limit: int,
+               after: Optional[Tuple[float, int]] = None) -> List[Tuple[float, int]]:
+        """
+        Возвращает не больше 'limit' пар (score, id) после ключа 'after'.
+        """
+        total = len(self._documents)
+        scores: Dict[int, float] = defaultdict(float)
+        for word in set(tokenize(query)):
+            postings = self._postings.get(word)
+            if not postings:
+                continue
+            idf = math.log(1 + total / len(postings))
+            for task_id, count in postings.items():
+                scores[task_id] += count * idf
+
+        candidates = ((score, task_id) for task_id, score in scores.items()
+                      if after is None or score < after[0]
+                      or (score == after[0] and task_id > after[1]))
+        # Частичная сортировка: нужны только первые 'limit' записей
+        return heapq.nsmallest(limit, candidates, key=lambda item: (-item[0], item[1]))
+
+
+class MemorySearch:
+    """
+    Поиск по инвертированному индексу в памяти процесса.
+    Строки задач читаются из базы данных по найденным id.
+    """
+    updates = True
+
+    def __init__(self) -> None:
+        self._index = InvertedIndex()
+        self._loaded = False
+        # Загрузка индекса и изменения выполняются под одной блокировкой:
+        # изменение, зафиксированное во время загрузки, применяется после нее
+        self._lock = threading.Lock()
+
+    def _load(self, cursor: Any) -> None:
+        query = 'SELECT id, taskname, description FROM tasks'
+        db_log.debug('QUERY: %s', query)
+        execute(cursor, query)
+        index = InvertedIndex()
+        for task_id, taskname, description in cursor.fetchall() or []:
+            index.add(task_id, f'{taskname} {description or ""}')
+        self._index = index
+        self._loaded = True
+        db_log.debug('Поисковый индекс загружен: задач %s', len(index))
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, cursor: Any) -> None:
+        """
+        Загружает индекс курсором 'cursor', если он еще не загружен.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load(cursor)
+
+    def search(self, cursor: Any, columns: str, query: str, limit: int,
+               after: Optional[Dict[str, Any]]) -> Page:
+        with self._lock:
+            if not self._loaded:
+                self._load(cursor)
+            key = (after['score'], after['id']) if after is not None else None
+            found = self._index.search(query, limit + 1, key)
+        if not found:
+            return [], None
+
+        # Следующая страница есть, если индекс вернул больше 'limit' задач
+        page, more = found[:limit], len(found) > limit
+        hits = self._hits(cursor, columns, page)
+
+        next_key = None
+        if more:
+            # Ключ последней выданной задачи, а если удалены все - последней найденной
+            score, task_id = (hits[-1]['score'], hits[-1]['id']) if hits else page[-1]
+            next_key = {'score': score, 'id': task_id}
+        return hits, next_key
+
+    @staticmethod
+    def _hits(cursor: Any, columns: str, found: List[Tuple[float, int]]) -> List[Any]:
+        """
+        Строки найденных задач ('columns' и 'score') в порядке 'found'.
+        Задачи, удаленные после поиска по индексу, пропускаются.
+        """
+        ids = [task_id for _, task_id in found]
+        sql = f"SELECT {columns} FROM tasks WHERE id IN ({', '.join(['%s'] * len(ids))})"
+        db_log.debug('QUERY: %s', sql)
+        execute(cursor, sql, tuple(ids))
+        rows = cursor.fetchall()
+        if not rows or cursor.description is None:
+            return []
+
+        names = columns_of(cursor.description)
+        position = names.index('id')
+        by_id = {row[position]: row for row in rows}
+        hit = row_type(names + ('score',))
+        return [hit(*by_id[task_id], score) for score, task_id in found if task_id in by_id]
+
+    def add(self, task_id: int, taskname: str, description: Optional[str]) -> None:
+        with self._lock:
+            # До загрузки индекса изменения не нужны: загрузка прочитает их из базы
+            if self._loaded:
+                self._index.add(task_id, f'{taskname} {description or ""}')
+
+    def remove(self, task_id: int) -> None:
+        with self._lock:
+            if self._loaded:
+                self._index.remove(task_id)
+
+    def reset(self) -> None:
+        """
+        Сбрасывает индекс, он будет загружен заново при следующем поиске.
+        """
+        with self._lock:
+            self._index = InvertedIndex()
+            self._loaded = False
+
+
+def create_search(search_config: SearchConfig, workers: int = 1) -> Any:
+    """
+    Создает поиск по настройкам.
+    """
+    if search_config.backend == MYSQL:
+        search: Any = MySQLSearch()
+    elif search_config.backend == MEMORY:
+        if workers > 1:
+            # Индекс обновляется только изменениями, выполненными в этом же процессе
+            db_log.warning("Поиск 'memory' в %s рабочих процессах может не находить "
+                           "задачи, созданные другими процессами", workers)
+        search = MemorySearch()
+    else:
+        raise ValueError(f'Неизвестный тип поиска: {search_config.backend}')
+
+    db_log.debug('Search created: %s', search)
+    return search
@@ -0,0 +1,382 @@
+"""
+Хранилище задач в SQLite для установки на одном узле (config.storage.backend = 'sqlite')
+
+Запросы выполняет тот же TaskService, что и для MySQL: соединение и курсор SQLite повторяют
+ту часть интерфейса mysql-connector, которую он использует ('%s' в запросах,
+start_transaction/commit/rollback, rowcount/lastrowid, IntegrityError 'Duplicate').
+Схема - init.sql: версия строки и время изменения ведутся триггерами, версию таблицы
+увеличивает TaskService (bump_table_version).
+
+Файл работает в режиме WAL: чтение не блокирует запись и наоборот. Читатели - по соединению
+на поток пула запросов (соединение SQLite нельзя использовать из двух потоков одновременно),
+писатель - одно соединение, изменения выполняются по очереди в отдельном потоке.
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from mysql.connector import IntegrityError
+
+from app.config import config
+from app.database import commit_callbacks, run_commit_callbacks
+from app.health import ErrorWindow
+from app.logger import db_log
+from app.schemes.task import TaskFilters, TaskValidation
+from app.services.executor import QueryExecutor
+from app.services.mysql import TaskService
+from app.services.repository import Page, StorageStatus, TaskRepository, timed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    taskname TEXT UNIQUE,
+    description TEXT,
+    category TEXT,
+    creation_date TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')));
+-- Фильтры и сортировки списка задач (TaskService.list_query)
+CREATE INDEX IF NOT EXISTS tasks_category ON tasks (category, id);
+CREATE INDEX IF NOT EXISTS tasks_creation_date ON tasks (creation_date, id);
+CREATE INDEX IF NOT EXISTS tasks_category_creation_date ON tasks (category, creation_date, id);
+
+-- Версии таблиц для условных запросов к спискам (ETag списка без чтения строк)
+CREATE TABLE IF NOT EXISTS table_versions(
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')));
+INSERT OR IGNORE INTO table_versions (name) VALUES ('tasks');
+
+-- Как в MySQL: UPDATE без изменения данных не затрагивает строку (rowcount 0)
+CREATE TRIGGER IF NOT EXISTS tasks_unchanged BEFORE UPDATE OF taskname, description, category
+ON tasks FOR EACH ROW
+WHEN NEW.taskname IS OLD.taskname AND NEW.description IS OLD.description
+     AND NEW.category IS OLD.category
+BEGIN
+    SELECT RAISE(IGNORE);
+END;
+
+-- Версия строки растет только при изменении данных задачи
+CREATE TRIGGER IF NOT EXISTS tasks_row_version AFTER UPDATE OF taskname, description, category
+ON tasks FOR EACH ROW
+BEGIN
+    UPDATE tasks SET version = OLD.version + 1,
+                     updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+
+-- Версию таблицы увеличивает TaskService один раз за транзакцию, время изменения -
+-- как ON UPDATE CURRENT_TIMESTAMP в MySQL
+CREATE TRIGGER IF NOT EXISTS table_versions_updated_at AFTER UPDATE OF version
+ON table_versions FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE name = NEW.name;
+END;
+"""
+
+# Даты хранятся текстом 'YYYY-MM-DD HH:MM:SS[.ffffff]', как их сравнивает MySQL
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+_statements: Dict[str, str] = {}
+
+
+def translate(query: str) -> str:
+    """
+    Запрос MySQL в запрос SQLite: параметры '?' вместо '%s', без 'FOR UPDATE'
+    (запись в SQLite и так выполняется одной транзакцией за раз).
+    """
+    statement = _statements.get(query)
+    if statement is None:
+        statement = query.replace('%s', '?').replace(' FOR UPDATE', '')
+        _statements[query] = statement
+    return statement
+
+
+class Cursor:
+    """
+    Курсор с интерфейсом курсора mysql-connector.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    @property
+    def description(self) -> Optional[Sequence[Sequence[Any]]]:
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    def execute(self, query: str, params: Optional[Sequence[Any]] = None) -> None:
+        try:
+            self._cursor.execute(translate(query), tuple(params or ()))
+        except sqlite3.IntegrityError as e:
+            if 'UNIQUE' in str(e):
+                raise IntegrityError(msg=f'Duplicate entry: {e}') from e
+            raise IntegrityError(msg=str(e)) from e
+
+    def executemany(self, query: str, params: Iterable[Sequence[Any]]) -> None:
+        self._cursor.executemany(translate(query), params)
+
+    def fetchall(self) -> List[Any]:
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size: int) -> List[Any]:
+        return self._cursor.fetchmany(size)
+
+    def fetchone(self) -> Optional[Any]:
+        return self._cursor.fetchone()
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class Connection:
+    """
+    Соединение с интерфейсом соединения mysql-connector в режиме autocommit.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0, readonly: bool = False):
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                     check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # В режиме WAL фиксация не ждет записи на диск, целостность файла сохраняется
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        if readonly:
+            self._conn.execute('PRAGMA query_only=ON')
+        self._closed = False
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._conn.in_transaction
+
+    @property
+    def unread_result(self) -> bool:
+        return False
+
+    def cursor(self) -> Cursor:
+        return Cursor(self._conn.cursor())
+
+    def executescript(self, script: str) -> None:
+        self._conn.executescript(script)
+
+    def start_transaction(self) -> None:
+        # Блокировка записи берется сразу: две транзакции не будут ждать друг друга
+        # при переходе от чтения к записи
+        self._conn.execute('BEGIN IMMEDIATE')
+
+    def commit(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.execute('COMMIT')
+
+    def rollback(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.execute('ROLLBACK')
+
+    def is_connected(self) -> bool:
+        return not self._closed
+
+    def reconnect(self, attempts: int = 1) -> None:
+        pass
+
+    def close(self) -> None:
+        self._closed = True
+        self._conn.close()
+
+
+def create_schema(path: str) -> None:
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SCHEMA)
+    finally:
+        conn.close()
+
+
+class SQLiteRepository(TaskRepository):
+    """
+    Хранилище задач в файле SQLite.
+
+    Чтение выполняется в потоках 'service.executor', у каждого потока свое соединение
+    только для чтения. Изменения выполняются в потоке 'writer' единственным соединением
+    на запись: запросы не соревнуются за блокировку файла, а ждут своей очереди.
+    Ошибки SQLite (кроме повтора названия, 409) - ответ 500.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0,
+                 service: Optional[TaskService] = None, cache: Optional[Any] = None,
+                 search: Optional[Any] = None):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.service = service or TaskService(cache=cache, search=search)
+        self.writer = QueryExecutor(mode=self.service.executor.mode, max_workers=1)
+        self.ready = False
+        self.startup_error: Optional[str] = None
+        self.errors = ErrorWindow(window=config.health.error_window)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._readers: List[Connection] = []
+        self._writer: Optional[Connection] = None
+
+    def __repr__(self) -> str:
+        return f'SQLiteRepository({self.path!r})'
+
+    @property
+    def cache(self) -> Optional[Any]:  # type: ignore[override]
+        return self.service.cache
+
+    def _open(self) -> None:
+        self._writer = Connection(self.path, self.busy_timeout)
+        self._writer.executescript(SCHEMA)
+
+    async def start(self) -> bool:
+        try:
+            await self.writer.run(self._open)
+        except sqlite3.Error as e:
+            self.startup_error = str(e)
+            db_log.error('Не удалось открыть базу данных SQLite %s: %s', self.path, e)
+            return False
+        self.ready = True
+        db_log.info('SQLite database opened: %s', self.path)
+        return True
+
+    def close(self) -> None:
+        self.ready = False
+        self.writer.shutdown()
+        with self._lock:
+            connections = self._readers + ([self._writer] if self._writer else [])
+            self._readers = []
+            self._writer = None
+        for conn in connections:
+            conn.close()
+
+    def status(self) -> StorageStatus:
+        return StorageStatus(ready=self.ready, startup_error=self.startup_error,
+                             errors=self.errors.stats())
+
+    def _reader(self) -> Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or not conn.is_connected():
+            conn = Connection(self.path, self.busy_timeout, readonly=True)
+            self._local.conn = conn
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    def _guarded(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Вызывает 'func' и учитывает обращение к базе данных. Ошибки SQLite - ответ 500.
+        """
+        try:
+            result = func(*args)
+        except sqlite3.Error as e:
+            db_log.error('Ошибка базы данных SQLite: %s', e)
+            self.errors.record(False)
+            raise HTTPException(status_code=500, detail='Ошибка базы данных') from e
+        except HTTPException:
+            # 404, 409: база данных ответила
+            self.errors.record(True)
+            raise
+        self.errors.record(True)
+        return result
+
+    def _with_reader(self, method: str, func: Callable[..., Any], *args: Any) -> Any:
+        cursor = self._reader().cursor()
+        try:
+            return timed(method, func, cursor, *args)
+        finally:
+            cursor.close()
+
+    def _with_writer(self, method: str, func: Callable[..., Any], *args: Any) -> Any:
+        conn = self._connection()
+        cursor = conn.cursor()
+        with commit_callbacks(cursor) as callbacks:
+            conn.start_transaction()
+            try:
+                result = timed(method, func, cursor, *args)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        run_commit_callbacks(callbacks)
+        return result
+
+    def _with_connection(self, method: str, func: Callable[..., Any], *args: Any) -> Any:
+        # Транзакциями пакетных изменений управляет TaskService
+        return timed(method, func, self._connection(), *args)
+
+    def _connection(self) -> Connection:
+        if self._writer is None:
+            raise sqlite3.OperationalError('База данных SQLite не открыта')
+        return self._writer
+
+    async def _read(self, method: str, func: Callable[..., Any], *args: Any) -> Any:
+        return await self.service.executor.run(self._guarded, self._with_reader,
+                                               method, func, *args)
+
+    async def _write(self, method: str, func: Callable[..., Any], *args: Any) -> Any:
+        return await self.writer.run(self._guarded, self._with_writer, method, func, *args)
+
+    async def _bulk(self, method: str, func: Callable[..., Any], *args: Any) -> Any:
+        return await self.writer.run(self._guarded, self._with_connection,
+                                     method, func, *args)
+
+    async def create(self, data: TaskValidation) -> None:
+        await self._write('create', self.service.create, data)
+
+    async def create_bulk(self, items: List[TaskValidation],
+                          chunk_size: int) -> List[Dict[str, Any]]:
+        return await self._bulk('create_bulk', self.service.create_bulk, items, chunk_size)
+
+    async def update_bulk(self, changes: Dict[str, Any], ids: Optional[List[int]],
+                          category: Optional[str], chunk_size: int) -> Dict[str, Any]:
+        return await self._bulk('update_bulk', self.service.update_bulk, changes, ids,
+                                category, chunk_size)
+
+    async def delete_bulk(self, ids: Optional[List[int]], category: Optional[str],
+                          chunk_size: int) -> Dict[str, Any]:
+        return await self._bulk('delete_bulk', self.service.delete_bulk, ids, category,
+                                chunk_size)
+
+    async def get_all(self, limit: int, after: Optional[Dict[str, Any]] = None,
+                      filters: Optional[TaskFilters] = None) -> Page:
+        return await self._read('get_all', self.service.get_all, limit, after,
+                                filters or TaskFilters())
+
+    async def search(self, query: str, limit: int,
+                     after: Optional[Dict[str, Any]] = None) -> Page:
+        return await self._read('search', self.service.search, query, limit, after)
+
+    async def get_one(self, task_id: int) -> Any:
+        rows = await self._read('get_one', self.service.get_one, task_id)
+        return rows[0]
+
+    async def table_version(self) -> Optional[Tuple[int, Any]]:
+        return await self._read('table_version', self.service.table_version)
+
+    async def update(self, data: TaskValidation, task_id: int) -> None:
+        await self._write('update', self.service.update, data, task_id)
+
+    async def delete(self, task_id: int) -> None:
+        await self._write('delete', self.service.delete, task_id)
+
+    def iter_all(self, batch_size: int) -> Generator[List[Any], None, None]:
+        # Пачки могут читаться из разных потоков: у выгрузки собственное соединение
+        conn = Connection(self.path, self.busy_timeout, readonly=True)
+        cursor = conn.cursor()
+        try:
+            yield from self.service.iter_all(cursor, batch_size)
+        finally:
+            cursor.close()
+            conn.close()
@@ -0,0 +1,65 @@
+"""
+Создание хранилища задач по настройкам ('config.storage')
+
+Модуль отделен от app.services.repository: реализации импортируют интерфейс оттуда,
+а здесь импортируются сами реализации.
+"""
+
+from typing import Optional
+
+from app.config import BatchingConfig, CacheConfig, SearchConfig, StorageConfig
+from app.logger import db_log
+from app.services.repository import TaskRepository
+
+MYSQL = 'mysql'
+MEMORY = 'memory'
+SQLITE = 'sqlite'
+
+
+def create_repository(storage_config: StorageConfig, cache_config: CacheConfig,
+                      search_config: SearchConfig, workers: int = 1,
+                      batching_config: Optional[BatchingConfig] = None) -> TaskRepository:
+    """
+    Создает хранилище по настройкам.
+    Хранилище 'memory' у каждого процесса свое, поэтому требует одного рабочего процесса.
+    Если включено 'batching_config.enabled', создание задач объединяется в пачки
+    (app.services.batching).
+    """
+    # Реализации импортируются по необходимости: 'memory' не требует драйвера MySQL
+    # pylint: disable=import-outside-toplevel
+    if storage_config.backend == MYSQL:
+        from app.services.cache import create_cache
+        from app.services.mysql import MySQLRepository
+        from app.services.search import create_search
+        repository: TaskRepository = MySQLRepository(
+            cache=create_cache(cache_config, workers),
+            search=create_search(search_config, workers))
+
+    elif storage_config.backend == MEMORY:
+        if workers > 1:
+            raise ValueError(f"Хранилище 'memory' работает только в одном процессе, "
+                             f"рабочих процессов: {workers}")
+        from app.services.memory import MemoryRepository
+        repository = MemoryRepository()
+
+    elif storage_config.backend == SQLITE:
+        if search_config.backend == MYSQL:
+            raise ValueError("Поиск 'mysql' (FULLTEXT) недоступен в хранилище 'sqlite', "
+                             "используйте search.backend = 'memory'")
+        from app.services.cache import create_cache
+        from app.services.search import create_search
+        from app.services.sqlite import SQLiteRepository
+        repository = SQLiteRepository(storage_config.sqlite_path,
+                                      storage_config.sqlite_busy_timeout,
+                                      cache=create_cache(cache_config, workers),
+                                      search=create_search(search_config, workers))
+
+    else:
+        raise ValueError(f'Неизвестный тип хранилища: {storage_config.backend}')
+
+    if batching_config is not None and batching_config.enabled:
+        from app.services.batching import BatchingRepository
+        repository = BatchingRepository(repository, batching_config)
+
+    db_log.debug('Repository created: %s', repository)
+    return repository
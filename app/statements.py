@@ -0,0 +1,136 @@
+"""
+Кэш серверных подготовленных выражений (prepared statements)
+
+Для каждого соединения из пула хранится набор подготовленных курсоров: один курсор на текст
+запроса. Курсор mysql-connector с prepared=True готовит выражение на сервере при первом
+выполнении и повторно использует его, пока текст запроса не меняется,
+поэтому повторный запрос передает на сервер только параметры.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+from app.logger import db_log
+
+
+@dataclass
+class StatementStats:
+    """Счетчики кэша подготовленных выражений"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class StatementCache:
+    """
+    Подготовленные курсоры одного соединения, не больше 'max_size' (вытесняются давно
+    неиспользуемые). Соединение используется одним запросом за раз, поэтому блокировка
+    нужна только для согласованного чтения счетчиков.
+    """
+
+    def __init__(self, conn: Any, max_size: int = 32):
+        self.conn = conn
+        self.max_size = max_size
+        self._cursors: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = StatementStats()
+
+    def cursor(self, query: str) -> Any:
+        """
+        Возвращает подготовленный курсор для текста запроса 'query'.
+        """
+        cursor = self._cursors.get(query)
+        if cursor is not None:
+            self._cursors.move_to_end(query)
+            with self._lock:
+                self._stats.hits += 1
+            return cursor
+
+        cursor = self.conn.cursor(prepared=True)
+        self._cursors[query] = cursor
+        evicted = []
+        while len(self._cursors) > self.max_size:
+            evicted.append(self._cursors.popitem(last=False)[1])
+        with self._lock:
+            self._stats.misses += 1
+            self._stats.evictions += len(evicted)
+
+        for old in evicted:
+            # Закрытие курсора освобождает выражение на сервере
+            old.close()
+        return cursor
+
+    def stats(self) -> StatementStats:
+        with self._lock:
+            return StatementStats(hits=self._stats.hits, misses=self._stats.misses,
+                                  evictions=self._stats.evictions, size=len(self._cursors))
+
+    def close(self) -> None:
+        """
+        Закрывает все курсоры (при закрытии соединения).
+        """
+        cursors = list(self._cursors.values())
+        self._cursors.clear()
+        for cursor in cursors:
+            try:
+                cursor.close()
+            except Exception as e:  # pylint: disable=broad-except
+                db_log.debug('Ошибка при закрытии подготовленного курсора: %s', e)
+
+
+class PreparedCursor:
+    """
+    Курсор для TaskService: 'execute(query, params)' выполняет запрос
+    через подготовленный курсор из 'StatementCache' соединения,
+    остальные атрибуты берутся у курсора последнего выполненного запроса.
+    """
+
+    def __init__(self, statements: StatementCache):
+        self.statements = statements
+        self._cursor: Optional[Any] = None
+
+    def execute(self, query: str, params: Sequence[Any] = ()) -> None:
+        self._cursor = self.statements.cursor(query)
+        self._cursor.execute(query, tuple(params))
+
+    def _executed(self) -> Any:
+        """
+        Курсор последнего выполненного запроса.
+        """
+        if self._cursor is None:
+            raise RuntimeError('Нет результата: запрос еще не выполнен')
+        return self._cursor
+
+    def fetchall(self) -> Any:
+        return self._executed().fetchall()
+
+    def fetchmany(self, size: int) -> Any:
+        return self._executed().fetchmany(size)
+
+    def fetchone(self) -> Any:
+        return self._executed().fetchone()
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount if self._cursor is not None else -1
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid if self._cursor is not None else None
+
+    @property
+    def description(self) -> Any:
+        return self._cursor.description if self._cursor is not None else None
+
+    def close(self) -> None:
+        """
+        Подготовленные курсоры остаются в кэше соединения, закрывать нечего.
+        """
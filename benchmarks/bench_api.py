@@ -0,0 +1,418 @@
+"""
+Нагрузочный тест API /tasks.
+
+Запросы выполняются к приложению run.app в том же процессе через ASGI (httpx.ASGITransport),
+без сети: полный путь запроса - middleware, валидация, пул соединений, TaskService,
+сериализация ответа. Время включает работу клиента httpx в том же цикле событий.
+
+База данных:
+    standin - путь запроса MySQL (пул соединений DB, TaskService) с файлом SQLite вместо
+              сервера (соединения app.services.sqlite), сервер не нужен;
+    mysql   - база из config.db (с таблицами из init.sql). Таблица tasks очищается,
+              поэтому нужен флаг --allow-reset;
+    sqlite  - хранилище SQLite во временном файле (config.storage.backend = 'sqlite');
+    memory  - хранилище в памяти процесса (config.storage.backend = 'memory').
+
+Для каждого размера таблицы (--rows) таблица заполняется заново, затем выполняются
+сценарии (--scenarios):
+    get_one - GET /tasks/{id} случайной задачи;
+    get_all - GET /tasks/?after_id=... страница со случайного места;
+    update  - PUT /tasks/{id} случайной задачи;
+    create  - POST /tasks/ новой задачи;
+    mixed   - доля --read-ratio чтений (get_one, get_all), остальное - create и update;
+    delete  - DELETE /tasks/{id}, задачи удаляются из таблицы (выполняется последним).
+
+Для сценария выводятся: запросов в секунду, задержка p50/p95/p99, ошибки (ответы,
+кроме 2xx и 304) и память процесса (RSS после сценария и прирост за сценарий).
+
+Результаты можно сохранить (--save) и сравнить с сохраненными ранее (--baseline):
+регрессия - p95 больше или запросов в секунду меньше, чем в базовом файле, больше чем
+на --tolerance. При регрессии код завершения 1. Базовый файл имеет смысл только
+для той же машины и базы данных.
+
+Запуск:
+    python -m benchmarks.bench_api --rows 1000,100000 --requests 2000 --concurrency 10
+    python -m benchmarks.bench_api --save benchmarks/baseline.json
+    python -m benchmarks.bench_api --baseline benchmarks/baseline.json
+
+Сравнение хранилищ (сценарий mixed - смесь с долей чтений --read-ratio, регрессии -
+относительно MySQL):
+    python -m benchmarks.bench_api --database mysql --allow-reset --save mysql.json
+    python -m benchmarks.bench_api --database sqlite --baseline mysql.json
+
+Объединение записи в пачки (config.batching) при всплеске создания задач:
+    python -m benchmarks.bench_api --scenarios create --concurrency 100 --batching 100
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import config
+from app.schemes.task import TaskValidation
+from app.services.batching import BatchingRepository
+from app.services.mysql import MySQLRepository
+from app.services.repository import TaskRepository
+
+SCENARIOS = ('get_one', 'get_all', 'update', 'create', 'mixed', 'delete')
+CATEGORIES = 20
+SEED_BATCH = 1000
+# Успешные ответы: 304 - страница или задача не изменились
+SUCCESS = frozenset({200, 201, 204, 304})
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+def rss_mb() -> float:
+    """
+    Текущий RSS процесса, МБ. Если /proc недоступен - максимальный RSS.
+    """
+    try:
+        with open('/proc/self/statm', encoding='ascii') as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux - КБ, macOS - байты
+        return maxrss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Процентиль по ближайшему рангу, 'values' отсортированы.
+    """
+    if not values:
+        return 0.0
+    rank = max(1, int(round(percent / 100 * len(values) + 0.5)))
+    return values[min(rank, len(values)) - 1]
+
+
+class Workload:
+    """
+    Запросы сценариев к таблице, заполненной 'seed'.
+    """
+
+    def __init__(self, tasks: Dict[int, str], page_size: int, rng: random.Random):
+        # id -> taskname заполненных задач
+        self.tasks = tasks
+        self.ids = list(tasks)
+        self.page_size = page_size
+        self.rng = rng
+        self.counter = itertools.count()
+        self.run = f'{os.getpid()} {int(time.time())}'
+
+    def get_one(self, client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+        return client.get(f'/tasks/{self.rng.choice(self.ids)}')
+
+    def get_all(self, client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+        after_id = self.rng.randrange(max(1, len(self.ids) - self.page_size))
+        return client.get('/tasks/', params={'after_id': after_id, 'limit': self.page_size})
+
+    def update(self, client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+        task_id = self.rng.choice(self.ids)
+        return client.put(f'/tasks/{task_id}', json={
+            'taskname': self.tasks[task_id],
+            'description': f'Updated description {next(self.counter)}',
+            'category': f'Category {task_id % CATEGORIES}',
+        })
+
+    def create(self, client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+        number = next(self.counter)
+        return client.post('/tasks/', json={
+            'taskname': f'Bench {self.run} {number}',
+            'description': f'Description of benchmark task {number}',
+            'category': f'Category {number % CATEGORIES}',
+        })
+
+    def delete(self, client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+        return client.delete(f'/tasks/{self.ids.pop()}')
+
+    def mixed(self, read_ratio: float) -> Request:
+        def request(client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+            if self.rng.random() < read_ratio:
+                return self.get_one(client) if self.rng.random() < 0.5 else self.get_all(client)
+            return self.create(client) if self.rng.random() < 0.5 else self.update(client)
+        return request
+
+
+async def run_scenario(client: httpx.AsyncClient, request: Request, count: int,
+                       concurrency: int, warmup: int) -> Dict[str, Any]:
+    """
+    Выполняет 'count' запросов 'concurrency' параллельными клиентами.
+    Первые 'warmup' запросов не учитываются.
+    """
+    for _ in range(warmup):
+        await request(client)
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    remaining = count
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await request(client)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code not in SUCCESS:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+
+    gc.collect()
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    rss_after = rss_mb()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'errors': errors,
+        'rss_mb': round(rss_after, 1),
+        'rss_delta_mb': round(rss_after - rss_before, 1),
+    }
+
+
+def clear_mysql(repository: Any) -> None:
+    """
+    Очищает таблицу tasks в обход хранилища, сбрасывает кэш задач и поисковый индекс.
+    """
+    with repository.db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute('DELETE FROM tasks')
+        finally:
+            cursor.close()
+    if repository.cache is not None and hasattr(repository.cache, 'clear'):
+        repository.cache.clear()
+    repository.service.index.reset()
+
+
+def read_names(repository: Any) -> Dict[int, str]:
+    return {row['id']: row['taskname']
+            for batch in repository.iter_all(SEED_BATCH) for row in batch}
+
+
+async def seed(repository: Any, rows: int) -> Dict[int, str]:
+    """
+    Очищает хранилище и заполняет его 'rows' задачами (POST /tasks/bulk без HTTP).
+
+    Returns:
+        id -> taskname созданных задач.
+    """
+    storage = unwrap(repository)
+    if isinstance(storage, MySQLRepository):
+        await asyncio.to_thread(clear_mysql, storage)
+    else:
+        ids = list(await asyncio.to_thread(read_names, repository))
+        if ids:
+            await repository.delete_bulk(ids, None, SEED_BATCH)
+
+    for start in range(0, rows, SEED_BATCH):
+        await repository.create_bulk([
+            TaskValidation(taskname=f'Seed {number}',
+                           description=f'Description of task number {number}',
+                           category=f'Category {number % CATEGORIES}')
+            for number in range(start, min(start + SEED_BATCH, rows))], SEED_BATCH)
+    return await asyncio.to_thread(read_names, repository)
+
+
+def unwrap(repository: TaskRepository) -> TaskRepository:
+    """
+    Хранилище под BatchingRepository (config.batching).
+    """
+    if isinstance(repository, BatchingRepository):
+        return repository.inner
+    return repository
+
+
+def use_database(database: str, directory: str) -> None:
+    """
+    Выбирает хранилище до импорта приложения.
+    """
+    path = os.path.join(directory, 'tasks.db')
+    if database in ('memory', 'sqlite'):
+        config.storage.backend = database
+        config.storage.sqlite_path = path
+        return
+    if database != 'standin':
+        return
+
+    # pylint: disable=import-outside-toplevel
+    from app.routers import tasks
+    from app.services import sqlite
+
+    sqlite.create_schema(path)
+    storage = unwrap(tasks.repository)
+    assert isinstance(storage, MySQLRepository)
+    storage.db.connect = lambda: sqlite.Connection(path, timeout=30)  # type: ignore[method-assign]
+    # Подготовленные выражения - протокол MySQL
+    config.db.prepared_statements = False
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    # Приложение импортируется после выбора базы данных
+    import run  # pylint: disable=import-outside-toplevel
+    from app.routers import tasks  # pylint: disable=import-outside-toplevel
+
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=run.app)
+    async with run.lifespan(run.app):
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            while not tasks.repository.status().ready:
+                error = tasks.repository.status().startup_error
+                if error:
+                    raise SystemExit(f'Нет соединения с базой данных: {error}')
+                await asyncio.sleep(0.05)
+
+            for rows in args.rows:
+                seeded = await seed(tasks.repository, rows)
+                workload = Workload(seeded, args.page_size, random.Random(args.seed))
+                requests = {
+                    'get_one': workload.get_one,
+                    'get_all': workload.get_all,
+                    'update': workload.update,
+                    'create': workload.create,
+                    'mixed': workload.mixed(args.read_ratio),
+                    'delete': workload.delete,
+                }
+                for name in args.scenarios:
+                    count = args.requests
+                    if name == 'delete':
+                        count = min(count, len(workload.ids) - args.warmup)
+                    result = await run_scenario(client, requests[name], count,
+                                                args.concurrency, args.warmup)
+                    results[f'{name}@{rows}'] = result
+                    print_result(f'{name}@{rows}', result)
+    return results
+
+
+def print_header() -> None:
+    print(f'{"scenario":<18}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+          f'{"errors":>8}{"RSS MB":>9}{"+RSS MB":>9}')
+
+
+def print_result(name: str, result: Dict[str, Any]) -> None:
+    print(f'{name:<18}{result["rps"]:>9.0f}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+          f'{result["p99_ms"]:>9.2f}{sum(result["errors"].values()):>8}'
+          f'{result["rss_mb"]:>9.1f}{result["rss_delta_mb"]:>9.1f}', flush=True)
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float) -> List[Tuple[str, str]]:
+    """
+    Сравнивает результаты с базовыми.
+
+    Returns:
+        Регрессии: (сценарий, описание).
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append((name, f'p95 {base["p95_ms"]:.2f} -> {result["p95_ms"]:.2f} ms'))
+        if result['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append((name, f'req/s {base["rps"]:.0f} -> {result["rps"]:.0f}'))
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', choices=('standin', 'mysql', 'sqlite', 'memory'),
+                        default='standin')
+    parser.add_argument('--batching', type=int, default=0, metavar='ROWS',
+                        help='объединять POST /tasks/ в пачки до ROWS задач (config.batching)')
+    parser.add_argument('--allow-reset', action='store_true',
+                        help='разрешить очистку таблицы tasks в MySQL')
+    parser.add_argument('--rows', default='1000,100000',
+                        type=lambda value: [int(rows) for rows in value.split(',')])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        type=lambda value: value.split(','))
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--read-ratio', type=float, default=0.8)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', help='сохранить результаты в json-файл')
+    parser.add_argument('--baseline', help='сравнить с результатами из json-файла')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+    # Удаление уменьшает таблицу, поэтому выполняется последним
+    args.scenarios = [name for name in SCENARIOS if name in args.scenarios]
+    if args.database == 'mysql' and not args.allow_reset:
+        parser.error('Тест очищает таблицу tasks в MySQL: укажите --allow-reset')
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    if args.batching:
+        config.batching.enabled = True
+        config.batching.max_rows = args.batching
+
+    with tempfile.TemporaryDirectory() as directory:
+        use_database(args.database, directory)
+        print_header()
+        results = asyncio.run(benchmark(args))
+
+    report = {
+        'meta': {
+            'database': args.database,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'read_ratio': args.read_ratio,
+            'batching': args.batching,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+            file.write('\n')
+        print(f'Результаты сохранены: {args.save}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline.get('meta', {}).get('database') != args.database:
+            print('Базовые результаты получены на другой базе данных')
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for name, description in regressions:
+            print(f'Регрессия {name}: {description}')
+        if regressions:
+            return 1
+        print(f'Регрессий нет (допуск {args.tolerance:.0%})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
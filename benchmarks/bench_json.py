@@ -0,0 +1,91 @@
+"""
+Бенчмарк сериализации ответа GET /tasks/: время и выделения памяти.
+
+Сравниваются:
+    jsonable_encoder - прежний путь: jsonable_encoder + JSONResponse (стандартный json);
+    fast (json)      - FastJSONResponse без orjson;
+    fast (orjson)    - FastJSONResponse с orjson (если установлен).
+
+Время - лучший из '--repeat' прогонов, память - пик выделений по tracemalloc за один прогон
+(промежуточные структуры и готовое тело ответа).
+
+Запуск:
+    python -m benchmarks.bench_json --rows 10000 --repeat 20
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import app.responses
+from app.responses import FastJSONResponse
+
+
+def make_page(rows: int) -> dict:
+    """
+    Страница GET /tasks/ в том виде, в котором ее возвращает TaskService.get_all.
+    """
+    start = datetime(2023, 12, 11, 19, 35, 46)
+    data = [{
+        'id': i,
+        'taskname': f'Task {i}',
+        'description': f'Description of task number {i}',
+        'category': f'Category {i % 20}',
+        'creation_date': start + timedelta(seconds=i),
+        'version': 1,
+        'updated_at': start + timedelta(seconds=i, microseconds=123456),
+    } for i in range(1, rows + 1)]
+    return {'data': data, 'next_cursor': 'eyJpZCI6MTAwMDB9'}
+
+
+def old_path(content: dict) -> bytes:
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def fast_path(content: dict) -> bytes:
+    return FastJSONResponse(content=content).body
+
+
+def measure(func, content: dict, repeat: int) -> dict:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(content)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'ms': best * 1000, 'peak_mb': peak / 2 ** 20, 'size': len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    content = make_page(args.rows)
+    # (название, функция, использовать ли orjson)
+    scenarios = [('jsonable_encoder', old_path, False), ('fast (json)', fast_path, False)]
+    if app.responses.orjson is not None:
+        scenarios.append(('fast (orjson)', fast_path, True))
+
+    print(f'{"path":<18}{"ms":>10}{"peak, MB":>10}{"bytes":>10}')
+    for name, func, use_orjson in scenarios:
+        orjson = app.responses.orjson if use_orjson else None
+        with patch.object(app.responses, 'orjson', orjson):
+            result = measure(func, content, args.repeat)
+        print(f'{name:<18}{result["ms"]:>10.1f}{result["peak_mb"]:>10.1f}{result["size"]:>10}')
+
+
+if __name__ == '__main__':
+    main()
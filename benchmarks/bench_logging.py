@@ -0,0 +1,138 @@
+"""
+Бенчмарк затрат на журнал в потоке запроса.
+
+Один запрос - 8 вызовов DEBUG с данными задачи и 1 вызов INFO. Сравниваются:
+    old         - прежняя настройка: уровень DEBUG, f-строки, запись в поток в потоке запроса;
+    info        - уровень INFO: вызовы DEBUG отбрасываются до форматирования;
+    info_queue  - уровень INFO, запись через очередь;
+    queue       - уровень DEBUG, json, запись через очередь (app.logger, config.log.queue);
+    queue_10pct - то же, пропускается 10% записей DEBUG (config.log.debug_sample_rate).
+
+Вывод журнала направляется в /dev/null, '--write-us' добавляет задержку к каждой записи
+в поток (медленный диск или сборщик журнала, заполненный pipe). Время (us/request) - в потоке,
+который пишет в журнал (поток записи очереди работает параллельно), лучшее из '--repeat';
+cpu/request - процессорное время всех потоков, включая дописывание очереди.
+
+Запуск:
+    python -m benchmarks.bench_logging --requests 20000 --write-us 0
+    python -m benchmarks.bench_logging --requests 20000 --write-us 50
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Tuple
+
+from app.config import LoggerConfig, config
+from app.logger import TEXT_FORMAT, configure_logging, stop_logging
+
+TASK = {'taskname': 'Task 1', 'description': 'Description of task number 1',
+        'category': 'Category 1'}
+
+
+class SlowStream:
+    """
+    Поток вывода с задержкой записи.
+    """
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def request_eager(logger: logging.Logger) -> None:
+    for i in range(8):
+        logger.debug(f'data: {TASK} step {i}')
+    logger.info(f'created task {TASK["taskname"]}')
+
+
+def request_lazy(logger: logging.Logger) -> None:
+    for i in range(8):
+        logger.debug('data: %s step %s', TASK, i)
+    logger.info('created task %s', TASK['taskname'], extra={'fields': {'task_id': 1}})
+
+
+def clear_handlers() -> None:
+    stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+
+def setup_old(logger: logging.Logger) -> None:
+    clear_handlers()
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    logging.getLogger().addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+
+
+def setup(level: int, **kwargs):
+    def apply(logger: logging.Logger) -> None:
+        clear_handlers()
+        configure_logging(LoggerConfig(**kwargs))
+        logger.setLevel(level)
+    return apply
+
+
+def measure(logger: logging.Logger, apply, request, count: int,
+            repeat: int) -> Tuple[float, float]:
+    best = cpu = float('inf')
+    for _ in range(repeat):
+        apply(logger)
+        start, cpu_start = time.perf_counter(), time.process_time()
+        for _ in range(count):
+            request(logger)
+        best = min(best, time.perf_counter() - start)
+        # Очередь дописывается вне замера времени запроса, но входит в процессорное время
+        stop_logging()
+        cpu = min(cpu, time.process_time() - cpu_start)
+    return best / count * 1e6, cpu / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--write-us', type=float, default=0.0)
+    args = parser.parse_args()
+
+    variants = (
+        ('old', setup_old, request_eager),
+        ('info', setup(logging.INFO, format='text', queue=False), request_lazy),
+        ('info_queue', setup(logging.INFO, format='text', queue=True), request_lazy),
+        ('queue', setup(logging.DEBUG, format='json', queue=True), request_lazy),
+        ('queue_10pct', setup(logging.DEBUG, format='json', queue=True, debug_sample_rate=0.1),
+         request_lazy),
+    )
+    logger = logging.getLogger('bench')
+    results = []
+    stderr = sys.stderr
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        sys.stderr = SlowStream(devnull, args.write_us / 1e6)
+        try:
+            for name, apply, request in variants:
+                results.append((name, measure(logger, apply, request, args.requests,
+                                              args.repeat)))
+        finally:
+            sys.stderr = stderr
+            configure_logging(config.log)
+
+    print(f'{"variant":<14}{"us/request":>12}{"cpu/request":>13}')
+    for name, (us, cpu) in results:
+        print(f'{name:<14}{us:>12.1f}{cpu:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Бенчмарк: задержки TaskService под конкурентной нагрузкой
+при выполнении запросов в цикле событий ('inline') и в пуле потоков ('threadpool').
+
+Запрос к MySQL имитируется курсором, который блокирует поток на 'query_ms' миллисекунд.
+
+Запуск:
+    python -m benchmarks.bench_offload --requests 1000 --rate 500 --query-ms 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from unittest.mock import MagicMock
+
+from app.services.executor import INLINE, THREADPOOL, QueryExecutor
+from app.services.mysql import TaskService
+
+
+def slow_cursor(query_ms: float) -> MagicMock:
+    """
+    Курсор, имитирующий блокирующий запрос к базе данных.
+    """
+    cursor = MagicMock()
+    cursor.execute.side_effect = lambda *args: time.sleep(query_ms / 1000)
+    cursor.description = [('id',), ('taskname',)]
+    cursor.fetchall.return_value = [(1, 'Task 1')]
+    return cursor
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run_scenario(mode: str, requests: int, rate: float, query_ms: float, workers: int):
+    """
+    Открытая модель нагрузки: запросы поступают с частотой 'rate' в секунду,
+    задержка считается от момента поступления запроса до получения ответа.
+    """
+    service = TaskService(executor=QueryExecutor(mode=mode, max_workers=workers))
+    loop = asyncio.get_running_loop()
+    latencies = []
+
+    async def request(task_id, arrival):
+        await asyncio.sleep(max(0.0, arrival - loop.time()))
+        await service.executor.run(service.get_one, slow_cursor(query_ms), task_id)
+        latencies.append(loop.time() - arrival)
+
+    started = loop.time()
+    await asyncio.gather(*(request(i, started + i / rate) for i in range(requests)))
+    elapsed = loop.time() - started
+    service.executor.shutdown()
+
+    return {
+        'mode': mode,
+        'rps': requests / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=500, help='запросов в секунду')
+    parser.add_argument('--query-ms', type=float, default=5)
+    parser.add_argument('--workers', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f'{"mode":<12}{"req/s":>10}{"p50, ms":>10}{"p99, ms":>10}')
+    for mode in (INLINE, THREADPOOL):
+        result = asyncio.run(run_scenario(mode, args.requests, args.rate,
+                                          args.query_ms, args.workers))
+        print(f'{result["mode"]:<12}{result["rps"]:>10.0f}'
+              f'{result["p50_ms"]:>10.1f}{result["p99_ms"]:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Бенчмарк памяти и времени построения страницы GET /tasks/ из строк курсора.
+
+Сравниваются:
+    dict - прежний путь: dict(zip(columns, row)) для каждой строки;
+    row  - app.rows: объект класса со '__slots__', общего для набора столбцов.
+
+Для каждого варианта по tracemalloc измеряется память, которую занимают построенные строки
+(в пересчете на одну строку), и пик выделений при построении страницы и сериализации ответа.
+
+Запуск:
+    python -m benchmarks.bench_rows --rows 10000 --repeat 20
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app.responses import FastJSONResponse
+from app.rows import make_rows
+
+DESCRIPTION = [('id',), ('taskname',), ('description',), ('category',), ('creation_date',),
+               ('version',), ('updated_at',)]
+
+
+def cursor_rows(count: int) -> list:
+    """
+    Кортежи в том виде, в котором их возвращает курсор mysql-connector.
+    """
+    start = datetime(2023, 12, 11, 19, 35, 46)
+    return [(i, f'Task {i}', f'Description of task number {i}', f'Category {i % 20}',
+             start + timedelta(seconds=i), 1, start + timedelta(seconds=i, microseconds=1))
+            for i in range(1, count + 1)]
+
+
+def dict_rows(rows: list) -> list:
+    columns = [column[0] for column in DESCRIPTION]
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def slot_rows(rows: list) -> list:
+    return make_rows(DESCRIPTION, rows)
+
+
+def measure(build, rows: list, repeat: int) -> dict:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        FastJSONResponse(content={'data': build(rows), 'next_cursor': None})
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    page = build(rows)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    FastJSONResponse(content={'data': page, 'next_cursor': None})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'ms': best * 1000, 'bytes_per_row': retained / len(rows), 'peak_mb': peak / 2 ** 20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = cursor_rows(args.rows)
+    print(f'{"rows":<8}{"build+encode, ms":>18}{"bytes/row":>12}{"encode peak, MB":>18}')
+    for name, build in (('dict', dict_rows), ('row', slot_rows)):
+        result = measure(build, rows, args.repeat)
+        print(f'{name:<8}{result["ms"]:>18.1f}{result["bytes_per_row"]:>12.0f}'
+              f'{result["peak_mb"]:>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Микро-бенчмарк кэша подготовленных выражений.
+
+Прогоняет смесь запросов TaskService (get_one/create/get_all/update/delete) через DB.get_cursor
+и выводит долю попаданий в кэш выражений и количество подготовок на сервере.
+
+По умолчанию используются имитации соединений, считающие подготовки выражений.
+С флагом --mysql запросы выполняются на базе из 'config.db' и дополнительно сравнивается
+время выполнения get_one текстовыми запросами и подготовленными выражениями.
+
+Запуск:
+    python -m benchmarks.bench_statements --requests 10000
+    python -m benchmarks.bench_statements --mysql --requests 2000
+"""
+
+import argparse
+import random
+import time
+from unittest.mock import MagicMock, patch
+
+from app.config import config
+from app.database import DB
+from app.schemes.task import TaskValidation
+from app.services.executor import INLINE, QueryExecutor
+from app.services.mysql import TaskService
+
+MIX = [('get_one', 70), ('get_all', 15), ('create', 10), ('update', 4), ('delete', 1)]
+
+
+class FakePreparedCursor:
+    """
+    Имитация MySQLCursorPrepared: готовит выражение, если текст запроса сменился.
+    """
+    prepares = 0
+
+    def __init__(self):
+        self.statement = None
+        self.rowcount = 1
+        self.lastrowid = 1
+        self.description = [('id',), ('taskname',)]
+
+    def execute(self, query, params=()):
+        if query != self.statement:
+            FakePreparedCursor.prepares += 1
+            self.statement = query
+
+    def fetchall(self):
+        return [(1, 'Task 1')]
+
+    def close(self):
+        pass
+
+
+def fake_connection():
+    conn = MagicMock()
+    conn.is_connected.return_value = True
+    conn.cursor.side_effect = lambda **kwargs: FakePreparedCursor()
+    return conn
+
+
+def run_mix(db, service, requests):
+    names = [name for name, weight in MIX for _ in range(weight)]
+    data = TaskValidation(taskname='Task 1')
+    started = time.perf_counter()
+    for number in range(requests):
+        name = random.choice(names)
+        gen = db.get_cursor()
+        cursor = next(gen)
+        try:
+            if name == 'get_one':
+                service.get_one(cursor, number % 100 + 1)
+            elif name == 'get_all':
+                service.get_all(cursor, 100)
+            elif name == 'create':
+                service.create(cursor, data)
+            elif name == 'update':
+                service.update(cursor, data, 1)
+            else:
+                service.delete(cursor, 1)
+        except Exception:  # pylint: disable=broad-except
+            pass  # 404/409 на реальной базе не важны для замера
+        finally:
+            gen.close()
+    return time.perf_counter() - started
+
+
+def time_get_one(db, service, requests, prepared):
+    config.db.prepared_statements = prepared
+    started = time.perf_counter()
+    for number in range(requests):
+        gen = db.get_cursor()
+        try:
+            service.get_one(next(gen), number % 100 + 1)
+        except Exception:  # pylint: disable=broad-except
+            pass
+        finally:
+            gen.close()
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--mysql', action='store_true', help='использовать базу из config.db')
+    args = parser.parse_args()
+
+    config.db.pool_min_size = args.connections
+    config.db.pool_max_size = args.connections
+    service = TaskService(executor=QueryExecutor(mode=INLINE))
+
+    if args.mysql:
+        db = DB()
+        print(f'get_one, текстовый запрос:       {time_get_one(db, service, args.requests, False):8.1f} мкс')
+        print(f'get_one, подготовленное выражение: {time_get_one(db, service, args.requests, True):8.1f} мкс')
+        elapsed = run_mix(db, service, args.requests)
+    else:
+        with patch('mysql.connector.connect', side_effect=lambda **kwargs: fake_connection()):
+            db = DB()
+            elapsed = run_mix(db, service, args.requests)
+
+    stats = db.statement_stats()
+    print(f'запросов: {args.requests}, соединений: {args.connections}, {elapsed:.2f} с')
+    print(f'кэш выражений: попаданий {stats.hits}, промахов {stats.misses}, '
+          f'доля попаданий {stats.hit_rate:.2%}')
+    if not args.mysql:
+        print(f'подготовок выражений на сервере: {FakePreparedCursor.prepares}')
+
+
+if __name__ == '__main__':
+    main()
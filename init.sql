@@ -4,4 +4,55 @@ CREATE TABLE IF NOT EXISTS tasks(
             description VARCHAR(500),
             category VARCHAR(100),
             creation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            INDEX (taskname));
+            version INT NOT NULL DEFAULT 1,
+            updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+                ON UPDATE CURRENT_TIMESTAMP(6),
+            INDEX (taskname),
+            -- Фильтры и сортировки списка задач (TaskService.list_query)
+            INDEX (category, id),
+            INDEX (creation_date, id),
+            INDEX (category, creation_date, id));
+
+-- Таблица 'tasks', созданная первой версией init.sql: добавляем версию строки,
+-- время изменения и индексы списка задач. Повторный запуск ничего не меняет
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.COLUMNS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tasks'
+                 AND COLUMN_NAME = 'version') = 0,
+              'ALTER TABLE tasks
+                   ADD COLUMN version INT NOT NULL DEFAULT 1,
+                   ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+                       ON UPDATE CURRENT_TIMESTAMP(6),
+                   ADD INDEX (category, id),
+                   ADD INDEX (creation_date, id),
+                   ADD INDEX (category, creation_date, id)',
+              'DO 0');
+PREPARE migrate FROM @ddl;
+EXECUTE migrate;
+DEALLOCATE PREPARE migrate;
+
+-- Полнотекстовый поиск GET /tasks/search
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tasks'
+                 AND INDEX_NAME = 'tasks_search') = 0,
+              'CREATE FULLTEXT INDEX tasks_search ON tasks (taskname, description)',
+              'DO 0');
+PREPARE migrate FROM @ddl;
+EXECUTE migrate;
+DEALLOCATE PREPARE migrate;
+
+-- Версии таблиц для условных запросов к спискам (ETag списка без чтения строк).
+-- Версию увеличивает TaskService один раз за транзакцию (bump_table_version)
+CREATE TABLE IF NOT EXISTS table_versions(
+            name VARCHAR(64) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+                ON UPDATE CURRENT_TIMESTAMP(6));
+
+INSERT IGNORE INTO table_versions (name) VALUES ('tasks');
+
+-- Версия строки растет только при изменении данных задачи
+CREATE TRIGGER IF NOT EXISTS tasks_version_bump BEFORE UPDATE ON tasks FOR EACH ROW
+    SET NEW.version = IF(NEW.taskname <=> OLD.taskname
+                         AND NEW.description <=> OLD.description
+                         AND NEW.category <=> OLD.category,
+                         OLD.version, OLD.version + 1);
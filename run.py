@@ -4,21 +4,66 @@
 Запуск приложения
 """
 
+import asyncio
+import contextlib
+import importlib
+import importlib.util
+from typing import Any, AsyncIterator, Dict
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 
-from app.config import config
+from app.config import ServerConfig, config
 from app.logger import log
-from app.routers import tasks
+from app.metrics import MetricsMiddleware
+from app.profiling import ProfilingMiddleware
+from app.replicas import ReadYourWritesMiddleware
+from app.routers import health, metrics, tasks
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """
+    Подготовка хранилища задач при запуске рабочего процесса (для MySQL - подключение
+    и прогрев пула) и освобождение ресурсов при остановке.
+    Подготовка выполняется в фоне и не задерживает запуск сервера:
+    пока хранилище не готово, /ready отвечает 503. Затем соединения пула проверяются в фоне.
+    """
+    async def database() -> None:
+        await tasks.repository.start()
+        await tasks.repository.monitor()
+
+    background = asyncio.create_task(database())
+    yield
+    # Задачи, ожидающие записи пачкой (config.batching), записываются до закрытия хранилища
+    await tasks.repository.drain()
+    background.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await background
+    tasks.repository.close()
+    log.debug('Repository closed')
+
 
 # Создание приложения
-app = FastAPI(title="Task Hub")
+app = FastAPI(title="Task Hub", lifespan=lifespan)
 log.debug('App created: %s', app)
 
 # Регистрация эндпоинтов
 app.include_router(tasks.router, prefix='/tasks', tags=["Tasks"])
 log.debug('Router registered: /tasks')
+app.include_router(health.router, tags=["Health"])
+log.debug('Router registered: /ready, /health')
+app.include_router(metrics.router)
+log.debug('Router registered: /metrics')
+
+# Количество и время обработки запросов по маршрутам
+app.add_middleware(MetricsMiddleware)
+# Время этапов запроса (Server-Timing), по настройке или заголовку с токеном администратора
+app.add_middleware(ProfilingMiddleware)
+# Клиент читает свои изменения с основного сервера, пока реплики могут отставать
+if config.db.replicas and config.db.read_your_writes > 0:
+    app.add_middleware(ReadYourWritesMiddleware, window=config.db.read_your_writes)
 
 
 @app.get("/", include_in_schema=False)
@@ -27,7 +72,70 @@ async def redirect_to_docs():
     return RedirectResponse(url="/docs")
 
 
+def gunicorn_options(server: ServerConfig) -> Dict[str, Any]:
+    """
+    Настройки gunicorn: рабочие процессы uvicorn, плавная остановка и перезапуск.
+    """
+    return {
+        'bind': f'{server.host}:{server.port}',
+        'workers': server.workers,
+        'worker_class': 'uvicorn.workers.UvicornWorker',
+        'graceful_timeout': int(server.graceful_timeout),
+        # Приложение импортируется в каждом рабочем процессе после fork,
+        # мастер-процесс не открывает соединений с базой данных
+        'preload_app': False,
+    }
+
+
+def run_gunicorn(server: ServerConfig) -> None:
+    """
+    Запускает рабочие процессы под управлением gunicorn.
+    SIGHUP плавно заменяет рабочие процессы: новые запускаются,
+    старые завершают текущие запросы (не дольше graceful_timeout).
+    """
+    # Необязательная зависимость, нужна только для этого режима
+    # pylint: disable-next=import-outside-toplevel
+    from gunicorn.app.base import BaseApplication  # type: ignore[import-untyped]
+
+    class Application(BaseApplication):  # pylint: disable=abstract-method
+        """Приложение gunicorn с настройками из 'config.server'"""
+
+        def load_config(self) -> None:
+            for key, value in gunicorn_options(server).items():
+                self.cfg.set(key, value)
+
+        def load(self) -> Any:
+            return importlib.import_module('run').app
+
+    Application().run()
+
+
+def serve(server: ServerConfig) -> None:
+    """
+    Запускает сервер с 'server.workers' рабочими процессами.
+    Один процесс - uvicorn в текущем процессе, несколько - gunicorn (если установлен
+    или выбран в 'server.manager') или встроенный менеджер процессов uvicorn.
+    """
+    log.info('Configuration loaded: %s, workers: %s', config.config_type, server.workers)
+    if server.workers <= 1:
+        uvicorn.run(app, host=server.host, port=server.port,
+                    timeout_graceful_shutdown=int(server.graceful_timeout))
+        return
+
+    manager = server.manager
+    if manager == 'auto':
+        manager = 'gunicorn' if importlib.util.find_spec('gunicorn') else 'uvicorn'
+
+    if manager == 'gunicorn':
+        run_gunicorn(server)
+    elif manager == 'uvicorn':
+        # Рабочие процессы запускаются заново и импортируют приложение сами
+        uvicorn.run('run:app', host=server.host, port=server.port, workers=server.workers,
+                    timeout_graceful_shutdown=int(server.graceful_timeout))
+    else:
+        raise ValueError(f'Неизвестный менеджер процессов: {manager}')
+
+
 # Запуск приложения
 if __name__ == "__main__":
-    log.info('Configuration loaded: %s', config.config_type)
-    uvicorn.run(app, host='0.0.0.0')
+    serve(config.server)
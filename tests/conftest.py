@@ -12,6 +12,12 @@ from app.services.mysql import TaskService
 def cursor():
     return MagicMock()
 
+@pytest.fixture
+def connection(cursor):
+    connection = MagicMock()
+    connection.cursor.return_value = cursor
+    return connection
+
 @pytest.fixture
 def data():
     return TaskValidation(
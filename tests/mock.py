@@ -25,10 +25,15 @@ class Mock:
         # db.is_connected = True
         self.mock_db.is_connected.return_value = True
 
+        # Нет открытой транзакции и непрочитанных строк
+        self.mock_db.in_transaction = False
+        self.mock_db.unread_result = False
+
         # db.cursor = cursor
         self.mock_db.cursor.return_value = self.mock_cursor
 
-        # создаемт объект класса DB
+        # создаемт объект класса DB (флаг мог остаться после импорта роутеров)
+        DB.initialized = False
         self.db_class = DB()
 
         # Устанавливаем в False, чтобы класс инициализировался каждый раз при запуске
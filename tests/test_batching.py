@@ -0,0 +1,127 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import BatchingConfig, CacheConfig, SearchConfig, StorageConfig
+from app.schemes.task import TaskValidation
+from app.services.batching import BatchingRepository
+from app.services.memory import MemoryRepository
+from app.services.storage import create_repository
+
+
+def task(number):
+    return TaskValidation(taskname=f'Task {number}', description=f'Description {number}',
+                          category='Category 1')
+
+
+@pytest.fixture
+def inner():
+    inner = MemoryRepository()
+    inner.create_bulk = AsyncMock(side_effect=inner.create_bulk)
+    return inner
+
+
+def batching(inner, **kwargs):
+    return BatchingRepository(inner, BatchingConfig(enabled=True, **kwargs))
+
+
+class TestBatching:
+    @pytest.mark.asyncio
+    async def test_creates_share_one_insert(self, inner):
+        # Arrange
+        repository = batching(inner, max_rows=10, max_delay_ms=50)
+        await repository.start()
+
+        # Action
+        results = await asyncio.gather(
+            *(repository.create(task(number)) for number in (1, 2, 1, 3)),
+            return_exceptions=True)
+
+        # Assert
+        inner.create_bulk.assert_awaited_once()
+        assert results[:2] == [None, None] and results[3] is None
+        # Повтор названия в той же пачке - 409 только у второй задачи
+        assert isinstance(results[2], HTTPException) and results[2].status_code == 409
+        page, _ = await inner.get_all(10)
+        assert [row['taskname'] for row in page] == ['Task 1', 'Task 2', 'Task 3']
+        await repository.drain()
+
+    @pytest.mark.asyncio
+    async def test_max_rows(self, inner):
+        # Arrange
+        repository = batching(inner, max_rows=2, max_delay_ms=50)
+        await repository.start()
+
+        # Action
+        await asyncio.gather(*(repository.create(task(number)) for number in range(5)))
+
+        # Assert
+        sizes = [len(call.args[0]) for call in inner.create_bulk.await_args_list]
+        assert sizes == [2, 2, 1]
+        await repository.drain()
+
+    @pytest.mark.asyncio
+    async def test_not_started_creates_directly(self, inner):
+        repository = batching(inner)
+
+        await repository.create(task(1))
+
+        inner.create_bulk.assert_not_awaited()
+        assert (await inner.get_one(1))['taskname'] == 'Task 1'
+
+    @pytest.mark.asyncio
+    async def test_queue_full_err503(self, inner):
+        # Arrange
+        repository = batching(inner, max_queue=1, max_delay_ms=50)
+        await repository.start()
+
+        # Action: очередь разбирается, когда запросы уже поставили задачи
+        results = await asyncio.gather(*(repository.create(task(number)) for number in range(3)),
+                                       return_exceptions=True)
+
+        # Assert
+        assert results[0] is None
+        assert [result.status_code for result in results[1:]] == [503, 503]
+        await repository.drain()
+
+    @pytest.mark.asyncio
+    async def test_batch_error_fails_each_request(self, inner):
+        # Arrange
+        inner.create_bulk.side_effect = RuntimeError('connection lost')
+        repository = batching(inner, max_delay_ms=50)
+        await repository.start()
+
+        # Action
+        results = await asyncio.gather(repository.create(task(1)), repository.create(task(2)),
+                                       return_exceptions=True)
+
+        # Assert
+        assert all(isinstance(result, HTTPException) and result.status_code == 500
+                   for result in results)
+        assert results[0] is not results[1]
+        await repository.drain()
+
+    @pytest.mark.asyncio
+    async def test_drain_flushes_queue(self, inner):
+        # Arrange
+        repository = batching(inner, max_delay_ms=1000)
+        await repository.start()
+        pending = asyncio.ensure_future(repository.create(task(1)))
+        await asyncio.sleep(0)
+
+        # Action
+        await repository.drain()
+
+        # Assert
+        assert pending.done() and pending.exception() is None
+        await repository.create(task(2))
+        assert inner.create_bulk.await_count == 1
+
+
+def test_create_repository_wraps():
+    repository = create_repository(StorageConfig(backend='memory'), CacheConfig(),
+                                   SearchConfig(), batching_config=BatchingConfig(enabled=True))
+    assert isinstance(repository, BatchingRepository)
+    assert isinstance(repository.inner, MemoryRepository)
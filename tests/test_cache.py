@@ -0,0 +1,159 @@
+"""
+Тесты кэша записей
+"""
+
+import pytest
+
+from app.config import CacheConfig
+from app.services.cache import LRUCache, RedisCache, create_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """
+    Локальная замена клиента Redis: только используемые кэшем команды.
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, px=None):
+        self.data[key] = value
+        self.px = px
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def cache(request):
+    if request.param == 'memory':
+        return LRUCache(max_size=10, ttl=60)
+    return RedisCache(FakeRedis(), ttl=60)
+
+
+class TestCommon:
+    def test_hit_and_miss(self, cache):
+        # Action
+        assert cache.get('task:1') is None
+        cache.set('task:1', {'id': 1}, cache.version('task:1'))
+
+        # Assert
+        assert cache.get('task:1') == {'id': 1}
+        stats = cache.stats()
+        assert (stats.hits, stats.misses) == (1, 1)
+
+    def test_invalidate(self, cache):
+        # Arrange
+        cache.set('task:1', {'id': 1}, cache.version('task:1'))
+
+        # Action
+        cache.invalidate('task:1')
+
+        # Assert
+        assert cache.get('task:1') is None
+        assert cache.stats().invalidations == 1
+
+    def test_stale_read_not_cached(self, cache):
+        """
+        Читающий запрос начался до удаления, а закончился после фиксации удаления:
+        прочитанная им строка не должна попасть в кэш
+        """
+        # Arrange
+        version = cache.version('task:1')  # читающий запомнил версию
+        cache.invalidate('task:1')  # удаление до фиксации
+        cache.invalidate('task:1')  # после фиксации
+
+        # Action
+        cache.set('task:1', {'id': 1}, version)
+
+        # Assert
+        assert cache.get('task:1') is None
+
+
+class TestLRU:
+    def test_eviction(self):
+        # Arrange
+        cache = LRUCache(max_size=2, ttl=60)
+        for key in ('a', 'b'):
+            cache.set(key, key, cache.version(key))
+        cache.get('a')  # 'b' становится давно неиспользуемым
+
+        # Action
+        cache.set('c', 'c', cache.version('c'))
+
+        # Assert
+        assert cache.get('b') is None
+        assert cache.get('a') == 'a'
+        assert cache.stats().evictions == 1
+        assert cache.stats().size == 2
+
+    def test_ttl(self):
+        # Arrange
+        clock = FakeClock()
+        cache = LRUCache(max_size=2, ttl=10, clock=clock)
+        cache.set('a', 'a', cache.version('a'))
+
+        # Action
+        clock.now = 11
+
+        # Assert
+        assert cache.get('a') is None
+        assert cache.stats().expirations == 1
+
+    def test_versions_bounded(self):
+        # Arrange
+        cache = LRUCache(max_size=2, ttl=60)
+        version = cache.version('a')
+
+        # Action
+        for key in ('a', 'b', 'c'):
+            cache.invalidate(key)
+
+        # Assert
+        # Словарь версий сброшен, но старая версия 'a' по-прежнему не подходит
+        assert len(cache._versions) == 0
+        assert cache.set('a', 'a', version) is False
+        assert cache.set('a', 'a', cache.version('a')) is True
+
+
+def test_redis_subsecond_ttl():
+    # Redis отклоняет нулевое время жизни: ttl < 1 передается в миллисекундах
+    client = FakeRedis()
+    cache = RedisCache(client, ttl=0.5)
+
+    cache.set('a', 'a', cache.version('a'))
+
+    assert client.px == 500
+
+
+def test_create_cache():
+    assert create_cache(CacheConfig(backend='none')) is None
+    assert isinstance(create_cache(CacheConfig(backend='memory')), LRUCache)
+    with pytest.raises(ValueError):
+        create_cache(CacheConfig(backend='unknown'))
+
+
+def test_create_cache_workers():
+    # Кэш в памяти не согласован между рабочими процессами
+    assert create_cache(CacheConfig(backend='memory'), workers=4) is None
+    assert isinstance(create_cache(CacheConfig(backend='memory'), workers=1), LRUCache)
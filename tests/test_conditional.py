@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.conditional import (http_date, list_etag, not_modified, not_modified_response,
+                             task_etag, validators)
+
+
+UPDATED_AT = datetime(2024, 1, 1, 12, 0, 0, 500000)
+
+
+def test_task_etag_changes_with_version():
+    assert task_etag({'id': 1, 'version': 1}) == '"1.1"'
+    assert task_etag({'id': 1, 'version': 2}) != task_etag({'id': 1, 'version': 1})
+
+
+def test_list_etag_depends_on_page():
+    etag = list_etag(7, 'id', {'id': 0}, 100)
+
+    assert etag.startswith('"tasks.7.') and etag.endswith('"')
+    assert list_etag(7, 'id', {'id': 0}, 100) == etag
+    assert list_etag(7, 'id', {'id': 100}, 100) != etag
+    assert list_etag(8, 'id', {'id': 0}, 100) != etag
+
+
+def test_http_date_naive_is_utc():
+    assert http_date(UPDATED_AT) == 'Mon, 01 Jan 2024 12:00:00 GMT'
+    assert http_date(UPDATED_AT.replace(tzinfo=timezone.utc)) == http_date(UPDATED_AT)
+
+
+def test_validators():
+    headers = validators('"1.1"', UPDATED_AT)
+
+    assert headers == {'ETag': '"1.1"', 'Cache-Control': 'no-cache',
+                       'Last-Modified': 'Mon, 01 Jan 2024 12:00:00 GMT'}
+    assert 'Last-Modified' not in validators('"1.1"')
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('"1.1"', True),
+    ('W/"1.1"', True),
+    ('"0.9", "1.1"', True),
+    ('*', True),
+    ('"1.2"', False),
+])
+def test_if_none_match(header, expected):
+    assert not_modified({'if-none-match': header}, '"1.1"', UPDATED_AT) is expected
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('Mon, 01 Jan 2024 12:00:00 GMT', True),
+    ('Mon, 01 Jan 2024 13:00:00 GMT', True),
+    ('Mon, 01 Jan 2024 11:59:59 GMT', False),
+    ('not a date', False),
+])
+def test_if_modified_since(header, expected):
+    assert not_modified({'if-modified-since': header}, '"1.1"', UPDATED_AT) is expected
+
+
+def test_if_none_match_takes_precedence():
+    headers = {'if-none-match': '"1.2"', 'if-modified-since': 'Mon, 01 Jan 2024 13:00:00 GMT'}
+
+    assert not not_modified(headers, '"1.1"', UPDATED_AT)
+
+
+def test_no_conditions():
+    assert not not_modified({}, '"1.1"', UPDATED_AT)
+
+
+def test_not_modified_response():
+    response = not_modified_response({'ETag': '"1.1"'})
+
+    assert response.status_code == 304
+    assert response.body == b''
+    assert response.headers['etag'] == '"1.1"'
@@ -9,18 +9,23 @@ from fastapi import HTTPException
 from mysql.connector import OperationalError, IntegrityError
 
 from app.config import config
-from app.database import DB
+from app.database import DB, on_commit
+from app.statements import PreparedCursor
 from tests.mock import Mock
 
 
 @patch('mysql.connector.connect')
 def test_connect_after_init_class(mock_connect):
     """
-    Проверяем, что при инициализации класса, подключаемся к DataBase
-    и записываем ссылку на подключение в переменную 'db'
+    Проверяем, что при инициализации класса к DataBase не подключаемся,
+    а пул с соединением создается при первом обращении
     """
     # Arrange
     mock = Mock(mock_connect)
+    mock.mock_connect.assert_not_called()
+
+    # Action
+    stats = mock.db_class.pool.stats()
 
     # Assert
     mock.mock_connect.assert_called_once_with(
@@ -28,8 +33,9 @@ def test_connect_after_init_class(mock_connect):
         user=config.db.user_name,
         password=config.db.password,
         database=config.db.db_name,
+        autocommit=True,
     )
-    assert mock.db_class.db == mock.mock_db
+    assert stats.idle == config.db.pool_min_size
 
 
 @patch('mysql.connector.connect')
@@ -40,10 +46,112 @@ def test_connect_exception(mock_connect):
 
     # Arrange
     mock_connect.side_effect = Exception("Connection error")
+    db = DB()
+    DB.initialized = False
 
     # Action & Assert
     with pytest.raises(HTTPException):
-        DB()
+        db.acquire()
+
+
+@patch('mysql.connector.connect')
+def test_new_pool_after_fork(mock_connect, monkeypatch):
+    """
+    Проверяем, что процесс, созданный через fork, не использует и не закрывает
+    соединения родительского процесса
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+    parent_pool = mock.db_class.pool
+    parent_conn = parent_pool.acquire()
+    parent_pool.release(parent_conn)
+
+    # Action
+    # Имитируем дочерний процесс: другой pid
+    monkeypatch.setattr('os.getpid', lambda: -1)
+    child_pool = mock.db_class.pool
+
+    # Assert
+    assert child_pool is not parent_pool
+    assert mock_connect.call_count == 2
+    parent_conn.close.assert_not_called()
+
+
+@patch('mysql.connector.connect')
+def test_pool_size_per_worker(mock_connect, monkeypatch):
+    """
+    Проверяем деление общего лимита соединений между рабочими процессами
+    """
+    # Arrange
+    monkeypatch.setattr(config.db, 'pool_max_size', 10)
+    monkeypatch.setattr(config.db, 'pool_min_size', 2)
+    monkeypatch.setattr(config.server, 'workers', 8)
+
+    # Action & Assert
+    monkeypatch.setattr(config.db, 'max_connections', 0)
+    assert DB.pool_size() == (2, 10)
+
+    monkeypatch.setattr(config.db, 'max_connections', 40)
+    assert DB.pool_size() == (2, 5)
+
+    monkeypatch.setattr(config.db, 'max_connections', 8)
+    assert DB.pool_size() == (1, 1)
+
+
+@pytest.mark.asyncio
+@patch('app.database.asyncio.sleep')
+@patch('mysql.connector.connect')
+async def test_start_retries_with_backoff(mock_connect, mock_sleep, monkeypatch):
+    """
+    Проверяем повторные попытки подключения при запуске и прогрев пула
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+    mock_connect.side_effect = [Exception("Connection error"), Exception("Connection error"),
+                                mock.mock_db, mock.mock_db]
+    monkeypatch.setattr(config.db, 'pool_min_size', 1)
+    monkeypatch.setattr(config.db, 'warmup_connections', 2)
+    monkeypatch.setattr(config.db, 'startup_attempts', 5)
+    monkeypatch.setattr(config.db, 'startup_backoff', 1.0)
+    monkeypatch.setattr(config.db, 'startup_backoff_max', 1.5)
+    db = mock.db_class
+    assert not db.ready
+
+    # Action
+    ready = await db.start()
+
+    # Assert
+    assert ready and db.ready
+    assert db.startup_error is None
+    assert db.stats().idle == 2
+    # asyncio.sleep(0) вызывает и run_in_threadpool, учитываем только задержки
+    delays = [call.args[0] for call in mock_sleep.call_args_list if call.args[0]]
+    assert len(delays) == 2
+    assert 0.5 <= delays[0] <= 1.0
+    assert 0.75 <= delays[1] <= 1.5
+
+
+@pytest.mark.asyncio
+@patch('app.database.asyncio.sleep')
+@patch('mysql.connector.connect')
+async def test_start_attempts_exhausted(mock_connect, mock_sleep, monkeypatch):
+    """
+    Проверяем, что после исчерпания попыток процесс остается неготовым
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+    mock_connect.side_effect = Exception("Connection error")
+    monkeypatch.setattr(config.db, 'startup_attempts', 3)
+    db = mock.db_class
+
+    # Action
+    ready = await db.start()
+
+    # Assert
+    assert not ready and not db.ready
+    assert db.startup_error
+    assert mock_connect.call_count == 3
+    assert len([call for call in mock_sleep.call_args_list if call.args[0]]) == 2
 
 
 @patch('mysql.connector.connect')
@@ -57,22 +165,222 @@ def test_get_cursor_ok(mock_connect):
     # Action
     gen = mock.db_class.get_cursor()
     cursor = next(gen)
+    cursor.execute('SELECT 1')
+
+    # Assert
+    assert isinstance(cursor, PreparedCursor)
+    mock.mock_db.cursor.assert_called_once_with(prepared=True)
+    mock.mock_cursor.execute.assert_called_once_with('SELECT 1', ())
+
+
+@patch('mysql.connector.connect')
+def test_get_cursor_without_prepared_statements(mock_connect, monkeypatch):
+    """
+    Проверяем получение обычного курсора, если подготовленные выражения выключены
+    """
+    # Arrange
+    monkeypatch.setattr(config.db, 'prepared_statements', False)
+    mock = Mock(mock_connect)
+
+    # Action
+    cursor = next(mock.db_class.get_cursor())
 
     # Assert
     assert cursor == mock.mock_cursor
 
+
+@patch('mysql.connector.connect')
+def test_get_cursor_reuses_prepared_statements(mock_connect):
+    """
+    Проверяем, что подготовленный курсор кэшируется для соединения между запросами
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+
+    # Action
+    for _ in range(3):
+        gen = mock.db_class.get_cursor()
+        next(gen).execute('SELECT 1 WHERE 1 = %s', (1,))
+        with pytest.raises(StopIteration):
+            next(gen)
+
+    # Assert
+    mock.mock_db.cursor.assert_called_once_with(prepared=True)
+    stats = mock.db_class.statement_stats()
+    assert (stats.hits, stats.misses) == (2, 1)
+
+
 @patch('mysql.connector.connect')
 def test_get_cursor_operational_error(mock_connect):
     """
-    Проверяем получение курсора в штатном режиме
+    Проверяем обработку потери соединения во время запроса
     """
     # Arrange
     mock = Mock(mock_connect)
-    mock.mock_db.cursor.side_effect = OperationalError("error")
+    gen = mock.db_class.get_cursor()
+    next(gen)
 
     with pytest.raises(HTTPException) as e:
-        gen = mock.db_class.get_cursor()
-        cursor = next(gen)
+        gen.throw(OperationalError("error"))
+    assert e.value.status_code == 500
+
+    # Неисправное соединение не возвращается в пул
+    mock.mock_db.close.assert_called_once()
+    assert mock.db_class.stats().size == 0
+
+
+@patch('mysql.connector.connect')
+def test_get_cursor_returns_connection_to_pool(mock_connect):
+    """
+    Проверяем, что после завершения запроса изменения сохраняются,
+    а соединение возвращается в пул
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+
+    # Action
+    gen = mock.db_class.get_cursor()
+    next(gen)
+    assert mock.db_class.stats().in_use == 1
+    with pytest.raises(StopIteration):
+        next(gen)
+
+    # Assert
+    mock.mock_db.commit.assert_called_once()
+    assert mock.db_class.stats().in_use == 0
+    assert mock.db_class.stats().idle == 1
+
+
+@patch('mysql.connector.connect')
+def test_on_commit_callbacks(mock_connect):
+    """
+    Проверяем, что функции, зарегистрированные через on_commit,
+    вызываются только после фиксации транзакции
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+    calls = []
+    mock.mock_db.commit.side_effect = lambda: calls.append('commit')
+
+    # Action
+    gen = mock.db_class.get_cursor()
+    cursor = next(gen)
+    on_commit(cursor, lambda: calls.append('callback'))
+    assert calls == []
+    with pytest.raises(StopIteration):
+        next(gen)
+
+    # Assert
+    assert calls == ['commit', 'callback']
+
+    # Курсор не из get_cursor - функция вызывается сразу
+    on_commit(object(), lambda: calls.append('now'))
+    assert calls[-1] == 'now'
+
+
+@patch('mysql.connector.connect')
+def test_get_cursor_pool_timeout(mock_connect):
+    """
+    Проверяем, что при исчерпании пула возвращается ошибка 503
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+    mock.db_class.pool.max_size = 1
+    mock.db_class.pool.timeout = 0.01
+    busy = mock.db_class.get_cursor()
+    next(busy)
+
+    # Action & Assert
+    with pytest.raises(HTTPException) as e:
+        next(mock.db_class.get_cursor())
+    assert e.value.status_code == 503
+
+@patch('mysql.connector.connect')
+def test_connection_rollback_open_transaction(mock_connect):
+    """
+    Проверяем, что соединение выдается на время блока 'with',
+    незафиксированная транзакция откатывается, соединение возвращается в пул
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+
+    # Action
+    with mock.db_class.connection() as conn:
+        assert conn == mock.mock_db
+        assert mock.db_class.stats().in_use == 1
+        mock.mock_db.in_transaction = True
+
+    # Assert
+    mock.mock_db.commit.assert_not_called()
+    mock.mock_db.rollback.assert_called_once()
+    assert mock.db_class.stats().idle == 1
+
+
+@patch('mysql.connector.connect')
+def test_connection_discard_unread_result(mock_connect):
+    """
+    Если выгрузка прервана и остались непрочитанные строки,
+    соединение закрывается и в пул не возвращается
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+
+    # Action
+    with pytest.raises(GeneratorExit):
+        with mock.db_class.connection():
+            mock.mock_db.unread_result = True
+            raise GeneratorExit
+
+    # Assert
+    mock.mock_db.close.assert_called_once()
+    assert mock.db_class.stats().size == 0
+
+
+@patch('mysql.connector.connect')
+def test_read_cursor_no_commit(mock_connect):
+    """
+    Проверяем, что запрос на чтение не открывает и не фиксирует транзакцию
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+
+    # Action
+    gen = mock.db_class.read_cursor()
+    next(gen)
+    with pytest.raises(StopIteration):
+        next(gen)
+
+    # Assert
+    mock.mock_db.start_transaction.assert_not_called()
+    mock.mock_db.commit.assert_not_called()
+    assert mock.db_class.stats().idle == 1
+
+
+@patch('mysql.connector.connect')
+def test_write_cursor_rollback_on_http_exception(mock_connect):
+    """
+    Проверяем, что при ошибке в обработчике (например, 409) транзакция откатывается,
+    а функции on_commit не вызываются
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+    calls = []
+
+    # Action
+    gen = mock.db_class.write_cursor()
+    cursor = next(gen)
+    mock.mock_db.in_transaction = True
+    on_commit(cursor, lambda: calls.append('callback'))
+    with pytest.raises(HTTPException):
+        gen.throw(HTTPException(409))
+
+    # Assert
+    mock.mock_db.start_transaction.assert_called_once()
+    mock.mock_db.commit.assert_not_called()
+    mock.mock_db.rollback.assert_called_once()
+    assert calls == []
+    assert mock.db_class.stats().idle == 1
+
 
 @patch('mysql.connector.connect')
 def test_is_connected(mock_connect):
@@ -86,7 +394,7 @@ def test_is_connected(mock_connect):
     mock.mock_db.is_connected.return_value = True
 
     # Action
-    result = mock.db_class.is_connected()
+    result = mock.db_class.is_connected(mock.mock_db)
 
     # Assert
     mock.mock_db.is_connected.assert_called_once()
@@ -103,7 +411,7 @@ def test_reconnect(mock_connect):
     mock = Mock(mock_connect)
 
     # Action
-    mock.db_class.reconnect_(5)
+    mock.db_class.reconnect_(mock.mock_db, 5)
 
     # Assert
     mock.mock_db.reconnect.assert_called_once()
@@ -112,7 +420,8 @@ def test_reconnect(mock_connect):
 @patch('mysql.connector.connect')
 def test_get_cursor_when_connected(mock_connect):
     """
-    Проверяем, что при получении курсора, проверяется статус подключения и выдается курсор
+    Проверяем, что при получении курсора соединение не проверяется запросом (ping):
+    свободные соединения проверяются в фоне
     """
 
     # Arrange
@@ -124,40 +433,105 @@ def test_get_cursor_when_connected(mock_connect):
     cursor = next(gen)
 
     # Assert
-    # Проверяем, что соединение проверилось
-    mock.mock_db.is_connected.assert_called()
+    # Проверяем, что соединение не проверялось
+    mock.mock_db.is_connected.assert_not_called()
 
     # Проверяем, что ре-коннект не запускался
-    mock.mock_db._reconnect.assert_not_called()
-
-    # Проверяем, что вызвался объект cursor
-    mock.mock_db.cursor.assert_called_once_with()
+    mock.mock_db.reconnect.assert_not_called()
 
     # Проверяем получение курсора
-    assert cursor == mock.mock_cursor
+    assert isinstance(cursor, PreparedCursor)
+    assert cursor.statements.conn == mock.mock_db
 
 
 @patch('mysql.connector.connect')
-def test_get_cursor_when_disconnected(mock_connect):
+def test_get_cursor_when_disconnected(mock_connect, monkeypatch):
     """
-    Соединение с базой данных потеряно.
-    При попытке получения курсора, должно провериться соединение, попытка подключиться заново
-    и исключение, если не получилось.
+    Соединение с базой данных потеряно, включена проверка при выдаче из пула.
+    При получении курсора должно провериться соединение и выполниться попытка переподключения,
+    если не получилось - соединение заменяется новым.
     """
 
     # Arrange
+    monkeypatch.setattr(config.db, 'pool_health_check', True)
     mock = Mock(mock_connect)
     # Имитируем отсутствие соединения
     mock.mock_db.is_connected.return_value = False
 
+    # Action
+    gen = mock.db_class.get_cursor()
+    cursor = next(gen)
+
+    # Assert
+    # Проверяем, что соединение проверилось, прежде чем выдавать курсор
+    mock.mock_db.is_connected.assert_called()
+    # Проверяем, что запускался ре-коннект
+    mock.mock_db.reconnect.assert_called_once_with(attempts=3)
+    # Неисправное соединение закрыто и заменено новым
+    mock.mock_db.close.assert_called_once()
+    assert mock_connect.call_count == 2
+    assert isinstance(cursor, PreparedCursor)
+
+
+@patch('mysql.connector.connect')
+def test_background_check_replaces_broken(mock_connect, monkeypatch):
+    """
+    Фоновая проверка закрывает неисправное свободное соединение, открывает новое
+    и отмечает базу данных доступной
+    """
+    # Arrange
+    monkeypatch.setattr(config.db, 'pool_min_size', 1)
+    monkeypatch.setattr(config.db, 'warmup_connections', 1)
+    mock = Mock(mock_connect)
+    db = mock.db_class
+    db.warm_up()
+    mock.mock_db.is_connected.return_value = False
+
+    # Action
+    reachable = db.check()
+
+    # Assert
+    assert reachable and db.reachable and db.ready
+    mock.mock_db.reconnect.assert_called_once_with(attempts=3)
+    mock.mock_db.close.assert_called_once()
+    assert mock_connect.call_count == 2
+    assert db.stats().idle == 1
+    assert db.checked_at is not None
+
+
+@patch('mysql.connector.connect')
+def test_background_check_unreachable(mock_connect):
+    """
+    Если соединение не открывается, база данных отмечается недоступной, ошибка учитывается
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+    mock_connect.side_effect = Exception("Connection error")
+    db = mock.db_class
+
     # Action & Assert
-    with pytest.raises(Exception):
-        try:
-            # Пытаемся получить объект cursor
-            gen = mock.db_class.get_cursor()
-            next(gen)
-        finally:
-            # Проверяем, что соединение проверилось, прежде чем выдавать курсор
-            mock.mock_db.is_connected.assert_called()
-            # Проверяем, что запускался ре-коннект
-            mock.mock_db._reconnect.assert_called_once()
+    assert db.check() is False
+    assert db.errors.stats().errors == 1
+
+
+@patch('mysql.connector.connect')
+def test_error_window_records_requests(mock_connect):
+    """
+    Успешные обращения и потерянные соединения учитываются в доле ошибок
+    """
+    # Arrange
+    mock = Mock(mock_connect)
+    db = mock.db_class
+
+    # Action
+    with db.connection():
+        pass
+    gen = db.read_cursor()
+    next(gen)
+    with pytest.raises(HTTPException):
+        gen.throw(OperationalError('Lost connection'))
+
+    # Assert
+    stats = db.errors.stats()
+    assert (stats.total, stats.errors) == (2, 1)
+    assert db.pool_stats().size == 0
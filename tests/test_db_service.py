@@ -1,26 +1,32 @@
-# pip install pytest-asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import call, patch
+
 import pytest
 from fastapi import HTTPException
 from mysql.connector import IntegrityError
 
+from app.schemes.task import TaskFilters, TaskValidation
+from app.services.cache import LRUCache
+from app.services.mysql import TaskService
+
+# Версия таблицы 'tasks' увеличивается один раз за транзакцию, последним запросом
+BUMP = call('UPDATE table_versions SET version = version + 1 WHERE name = %s', ('tasks',))
 
 
 class TestDelete:
-    @pytest.mark.asyncio
-    async def test_delete_ok(self, cursor, db_service):
+    def test_delete_ok(self, cursor, db_service):
         # Arrange
         task_id = 1
         cursor.configure_mock(rowcount=1)
-        query = f'DELETE FROM tasks WHERE id = {task_id}'
+        query = 'DELETE FROM tasks WHERE id = %s'
 
         # Action
-        await db_service.delete(cursor, task_id)
+        db_service.delete(cursor, task_id)
 
         # Assert
-        cursor.execute.assert_called_once_with(query)
+        assert cursor.execute.call_args_list == [call(query, (task_id,)), BUMP]
 
-    @pytest.mark.asyncio
-    async def test_delete_err404(self, cursor, db_service):
+    def test_delete_err404(self, cursor, db_service):
         # Arrange
         task_id = 1
         # Устанавливаем количество удаленных строк (значит запись с таким task_id не найдена
@@ -28,11 +34,10 @@ class TestDelete:
 
         # Action & Assert
         with pytest.raises(HTTPException) as e:
-            await db_service.delete(cursor, task_id)
+            db_service.delete(cursor, task_id)
         assert e.value.status_code == 404
 
-    @pytest.mark.asyncio
-    async def test_delete_err500(self, cursor, db_service):
+    def test_delete_err500(self, cursor, db_service):
         # Arrange
         task_id = 1
         # Устанавливаем количество удаленных строк - 2, значит удалилось две строки. такого быть не должно
@@ -40,51 +45,162 @@ class TestDelete:
 
         # Action & Assert
         with pytest.raises(HTTPException) as e:
-            await db_service.delete(cursor, task_id)
+            db_service.delete(cursor, task_id)
         assert e.value.status_code == 500
 
 
 class TestCreate:
-    @pytest.mark.asyncio
-    async def test_create_ok(self, cursor, db_service, data):
+    def test_create_ok(self, cursor, db_service, data):
         # Arrange
         cursor.configure_mock(rowcount=1)
-        query = 'INSERT INTO tasks (taskname, description, category) ' \
-                f"VALUES ('{data.taskname}', '{data.description}', '{data.category}')"
+        query = 'INSERT INTO tasks (taskname, description, category) VALUES (%s, %s, %s)'
 
         # Action
-        await db_service.create(cursor, data)
+        db_service.create(cursor, data)
 
         # Assert
-        cursor.execute.assert_called_once_with(query)
+        assert cursor.execute.call_args_list == [
+            call(query, (data.taskname, data.description, data.category)), BUMP]
 
-    @pytest.mark.asyncio
-    async def test_create_err409_duplicate(self, cursor, db_service, data):
+    def test_create_err409_duplicate(self, cursor, db_service, data):
         # Arrange
         cursor.configure_mock(rowcount=1)
         cursor.execute.side_effect = IntegrityError('Duplicate error')
 
         # Action & Assert
         with pytest.raises(HTTPException) as e:
-            await db_service.create(cursor, data)
+            db_service.create(cursor, data)
         assert e.value.status_code == 409
         assert e.value.detail == 'Task с таким названием уже существует'
 
-    @pytest.mark.asyncio
-    async def test_create_err500(self, cursor, db_service, data):
+    def test_create_err500(self, cursor, db_service, data):
         # Arrange
         # Устанавливаем количество удаленных строк - 0, ни одной строки не создалось. такого быть не должно
         cursor.configure_mock(rowcount=0)
 
         # Action & Assert
         with pytest.raises(HTTPException) as e:
-            await db_service.create(cursor, data)
+            db_service.create(cursor, data)
         assert e.value.status_code == 500
 
 
+class TestCreateBulk:
+    @staticmethod
+    def tasks(*names):
+        return [TaskValidation(taskname=name) for name in names]
+
+    def test_chunks(self, connection, cursor, db_service):
+        # Arrange
+        cursor.fetchall.return_value = []
+        items = self.tasks('Task 1', 'Task 2', 'Task 3')
+
+        # Action
+        results = db_service.create_bulk(connection, items, chunk_size=2)
+
+        # Assert
+        assert [result['status'] for result in results] == [201, 201, 201]
+        # Пачка 1: SELECT + INSERT из двух строк, пачка 2: SELECT + INSERT из одной
+        inserts = [call.args for call in cursor.execute.call_args_list
+                   if call.args[0].startswith('INSERT')]
+        assert inserts == [
+            ('INSERT INTO tasks (taskname, description, category) '
+             'VALUES (%s, %s, %s), (%s, %s, %s)',
+             ['Task 1', None, None, 'Task 2', None, None]),
+            ('INSERT INTO tasks (taskname, description, category) VALUES (%s, %s, %s)',
+             ['Task 3', None, None]),
+        ]
+        # Одна пачка - одна транзакция
+        assert connection.start_transaction.call_count == 2
+        assert connection.commit.call_count == 2
+        assert cursor.execute.call_args_list.count(BUMP) == 2
+        cursor.close.assert_called_once()
+
+    def test_duplicates(self, connection, cursor, db_service):
+        # Arrange
+        # 'Task 2' уже есть в базе, 'Task 1' повторяется в запросе
+        cursor.fetchall.return_value = [('Task 2',)]
+        items = self.tasks('Task 1', 'Task 2', 'Task 1')
+
+        # Action
+        results = db_service.create_bulk(connection, items, chunk_size=10)
+
+        # Assert
+        assert [result['status'] for result in results] == [201, 409, 409]
+        assert [result['index'] for result in results] == [0, 1, 2]
+        assert cursor.execute.call_args_list[-2:] == [
+            call('INSERT INTO tasks (taskname, description, category) VALUES (%s, %s, %s)',
+                 ['Task 1', None, None]),
+            BUMP]
+
+    def test_concurrent_duplicate_falls_back_to_rows(self, connection, cursor, db_service):
+        # Arrange
+        # Пачка конфликтует с параллельной вставкой 'Task 2'
+        cursor.fetchall.return_value = []
+        duplicate = IntegrityError('Duplicate entry')
+        cursor.execute.side_effect = [None, duplicate, None, duplicate, None]
+        items = self.tasks('Task 1', 'Task 2')
+
+        # Action
+        results = db_service.create_bulk(connection, items, chunk_size=10)
+
+        # Assert
+        assert [result['status'] for result in results] == [201, 409]
+        connection.rollback.assert_called_once()
+        # Построчная вставка идет в новой транзакции
+        assert connection.start_transaction.call_count == 2
+        connection.commit.assert_called_once()
+
+
+class TestChangeBulk:
+    def test_delete_ids(self, connection, cursor, db_service):
+        # Arrange
+        # Из id 1, 2, 3 в базе нашлись только 1 и 3
+        cursor.fetchall.return_value = [(3,), (1,)]
+
+        # Action
+        result = db_service.delete_bulk(connection, [3, 1, 2, 1], None, chunk_size=10)
+
+        # Assert
+        assert result == {'affected': 2, 'missing_ids': [2]}
+        cursor.execute.assert_any_call(
+            'SELECT id FROM tasks WHERE id IN (%s, %s, %s) FOR UPDATE', [1, 2, 3])
+        assert cursor.execute.call_args_list[-2:] == [
+            call('DELETE FROM tasks WHERE id IN (%s, %s)', [1, 3]), BUMP]
+        connection.commit.assert_called_once()
+
+    def test_update_category_chunks(self, connection, cursor, db_service):
+        # Arrange
+        cursor.fetchall.side_effect = [[(1,), (2,)], [(5,)]]
+
+        # Action
+        result = db_service.update_bulk(connection, {'category': 'New'}, None, 'Old',
+                                              chunk_size=2)
+
+        # Assert
+        assert result == {'affected': 3, 'missing_ids': []}
+        cursor.execute.assert_any_call(
+            'SELECT id FROM tasks WHERE category = %s AND id > %s ORDER BY id LIMIT %s FOR UPDATE',
+            ('Old', 2, 2))
+        # Все пачки в одной транзакции, версия таблицы увеличивается один раз
+        assert cursor.execute.call_args_list[-2:] == [
+            call('UPDATE tasks SET category = %s WHERE id IN (%s)', ['New', 5]), BUMP]
+        connection.start_transaction.assert_called_once()
+        connection.commit.assert_called_once()
+
+    def test_rollback_on_error(self, connection, cursor, db_service):
+        # Arrange
+        cursor.fetchall.return_value = [(1,)]
+        cursor.execute.side_effect = [None, Exception('error')]
+
+        # Action & Assert
+        with pytest.raises(Exception):
+            db_service.delete_bulk(connection, [1], None, chunk_size=10)
+        connection.rollback.assert_called_once()
+        connection.commit.assert_not_called()
+
+
 class TestGetAll():
-    @pytest.mark.asyncio
-    async def test_ok(self, cursor, db_service):
+    def test_ok(self, cursor, db_service):
         # Arrange
         cursor_description = [
             ('id', 'description'),
@@ -105,24 +221,87 @@ class TestGetAll():
         ]
         cursor.configure_mock(description=cursor_description)
         cursor.fetchall.return_value = rows
-        query = 'SELECT id, taskname, description, category, creation_date FROM tasks'
+        query = 'SELECT id, taskname, description, category, creation_date, version, ' \
+                'updated_at FROM tasks WHERE id > %s ORDER BY id LIMIT %s'
 
         # Action
-        response_data = await db_service.get_all(cursor)
+        response_data, next_key = db_service.get_all(cursor, 10)
 
         # Assert
-        cursor.execute.assert_called_once_with(query)
+        cursor.execute.assert_called_once_with(query, (0, 11))
         assert response_data == needed_data
+        assert next_key is None
+
+    def test_next_page(self, cursor, db_service):
+        # Arrange
+        # Запрошено 2 записи, получено 3 - значит есть следующая страница
+        cursor.configure_mock(description=[('id', 'description')])
+        cursor.fetchall.return_value = [(6,), (7,), (8,)]
+        query = 'SELECT id, taskname, description, category, creation_date, version, ' \
+                'updated_at FROM tasks WHERE id > %s ORDER BY id LIMIT %s'
+
+        # Action
+        response_data, next_key = db_service.get_all(cursor, 2, after={'id': 5})
+
+        # Assert
+        cursor.execute.assert_called_once_with(query, (5, 3))
+        assert response_data == [{'id': 6}, {'id': 7}]
+        assert next_key == {'id': 7}
+
+    def test_page_after_last(self, cursor, db_service):
+        # Arrange
+        cursor.configure_mock(description=None)
+        cursor.fetchall.return_value = []
+
+        # Action
+        response_data, next_key = db_service.get_all(cursor, 2, after={'id': 100})
+
+        # Assert
+        assert response_data == []
+        assert next_key is None
+
+    def test_filters_and_date_key(self, cursor, db_service):
+        # Arrange
+        created = datetime(2024, 1, 2)
+        cursor.configure_mock(description=[('id',), ('creation_date',)])
+        cursor.fetchall.return_value = [(9, created), (8, created)]
+        filters = TaskFilters(category='Hobby', sort='-creation_date')
+        query = 'SELECT id, taskname, description, category, creation_date, version, ' \
+                'updated_at FROM tasks WHERE category = %s ' \
+                'AND (creation_date < %s OR (creation_date = %s AND id < %s)) ' \
+                'ORDER BY creation_date DESC, id DESC LIMIT %s'
+
+        # Action
+        response_data, next_key = db_service.get_all(
+            cursor, 1, after={'creation_date': created, 'id': 10}, filters=filters)
+
+        # Assert
+        cursor.execute.assert_called_once_with(query, ('Hobby', created, created, 10, 2))
+        assert response_data == [{'id': 9, 'creation_date': created}]
+        assert next_key == {'creation_date': created, 'id': 9}
+
+    def test_filters_no_match(self, cursor, db_service):
+        # Arrange
+        # Под фильтры ничего не подошло - пустая страница, а не 404
+        cursor.configure_mock(description=None)
+        cursor.fetchall.return_value = []
 
-    @pytest.mark.asyncio
-    async def test_err500(self, cursor, db_service):
+        # Action
+        response_data, next_key = db_service.get_all(
+            cursor, 10, filters=TaskFilters(category='Nothing'))
+
+        # Assert
+        assert response_data == []
+        assert next_key is None
+
+    def test_err500(self, cursor, db_service):
         # Arrange
         # Если cursor.description = None, должно быть вызвано исключение
         cursor.configure_mock(description=None)
 
         # Action & Assert
         with pytest.raises(HTTPException) as e:
-            await db_service.get_all(cursor)
+            db_service.get_all(cursor, 10)
         assert e.value.status_code == 404
         assert e.value.detail == 'No tasks yet'
 
@@ -135,14 +314,79 @@ class TestGetAll():
 
         # Action & Assert
         with pytest.raises(HTTPException):
-            await db_service.get_all(cursor)
+            db_service.get_all(cursor, 10)
         assert e.value.status_code == 404
         assert e.value.detail == 'No tasks yet'
 
 
+class TestListQuery():
+    COLUMNS = 'id, taskname, description, category, creation_date, version, updated_at'
+
+    def test_first_page_desc(self, db_service):
+        # Action
+        query, params = db_service.list_query(TaskFilters(sort='-id'), None, 11)
+
+        # Assert
+        assert query == f'SELECT {self.COLUMNS} FROM tasks ORDER BY id DESC LIMIT %s'
+        assert params == [11]
+
+    def test_date_range(self, db_service):
+        # Arrange
+        after = datetime(2024, 1, 1, 3, 0, tzinfo=timezone(timedelta(hours=3)))
+        filters = TaskFilters(created_after=after, created_before=datetime(2024, 2, 1),
+                              sort='creation_date')
+
+        # Action
+        query, params = db_service.list_query(filters, None, 11)
+
+        # Assert
+        assert query == f'SELECT {self.COLUMNS} FROM tasks ' \
+                        'WHERE creation_date >= %s AND creation_date < %s ' \
+                        'ORDER BY creation_date, id LIMIT %s'
+        # Дата с часовым поясом переводится в UTC
+        assert params == [datetime(2024, 1, 1), datetime(2024, 2, 1), 11]
+
+
+class TestTableVersion():
+    def test_ok(self, cursor, db_service):
+        # Arrange
+        updated_at = datetime(2024, 1, 1, 12, 0, 0)
+        cursor.fetchall.return_value = [(42, updated_at)]
+
+        # Action
+        result = db_service.table_version(cursor)
+
+        # Assert
+        cursor.execute.assert_called_once_with(
+            'SELECT version, updated_at FROM table_versions WHERE name = %s', ('tasks',))
+        assert result == (42, updated_at)
+
+    def test_not_tracked(self, cursor, db_service):
+        # Arrange
+        cursor.fetchall.return_value = []
+
+        # Action & Assert
+        assert db_service.table_version(cursor) is None
+
+
+class TestIterAll():
+    def test_batches(self, cursor, db_service):
+        # Arrange
+        cursor.configure_mock(description=[('id', 'description')])
+        cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+
+        # Action
+        batches = list(db_service.iter_all(cursor, 2))
+
+        # Assert
+        cursor.execute.assert_called_once_with(
+            'SELECT id, taskname, description, category, creation_date FROM tasks ORDER BY id')
+        cursor.fetchmany.assert_called_with(2)
+        assert batches == [[{'id': 1}, {'id': 2}], [{'id': 3}]]
+
+
 class TestGetOne():
-    @pytest.mark.asyncio
-    async def test_ok(self, cursor, db_service):
+    def test_ok(self, cursor, db_service):
         # Arrange
         task_id = 1
         task_name = 'MyName'
@@ -159,18 +403,17 @@ class TestGetOne():
         ]
         cursor.configure_mock(description=cursor_description)
         cursor.fetchall.return_value = rows
-        query = 'SELECT id, taskname, description, category, creation_date FROM tasks ' \
-                f'WHERE id = {task_id}'
+        query = 'SELECT id, taskname, description, category, creation_date, version, ' \
+                'updated_at FROM tasks WHERE id = %s'
 
         # Action
-        response_data = await db_service.get_one(cursor, task_id)
+        response_data = db_service.get_one(cursor, task_id)
 
         # Assert
         assert response_data == needed_data
-        cursor.execute.assert_called_once_with(query)
+        cursor.execute.assert_called_once_with(query, (task_id,))
 
-    @pytest.mark.asyncio
-    async def test_err404(self, cursor, db_service):
+    def test_err404(self, cursor, db_service):
         # Arrange
         task_id = 1
         # Если cursor.description = None, должно быть вызвано исключение
@@ -178,7 +421,7 @@ class TestGetOne():
 
         # Action & Assert
         with pytest.raises(HTTPException) as e:
-            await db_service.get_one(cursor, task_id)
+            db_service.get_one(cursor, task_id)
         assert e.value.status_code == 404
         assert e.value.detail == 'Task not found'
 
@@ -191,31 +434,27 @@ class TestGetOne():
 
         # Action & Assert
         with pytest.raises(HTTPException):
-            await db_service.get_one(cursor, task_id)
+            db_service.get_one(cursor, task_id)
         assert e.value.status_code == 404
         assert e.value.detail == 'Task not found'
 
 
 class TestUpdate:
-    @pytest.mark.asyncio
-    async def test_update_ok(self, cursor, db_service, data):
+    def test_update_ok(self, cursor, db_service, data):
         # Arrange
         task_id = 1
         cursor.configure_mock(rowcount=1)
-        query = 'UPDATE tasks ' \
-                f"SET taskname='{data.taskname}', " \
-                f"description='{data.description}', " \
-                f"category='{data.category}' " \
-                f"WHERE id = {task_id}"
+        query = 'UPDATE tasks SET taskname = %s, description = %s, category = %s ' \
+                'WHERE id = %s'
 
         # Action
-        await db_service.update(cursor, data, task_id)
+        db_service.update(cursor, data, task_id)
 
         # Assert
-        cursor.execute.assert_called_once_with(query)
+        assert cursor.execute.call_args_list == [
+            call(query, (data.taskname, data.description, data.category, task_id)), BUMP]
 
-    @pytest.mark.asyncio
-    async def test_update_err409_duplicate(self, cursor, db_service, data):
+    def test_update_err409_duplicate(self, cursor, db_service, data):
         # Arrange
         task_id = 1
         cursor.configure_mock(rowcount=1)
@@ -223,12 +462,11 @@ class TestUpdate:
 
         # Action & Assert
         with pytest.raises(HTTPException) as e:
-            await db_service.update(cursor, data, task_id)
+            db_service.update(cursor, data, task_id)
         assert e.value.status_code == 409
         assert e.value.detail == 'Task already exist'
 
-    @pytest.mark.asyncio
-    async def test_update_err500(self, cursor, db_service, data):
+    def test_update_err500(self, cursor, db_service, data):
         # Arrange
         task_id = 1
         # Устанавливаем количество удаленных строк - 0, ни одной строки не создалось. такого быть не должно
@@ -236,5 +474,74 @@ class TestUpdate:
 
         # Action & Assert
         with pytest.raises(HTTPException) as e:
-            await db_service.update(cursor, data, task_id)
-        assert e.value.status_code == 400
\ No newline at end of file
+            db_service.update(cursor, data, task_id)
+        assert e.value.status_code == 400
+
+class TestCache:
+    @pytest.fixture
+    def cached_service(self):
+        return TaskService(cache=LRUCache(max_size=10, ttl=60))
+
+    def test_get_one_cached(self, cursor, cached_service):
+        # Arrange
+        cursor.configure_mock(description=[('id', 'description')])
+        cursor.fetchall.return_value = [(1,)]
+
+        # Action
+        first = cached_service.get_one(cursor, 1)
+        second = cached_service.get_one(cursor, 1)
+
+        # Assert
+        assert first == second == [{'id': 1}]
+        cursor.execute.assert_called_once()
+        assert cached_service.cache.stats().hits == 1
+
+    @pytest.mark.parametrize('method', ['delete', 'update'])
+    def test_write_invalidates(self, cursor, cached_service, data, method):
+        # Arrange
+        cursor.configure_mock(description=[('id', 'description')], rowcount=1)
+        cursor.fetchall.return_value = [(1,)]
+        cached_service.get_one(cursor, 1)
+
+        # Action
+        if method == 'delete':
+            cached_service.delete(cursor, 1)
+        else:
+            cached_service.update(cursor, data, 1)
+
+        # Assert
+        assert cached_service.cache.get(TaskService.cache_key(1)) is None
+
+    def test_invalidate_after_commit(self, cursor, cached_service):
+        """
+        Запись, прочитанная до фиксации удаления, сбрасывается после фиксации
+        """
+        # Arrange
+        cursor.configure_mock(description=[('id', 'description')], rowcount=1)
+        cursor.fetchall.return_value = [(1,)]
+        callbacks = {id(cursor): []}
+
+        # Action
+        with patch.dict('app.database._commit_callbacks', callbacks):
+            cached_service.delete(cursor, 1)
+            # Параллельный запрос еще видит строку (удаление не зафиксировано)
+            cached_service.get_one(cursor, 1)
+            assert cached_service.cache.get(TaskService.cache_key(1)) is not None
+            # Фиксация транзакции
+            for callback in callbacks[id(cursor)]:
+                callback()
+
+        # Assert
+        assert cached_service.cache.get(TaskService.cache_key(1)) is None
+
+    def test_bulk_delete_invalidates(self, connection, cursor, cached_service):
+        # Arrange
+        cursor.configure_mock(description=[('id', 'description')])
+        cursor.fetchall.return_value = [(1,)]
+        cached_service.get_one(cursor, 1)
+
+        # Action
+        cached_service.delete_bulk(connection, [1], None, chunk_size=10)
+
+        # Assert
+        assert cached_service.cache.get(TaskService.cache_key(1)) is None
@@ -0,0 +1,77 @@
+"""
+Тесты выполнения запросов вне цикла событий
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from app.services.executor import INLINE, THREADPOOL, QueryExecutor
+
+request_id: contextvars.ContextVar = contextvars.ContextVar('request_id', default=None)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        QueryExecutor(mode='unknown')
+
+
+@pytest.mark.asyncio
+async def test_inline_runs_in_event_loop_thread():
+    # Arrange
+    executor = QueryExecutor(mode=INLINE)
+
+    # Action
+    thread = await executor.run(threading.current_thread)
+
+    # Assert
+    assert thread is threading.current_thread()
+
+
+@pytest.mark.asyncio
+async def test_threadpool_runs_in_worker_thread():
+    # Arrange
+    executor = QueryExecutor(mode=THREADPOOL, max_workers=2)
+
+    # Action
+    thread = await executor.run(threading.current_thread)
+
+    # Assert
+    assert thread is not threading.current_thread()
+    assert thread.name.startswith('db-query')
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_threadpool_passes_context():
+    # Arrange
+    executor = QueryExecutor(mode=THREADPOOL, max_workers=1)
+    request_id.set('req-1')
+
+    # Action
+    value = await executor.run(request_id.get)
+
+    # Assert
+    assert value == 'req-1'
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_threadpool_does_not_block_event_loop():
+    """
+    Пока выполняется медленный запрос, цикл событий продолжает обслуживать другие задачи
+    """
+    # Arrange
+    executor = QueryExecutor(mode=THREADPOOL, max_workers=4)
+
+    # Action
+    started = time.perf_counter()
+    await asyncio.gather(*(executor.run(time.sleep, 0.1) for _ in range(4)))
+    elapsed = time.perf_counter() - started
+
+    # Assert
+    assert elapsed < 0.3
+    executor.shutdown()
@@ -0,0 +1,70 @@
+"""
+Проверка планов запросов списка задач на настоящем MySQL (индексы из init.sql).
+Без доступного сервера из 'config.db' тесты пропускаются.
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from app.config import config
+from app.schemes.task import TaskFilters
+from app.services.mysql import TaskService
+
+mysql_connector = pytest.importorskip('mysql.connector')
+
+START = datetime(2024, 1, 1)
+ROWS = 5000
+
+
+@pytest.fixture(scope='module')
+def mysql_cursor():
+    try:
+        conn = mysql_connector.connect(host=config.db.host, user=config.db.user_name,
+                                       password=config.db.password,
+                                       database=config.db.db_name, connection_timeout=2)
+    except mysql_connector.Error as e:
+        pytest.skip(f'MySQL недоступен: {e}')
+
+    cursor = conn.cursor(dictionary=True)
+    # Временная таблица с определением из init.sql закрывает собой 'tasks' в этой сессии
+    create = (Path(__file__).parent.parent / 'init.sql').read_text().split(';')[0]
+    cursor.execute(create.replace('CREATE TABLE IF NOT EXISTS', 'CREATE TEMPORARY TABLE'))
+    cursor.executemany(
+        'INSERT INTO tasks (taskname, category, creation_date) VALUES (%s, %s, %s)',
+        [(f'Task {i}', f'Category {i % 50}', START + timedelta(minutes=i)) for i in range(ROWS)])
+    cursor.execute('ANALYZE TABLE tasks')
+    cursor.fetchall()
+
+    yield cursor
+
+    cursor.execute('DROP TEMPORARY TABLE tasks')
+    cursor.close()
+    conn.close()
+
+
+RECENT = START + timedelta(minutes=ROWS - 50)
+
+
+@pytest.mark.parametrize('filters, after', [
+    (TaskFilters(), None),
+    (TaskFilters(sort='-id'), {'id': 100}),
+    (TaskFilters(category='Category 1'), None),
+    (TaskFilters(category='Category 1', sort='-id'), {'id': 100}),
+    (TaskFilters(sort='creation_date'), {'creation_date': RECENT, 'id': 10}),
+    (TaskFilters(sort='-creation_date'), None),
+    (TaskFilters(category='Category 1', sort='creation_date'), None),
+    (TaskFilters(category='Category 1', created_after=RECENT, sort='-creation_date'), None),
+    (TaskFilters(created_after=RECENT), None),
+    (TaskFilters(created_after=RECENT, created_before=RECENT + timedelta(minutes=10),
+                 sort='creation_date'), None),
+])
+def test_list_query_uses_index(mysql_cursor, filters, after):
+    query, params = TaskService.list_query(filters, after, 101)
+
+    mysql_cursor.execute('EXPLAIN ' + query, params)
+    plan = mysql_cursor.fetchall()
+
+    assert len(plan) == 1
+    assert plan[0]['type'] != 'ALL', plan
+    assert plan[0]['key'] is not None, plan
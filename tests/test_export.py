@@ -0,0 +1,35 @@
+import datetime
+import json
+
+from app.export import JSON, NDJSON, encode_batches
+
+BATCHES = [
+    [{'id': 1, 'taskname': 'Task 1', 'creation_date': datetime.datetime(2023, 12, 11, 19, 35, 46)}],
+    [{'id': 2, 'taskname': 'Задача 2', 'creation_date': None}],
+]
+
+
+def test_ndjson():
+    # Action
+    chunks = list(encode_batches(iter(BATCHES), NDJSON))
+
+    # Assert
+    # Одна пачка - одна часть ответа
+    assert len(chunks) == 2
+    lines = ''.join(chunks).splitlines()
+    assert json.loads(lines[0]) == {'id': 1, 'taskname': 'Task 1',
+                                    'creation_date': '2023-12-11T19:35:46'}
+    assert json.loads(lines[1])['taskname'] == 'Задача 2'
+
+
+def test_json():
+    # Action
+    body = ''.join(encode_batches(iter(BATCHES), JSON))
+
+    # Assert
+    data = json.loads(body)['data']
+    assert [row['id'] for row in data] == [1, 2]
+
+
+def test_json_empty():
+    assert json.loads(''.join(encode_batches(iter([]), JSON))) == {'data': []}
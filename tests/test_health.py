@@ -0,0 +1,78 @@
+"""
+Тесты состояния для проверок /health
+"""
+
+from app.config import HealthConfig
+from app.health import ErrorRate, ErrorWindow, readiness_problems
+from app.pool import PoolStats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_stats(**kwargs):
+    params = dict(size=10, in_use=0, idle=10, waiting=0, max_size=10, acquired=0,
+                  timeouts=0, wait_time_total=0.0, wait_time_max=0.0)
+    params.update(kwargs)
+    return PoolStats(**params)
+
+
+def test_error_window_expires_old_buckets():
+    # Arrange
+    clock = FakeClock()
+    window = ErrorWindow(window=60.0, clock=clock)
+
+    # Action
+    window.record(False)
+    clock.now += 30
+    window.record(True)
+    window.record(True)
+
+    # Assert
+    stats = window.stats()
+    assert (stats.total, stats.errors) == (3, 1)
+    assert round(stats.rate, 2) == 0.33
+
+    clock.now += 31
+    stats = window.stats()
+    assert (stats.total, stats.errors) == (2, 0)
+
+    clock.now += 60
+    assert window.stats().rate == 0.0
+
+
+def test_ready_without_problems():
+    problems = readiness_problems(True, True, 1.0, make_stats(), ErrorRate(60, 100, 1),
+                                  HealthConfig())
+    assert not problems
+
+
+def test_not_started():
+    problems = readiness_problems(False, None, None, None, ErrorRate(60, 0, 0), HealthConfig())
+    assert problems == ['Пул соединений с базой данных не прогрет']
+
+
+def test_stale_check():
+    health = HealthConfig(check_interval=10, stale_checks=3)
+    assert not readiness_problems(True, True, 25, make_stats(), ErrorRate(60, 0, 0), health)
+    assert readiness_problems(True, True, 31, make_stats(), ErrorRate(60, 0, 0), health)
+
+
+def test_saturated_pool():
+    stats = make_stats(in_use=10, idle=0, waiting=3)
+    problems = readiness_problems(True, True, 1.0, stats, ErrorRate(60, 0, 0), HealthConfig())
+    assert len(problems) == 1
+    # Все соединения заняты, но запросы не ждут - экземпляр готов
+    stats = make_stats(in_use=10, idle=0, waiting=0)
+    assert not readiness_problems(True, True, 1.0, stats, ErrorRate(60, 0, 0), HealthConfig())
+
+
+def test_error_rate_needs_min_samples():
+    health = HealthConfig(max_error_rate=0.5, min_samples=10)
+    assert not readiness_problems(True, True, 1.0, make_stats(), ErrorRate(60, 5, 5), health)
+    assert readiness_problems(True, True, 1.0, make_stats(), ErrorRate(60, 20, 11), health)
@@ -0,0 +1,125 @@
+"""
+Тесты настройки журнала: форматы записей, прореживание DEBUG и запись через очередь
+"""
+
+import json
+import logging
+import sys
+
+import pytest
+
+import app.logger
+from app.config import LoggerConfig, config
+from app.logger import (DeferredQueueHandler, JsonFormatter, SamplingFilter, TextFormatter,
+                        configure_logging, stop_logging)
+
+
+def make_record(level=logging.INFO, msg='message %s', args=('arg',), **extra):
+    record = logging.LogRecord('api', level, __file__, 10, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.fixture
+def restore_logging():
+    yield
+    configure_logging(config.log)
+
+
+def test_json_formatter_fields():
+    record = make_record(fields={'event': 'slow_query', 'duration_ms': 250.5}, request_id='abc')
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'api'
+    assert entry['message'] == 'message arg'
+    assert entry['event'] == 'slow_query'
+    assert entry['duration_ms'] == 250.5
+    assert entry['request_id'] == 'abc'
+    assert 'exc' not in entry
+
+
+def test_json_formatter_exception():
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record = make_record(level=logging.ERROR)
+        record.exc_info = sys.exc_info()
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert 'ValueError: boom' in entry['exc']
+
+
+def test_text_formatter_appends_fields():
+    formatter = TextFormatter('%(levelname)s - %(message)s')
+
+    assert formatter.format(make_record()) == 'INFO - message arg'
+    assert formatter.format(make_record(fields={'rows': 3})) == 'INFO - message arg {"rows": 3}'
+
+
+def test_sampling_filter_keeps_other_levels():
+    sampling = SamplingFilter(0.0)
+
+    assert not sampling.filter(make_record(level=logging.DEBUG))
+    assert sampling.filter(make_record(level=logging.INFO))
+    assert SamplingFilter(1.0).filter(make_record(level=logging.DEBUG))
+
+
+def test_deferred_handler_merges_message():
+    """Сообщение собирается в потоке вызова: аргументы могут измениться позже"""
+    data = ['before']
+    record = make_record(msg='data: %s', args=(data,))
+
+    prepared = DeferredQueueHandler(None).prepare(record)
+    data[0] = 'after'
+
+    assert prepared.msg == "data: ['before']"
+    assert prepared.args is None
+    assert prepared.getMessage() == "data: ['before']"
+
+
+def test_configure_logging_queue(capsys, restore_logging):
+    configure_logging(LoggerConfig(format='json', queue=True))
+    logging.getLogger('api').warning('created %s', 1, extra={'fields': {'task_id': 1}})
+    # Останавливаем поток записи: записи из очереди дописываются
+    stop_logging()
+
+    entry = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert entry['message'] == 'created 1'
+    assert entry['task_id'] == 1
+
+
+def test_after_fork_new_queue(capsys, restore_logging):
+    # Arrange
+    handler = configure_logging(LoggerConfig(format='json', queue=True))
+    inherited = (handler.queue, app.logger._listener)
+
+    # Action: поток записи родительского процесса в дочернем не работает
+    app.logger._after_fork_in_child()
+    inherited[1].stop()
+    logging.getLogger('api').warning('after fork')
+    stop_logging()
+
+    # Assert
+    assert handler.queue is not inherited[0]
+    assert json.loads(capsys.readouterr().err.strip().splitlines()[-1])['message'] == 'after fork'
+
+
+def test_configure_logging_replaces_handler(restore_logging):
+    handler = configure_logging(LoggerConfig(queue=False))
+    root = logging.getLogger()
+
+    assert handler in root.handlers
+    assert not isinstance(handler, DeferredQueueHandler)
+
+    handler_queue = configure_logging(LoggerConfig(queue=True))
+
+    assert handler not in root.handlers
+    assert isinstance(handler_queue, DeferredQueueHandler)
+
+
+def test_configure_logging_unknown_format(restore_logging):
+    with pytest.raises(ValueError):
+        configure_logging(LoggerConfig(format='xml'))
@@ -0,0 +1,241 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.schemes.task import TaskFilters, TaskValidation
+from app.services.memory import MemoryRepository
+
+
+def task(number, category='Category 1', description=None):
+    return TaskValidation(taskname=f'Task {number}',
+                          description=description or f'Description {number}',
+                          category=category)
+
+
+@pytest.fixture
+def clock():
+    # Первое значение берет конструктор: задача N создана в 12:00:N
+    now = [datetime(2024, 1, 1, 11, 59, 59)]
+
+    def tick():
+        now[0] += timedelta(seconds=1)
+        return now[0]
+    return tick
+
+
+@pytest.fixture
+def repository(clock):
+    return MemoryRepository(clock=clock)
+
+
+async def fill(repository, count, **kwargs):
+    for number in range(1, count + 1):
+        await repository.create(task(number, **kwargs))
+
+
+class TestCrud:
+    @pytest.mark.asyncio
+    async def test_create_and_get_one(self, repository, data):
+        # Action
+        await repository.create(data)
+        row = await repository.get_one(1)
+
+        # Assert
+        assert row['taskname'] == 'Task 1'
+        assert row['category'] == 'Category 1'
+        assert row['version'] == 1
+        assert row['creation_date'] == datetime(2024, 1, 1, 12, 0, 1)
+
+    @pytest.mark.asyncio
+    async def test_create_err409_duplicate(self, repository, data):
+        await repository.create(data)
+
+        with pytest.raises(HTTPException) as e:
+            await repository.create(data)
+        assert e.value.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_get_one_err404(self, repository):
+        with pytest.raises(HTTPException) as e:
+            await repository.get_one(1)
+        assert e.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_update_bumps_version(self, repository):
+        # Arrange
+        await fill(repository, 1)
+        version, _ = await repository.table_version()
+
+        # Action
+        await repository.update(task(1, category='Category 2'), 1)
+
+        # Assert
+        row = await repository.get_one(1)
+        assert row['category'] == 'Category 2'
+        assert row['version'] == 2
+        assert (await repository.table_version())[0] == version + 1
+        # Индекс категорий перестроен
+        page, _ = await repository.get_all(10, filters=TaskFilters(category='Category 2'))
+        assert [row['id'] for row in page] == [1]
+
+    @pytest.mark.asyncio
+    async def test_update_err409_duplicate(self, repository):
+        await fill(repository, 2)
+
+        with pytest.raises(HTTPException) as e:
+            await repository.update(task(2), 1)
+        assert e.value.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_update_missing_or_unchanged_err400(self, repository):
+        """Как в MySQL: задача не найдена или данные не изменились"""
+        await fill(repository, 1)
+
+        for data, task_id in ((task(5), 5), (task(1), 1)):
+            with pytest.raises(HTTPException) as e:
+                await repository.update(data, task_id)
+            assert e.value.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_delete(self, repository):
+        # Arrange
+        await fill(repository, 2)
+
+        # Action
+        await repository.delete(1)
+
+        # Assert
+        with pytest.raises(HTTPException) as e:
+            await repository.delete(1)
+        assert e.value.status_code == 404
+        # Название освободилось
+        await repository.create(task(1))
+
+
+class TestGetAll:
+    @pytest.mark.asyncio
+    async def test_empty_err404(self, repository):
+        with pytest.raises(HTTPException) as e:
+            await repository.get_all(10)
+        assert e.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_pages(self, repository):
+        # Arrange
+        await fill(repository, 5)
+        await repository.delete(3)
+
+        # Action
+        first, key = await repository.get_all(2)
+        second, next_key = await repository.get_all(2, key)
+        last, end = await repository.get_all(2, next_key)
+
+        # Assert
+        assert [row['id'] for row in first] == [1, 2]
+        assert key == {'id': 2}
+        assert [row['id'] for row in second] == [4, 5]
+        assert next_key is None or (last, end) == ([], None)
+
+    @pytest.mark.asyncio
+    async def test_descending_date_key(self, repository):
+        # Arrange
+        await fill(repository, 5)
+        filters = TaskFilters(sort='-creation_date')
+
+        # Action
+        first, key = await repository.get_all(2, filters=filters)
+        second, _ = await repository.get_all(2, key, filters)
+
+        # Assert
+        assert [row['id'] for row in first] == [5, 4]
+        assert key == {'creation_date': datetime(2024, 1, 1, 12, 0, 4), 'id': 4}
+        assert [row['id'] for row in second] == [3, 2]
+
+    @pytest.mark.asyncio
+    async def test_filters(self, repository):
+        # Arrange
+        for number in range(1, 7):
+            await repository.create(task(number, category=f'Category {number % 2}'))
+        filters = TaskFilters(category='Category 1',
+                              created_after=datetime(2024, 1, 1, 12, 0, 2),
+                              created_before=datetime(2024, 1, 1, 12, 0, 6))
+
+        # Action
+        page, key = await repository.get_all(10, filters=filters)
+
+        # Assert
+        assert [row['id'] for row in page] == [3, 5]
+        assert key is None
+
+    @pytest.mark.asyncio
+    async def test_filters_no_match(self, repository):
+        await fill(repository, 2)
+
+        page = await repository.get_all(10, filters=TaskFilters(category='Other'))
+        assert page == ([], None)
+
+
+class TestBulk:
+    @pytest.mark.asyncio
+    async def test_create_bulk_duplicates(self, repository):
+        # Arrange
+        await fill(repository, 1)
+
+        # Action
+        results = await repository.create_bulk([task(1), task(2), task(2)], 500)
+
+        # Assert
+        assert [result['status'] for result in results] == [409, 201, 409]
+        assert [result['index'] for result in results] == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_update_bulk_category(self, repository):
+        # Arrange
+        await fill(repository, 3)
+        await repository.create(task(4, category='Category 2'))
+
+        # Action
+        result = await repository.update_bulk({'category': 'Category 3'}, None, 'Category 1', 2)
+
+        # Assert
+        assert result == {'affected': 3, 'missing_ids': []}
+        page, _ = await repository.get_all(10, filters=TaskFilters(category='Category 3'))
+        assert [row['id'] for row in page] == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_delete_bulk_missing_ids(self, repository):
+        await fill(repository, 3)
+
+        result = await repository.delete_bulk([3, 1, 9, 1], None, 2)
+
+        assert result == {'affected': 2, 'missing_ids': [9]}
+        page, _ = await repository.get_all(10)
+        assert [row['id'] for row in page] == [2]
+
+
+class TestReadOther:
+    @pytest.mark.asyncio
+    async def test_search(self, repository):
+        # Arrange
+        await repository.create(task(1, description='buy milk'))
+        await repository.create(task(2, description='buy bread and milk'))
+        await repository.create(task(3, description='walk'))
+
+        # Action
+        page, _ = await repository.search('milk', 10)
+
+        # Assert
+        assert sorted(row['id'] for row in page) == [1, 2]
+        assert all(row['score'] > 0 for row in page)
+
+    def test_iter_all_batches(self, repository):
+        # Arrange
+        repository._create_bulk([task(number) for number in range(1, 6)])
+
+        # Action
+        batches = list(repository.iter_all(2))
+
+        # Assert
+        assert [[row['id'] for row in batch] for batch in batches] == [[1, 2], [3, 4], [5]]
+        assert 'version' not in batches[0][0]
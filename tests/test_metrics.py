@@ -0,0 +1,105 @@
+"""
+Тесты метрик
+"""
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import run
+from app.metrics import HTTP_REQUESTS, QUERY_ERRORS, QUERY_LATENCY, QUERY_ROWS, Registry
+from app.services.repository import timed
+
+
+def test_counter_sums_thread_shards():
+    # Arrange
+    registry = Registry()
+    counter = registry.counter('requests_total', 'Requests', ('route',))
+
+    def work():
+        for _ in range(1000):
+            counter.inc('/tasks/')
+
+    # Action
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc('/tasks/{task_id}', amount=2)
+
+    # Assert
+    assert counter.values() == {('/tasks/',): 4000, ('/tasks/{task_id}',): 2}
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{route="/tasks/"} 4000' in text
+
+
+def test_histogram_render():
+    # Arrange
+    registry = Registry()
+    histogram = registry.histogram('latency_seconds', 'Latency', ('method',), buckets=(0.1, 1.0))
+
+    # Action
+    histogram.observe(0.05, 'get')
+    histogram.observe(0.1, 'get')
+    histogram.observe(5.0, 'get')
+
+    # Assert: корзины накопительные, граница входит в корзину
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{method="get",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{method="get",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{method="get",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{method="get"} 5.15' in lines
+    assert 'latency_seconds_count{method="get"} 3' in lines
+
+
+def test_gauge_and_label_escaping():
+    registry = Registry()
+    registry.gauge('pool_connections', 'Pool', ('state',), lambda: [(('a"b',), 3)])
+    assert 'pool_connections{state="a\\"b"} 3' in registry.render()
+    with pytest.raises(ValueError):
+        registry.counter('pool_connections', 'Duplicate')
+
+
+def test_middleware_uses_route_template():
+    # Arrange
+    client = TestClient(run.app)
+    before = HTTP_REQUESTS.values()
+
+    # Action
+    client.get('/health/live')
+    client.get('/no/such/path')
+
+    # Assert
+    after = HTTP_REQUESTS.values()
+    key = ('GET', '/health/live', '200')
+    assert after[key] == before.get(key, 0) + 1
+    key = ('GET', '<unmatched>', '404')
+    assert after[key] == before.get(key, 0) + 1
+
+
+def test_metrics_endpoint():
+    response = TestClient(run.app).get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert '# TYPE http_request_duration_seconds histogram' in response.text
+    assert '# TYPE db_pool_wait_seconds histogram' in response.text
+
+
+def test_task_service_timing():
+    # Arrange
+    before_rows = QUERY_ROWS.values().get(('get_one',), [0])[-1]
+    before_errors = QUERY_ERRORS.values().get(('delete',), 0)
+
+    # Action
+    result = timed('get_one', lambda: [{'id': 1}, {'id': 2}])
+    with pytest.raises(ValueError):
+        timed('delete', lambda: (_ for _ in ()).throw(ValueError()))
+
+    # Assert
+    assert len(result) == 2
+    assert QUERY_ROWS.values()[('get_one',)][-1] == before_rows + 2
+    assert QUERY_ERRORS.values()[('delete',)] == before_errors + 1
+    assert ('delete',) in QUERY_LATENCY.values()
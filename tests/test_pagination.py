@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.pagination import decode_cursor, decode_page_key, encode_cursor, encode_page_key
+
+
+def test_cursor_roundtrip():
+    key = {'id': 100}
+    token = encode_cursor(key)
+
+    assert '=' not in token
+    assert decode_cursor(token) == key
+
+
+@pytest.mark.parametrize('token', ['not base64!', 'WzFd', ''])
+def test_invalid_cursor(token):
+    # 'WzFd' - корректный base64, но внутри список, а не объект
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(token)
+    assert e.value.status_code == 400
+
+
+def test_page_key_roundtrip():
+    key = {'creation_date': datetime(2024, 1, 2, 3, 4, 5), 'id': 7}
+    token = encode_page_key(key, '-creation_date')
+
+    assert decode_page_key(token, '-creation_date', ('creation_date', 'id')) == key
+
+
+def test_page_key_legacy_cursor():
+    # Курсоры без сортировки выдавались для сортировки по id
+    assert decode_page_key(encode_cursor({'id': 100}), 'id', ('id',)) == {'id': 100}
+
+
+def test_page_key_other_sort():
+    token = encode_page_key({'id': 100}, 'id')
+
+    with pytest.raises(HTTPException) as e:
+        decode_page_key(token, '-id', ('id',))
+    assert e.value.status_code == 400
+
+
+@pytest.mark.parametrize('key', [{'id': 'x'}, {'id': 1}, {'id': 1, 'creation_date': 'bad'},
+                                 {'id': 1, 'creation_date': 20231211}])
+def test_page_key_invalid(key):
+    token = encode_cursor({'sort': 'creation_date', **key})
+
+    with pytest.raises(HTTPException) as e:
+        decode_page_key(token, 'creation_date', ('creation_date', 'id'))
+    assert e.value.status_code == 400
+
+
+def test_page_key_score():
+    token = encode_page_key({'score': 1.25, 'id': 3}, 'search')
+
+    assert decode_page_key(token, 'search', ('score', 'id')) == {'score': 1.25, 'id': 3}
@@ -0,0 +1,195 @@
+"""
+Тесты пула соединений
+"""
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.pool import ConnectionPool, PoolTimeoutError
+
+
+def make_pool(**kwargs):
+    factory = MagicMock(side_effect=lambda: MagicMock())
+    params = dict(factory=factory, min_size=1, max_size=2, timeout=0.05)
+    params.update(kwargs)
+    return ConnectionPool(**params), factory
+
+
+def test_min_size_connections_created():
+    # Arrange & Action
+    pool, factory = make_pool(min_size=2, max_size=3)
+
+    # Assert
+    assert factory.call_count == 2
+    stats = pool.stats()
+    assert stats.size == 2
+    assert stats.idle == 2
+    assert stats.in_use == 0
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        make_pool(min_size=3, max_size=2)
+
+
+def test_concurrent_acquire_gets_different_connections():
+    # Arrange
+    pool, factory = make_pool()
+
+    # Action
+    first = pool.acquire()
+    second = pool.acquire()
+
+    # Assert
+    assert first is not second
+    assert factory.call_count == 2
+    assert pool.stats().in_use == 2
+
+
+def test_acquire_timeout():
+    # Arrange
+    pool, _ = make_pool(max_size=1)
+    pool.acquire()
+
+    # Action & Assert
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert pool.stats().timeouts == 1
+
+
+def test_waiter_gets_released_connection():
+    # Arrange
+    pool, _ = make_pool(max_size=1, timeout=2)
+    conn = pool.acquire()
+    result = []
+
+    # Action
+    thread = threading.Thread(target=lambda: result.append(pool.acquire()))
+    thread.start()
+    pool.release(conn)
+    thread.join()
+
+    # Assert
+    assert result == [conn]
+    assert pool.stats().wait_time_total > 0
+
+
+def test_health_check_replaces_broken_connection():
+    # Arrange
+    pool, factory = make_pool(validate=lambda conn: False)
+    broken = pool._idle[-1][0]
+
+    # Action
+    conn = pool.acquire()
+
+    # Assert
+    assert conn is not broken
+    broken.close.assert_called_once()
+    assert factory.call_count == 2
+    assert pool.stats().size == 1
+
+
+def test_health_check_disabled():
+    # Arrange
+    validate = MagicMock(return_value=False)
+    pool, _ = make_pool(validate=validate, health_check=False)
+
+    # Action
+    pool.acquire()
+
+    # Assert
+    validate.assert_not_called()
+
+
+def test_reap_idle_keeps_min_size():
+    # Arrange
+    pool, _ = make_pool(min_size=1, max_size=3, idle_timeout=0)
+    connections = [pool.acquire() for _ in range(3)]
+
+    # Action (простаивающие соединения закрываются при возврате в пул)
+    for conn in connections:
+        pool.release(conn)
+
+    # Assert
+    assert sum(conn.close.call_count for conn in connections) == 2
+    assert pool.stats().size == 1
+    assert pool.stats().idle == 1
+
+
+def test_factory_error_frees_slot():
+    # Arrange
+    pool, factory = make_pool(min_size=0, max_size=1)
+    factory.side_effect = Exception('Connection error')
+
+    # Action & Assert
+    with pytest.raises(Exception):
+        pool.acquire()
+    assert pool.stats().size == 0
+
+
+def test_warm_up():
+    # Arrange
+    pool, factory = make_pool(min_size=1, max_size=3)
+
+    # Action
+    created = pool.warm_up(5)
+
+    # Assert: не больше max_size, повторный прогрев ничего не открывает
+    assert created == 2
+    assert factory.call_count == 3
+    assert pool.stats().idle == 3
+    assert pool.warm_up(5) == 0
+
+
+def test_warm_up_error_keeps_opened():
+    # Arrange
+    pool, factory = make_pool(min_size=0, max_size=3)
+    factory.side_effect = [MagicMock(), Exception('Connection error')]
+
+    # Action & Assert
+    with pytest.raises(Exception):
+        pool.warm_up(3)
+    stats = pool.stats()
+    assert stats.size == 1
+    assert stats.idle == 1
+
+
+def test_close():
+    # Arrange
+    pool, _ = make_pool()
+    conn = pool.acquire()
+    idle = pool.acquire()
+    pool.release(idle)
+
+    # Action
+    pool.close()
+    pool.release(conn)
+
+    # Assert
+    idle.close.assert_called_once()
+    conn.close.assert_called_once()
+    assert pool.stats().size == 0
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_check_idle():
+    # Arrange
+    validate = MagicMock(return_value=True)
+    pool, factory = make_pool(min_size=3, max_size=3, validate=validate, health_check=False)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    validate.side_effect = lambda conn: conn is not conns[1]
+
+    # Action
+    checked, closed = pool.check_idle()
+
+    # Assert: неисправное соединение закрыто, порядок остальных сохранен
+    assert (checked, closed) == (3, 1)
+    conns[1].close.assert_called_once()
+    assert pool.stats().idle == 2
+    assert pool.acquire() is conns[2]
+    assert pool.acquire() is conns[0]
@@ -0,0 +1,136 @@
+"""
+Тесты профилирования запросов и журнала медленных запросов
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import ProfilingConfig, config
+from app.profiling import (ProfiledRoute, ProfilingMiddleware, Profile, execute, phase, record,
+                           sampling)
+from app.responses import FastJSONResponse
+
+
+def make_client(**kwargs):
+    router = APIRouter(route_class=ProfiledRoute)
+
+    @router.get('/items/{item_id}')
+    async def get_item(item_id: int):
+        record('service', 0.002)
+        with phase('sql'):
+            pass
+        return FastJSONResponse(content={'id': item_id})
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, profiling_config=ProfilingConfig(**kwargs))
+    return TestClient(app)
+
+
+def server_timing(response):
+    header = response.headers.get('server-timing')
+    if header is None:
+        return None
+    return {part.split(';')[0].strip(): float(part.split('dur=')[1])
+            for part in header.split(',')}
+
+
+def test_not_profiled_by_default():
+    response = make_client(admin_token='secret').get('/items/1')
+    assert response.status_code == 200
+    assert server_timing(response) is None
+
+
+def test_header_requires_token():
+    client = make_client(admin_token='secret')
+    assert server_timing(client.get('/items/1', headers={'X-Profile': 'wrong'})) is None
+    # Без токена в настройках заголовок не действует
+    client = make_client(admin_token='')
+    assert server_timing(client.get('/items/1', headers={'X-Profile': ''})) is None
+
+
+def test_phases_in_server_timing(caplog):
+    # Arrange
+    client = make_client(admin_token='secret')
+
+    # Action
+    with caplog.at_level('INFO', logger='profile'):
+        response = client.get('/items/1', headers={'X-Profile': 'secret'})
+
+    # Assert
+    phases = server_timing(response)
+    assert {'total', 'validation', 'handler', 'service', 'sql', 'encode'} <= set(phases)
+    assert phases['service'] == 2.0
+    assert phases['total'] >= phases['handler'] >= phases['encode']
+    entry = caplog.records[-1].fields
+    assert entry['event'] == 'profile'
+    assert entry['route'] == '/items/{item_id}'
+    assert entry['phases_ms'] == phases
+
+
+def test_enabled_for_all_requests():
+    assert server_timing(make_client(enabled=True).get('/items/1')) is not None
+
+
+def test_sampled_profile_saved(tmp_path):
+    client = make_client(enabled=True, sample_rate=1.0, output_dir=str(tmp_path))
+    client.get('/items/1')
+    assert len(list(tmp_path.glob('*-GET-items_1.prof'))) == 1
+
+
+def test_sampling_one_at_a_time(tmp_path):
+    profiling_config = ProfilingConfig(output_dir=str(tmp_path))
+
+    with sampling(profiling_config, Profile('GET', '/a')) as first:
+        # Второй запрос не профилируется, пока работает первый профилировщик
+        with sampling(profiling_config, Profile('GET', '/b')) as second:
+            pass
+
+    assert (first, second) == (True, False)
+    with sampling(profiling_config, Profile('GET', '/c')) as third:
+        assert third is True
+
+
+def test_execute_passes_params():
+    cursor = MagicMock()
+    execute(cursor, 'SELECT 1')
+    cursor.execute.assert_called_with('SELECT 1')
+    execute(cursor, 'SELECT %s', (1,))
+    cursor.execute.assert_called_with('SELECT %s', (1,))
+
+
+def test_slow_query_log(monkeypatch, caplog):
+    # Arrange
+    monkeypatch.setattr(config.profiling, 'slow_query_ms', 1e-9)
+    cursor = MagicMock(rowcount=3)
+
+    # Action
+    with caplog.at_level('WARNING', logger='slow_query'):
+        execute(cursor, 'SELECT *\n  FROM tasks WHERE id = %s', (7,))
+
+    # Assert
+    entry = caplog.records[-1].fields
+    assert entry['event'] == 'slow_query'
+    assert entry['statement'] == 'SELECT * FROM tasks WHERE id = %s'
+    assert entry['params'] == 1
+    assert entry['rowcount'] == 3
+    assert entry['duration_ms'] >= 0
+
+
+def test_slow_query_log_disabled(monkeypatch, caplog):
+    monkeypatch.setattr(config.profiling, 'slow_query_ms', 0)
+    with caplog.at_level('WARNING', logger='slow_query'):
+        execute(MagicMock(), 'SELECT 1')
+    assert not caplog.records
+
+
+def test_execute_error_still_timed(monkeypatch, caplog):
+    monkeypatch.setattr(config.profiling, 'slow_query_ms', 1e-9)
+    cursor = MagicMock()
+    cursor.execute.side_effect = RuntimeError('lost')
+    with caplog.at_level('WARNING', logger='slow_query'), pytest.raises(RuntimeError):
+        execute(cursor, 'SELECT 1')
+    assert caplog.records
@@ -0,0 +1,228 @@
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import DatabaseConfig, config
+from app.database import DB
+from app.pool import PoolStats
+from app.replicas import (COOKIE, LEAST_LOADED, ReadYourWritesMiddleware, ReplicaSet, _primary,
+                          create_replicas)
+from app.schemes.task import TaskValidation
+from app.services import sqlite
+from app.services.cache import LRUCache
+from app.services.executor import QueryExecutor
+from app.services.mysql import MySQLRepository, TaskService
+from app.services.search import MemorySearch
+
+
+def standin(path, host):
+    """DB, соединения которого - файл SQLite вместо сервера MySQL"""
+    sqlite.create_schema(str(path))
+    db = DB(host)
+    db.connect = lambda: sqlite.Connection(str(path))
+    db.ready = True
+    return db
+
+
+def stats(in_use, waiting=0):
+    return PoolStats(size=in_use, in_use=in_use, idle=0, waiting=waiting, max_size=10,
+                     acquired=0, timeouts=0, wait_time_total=0.0, wait_time_max=0.0)
+
+
+@pytest.fixture
+def servers(tmp_path, monkeypatch):
+    # Подготовленные выражения - протокол MySQL
+    monkeypatch.setattr(config.db, 'prepared_statements', False)
+    primary = standin(tmp_path / 'primary.db', 'primary:3306')
+    replica = standin(tmp_path / 'replica.db', 'replica:3306')
+    yield primary, replica
+    primary.close()
+    replica.close()
+
+
+@pytest.fixture
+def repository(servers):
+    primary, replica = servers
+    return MySQLRepository(db=primary,
+                           service=TaskService(executor=QueryExecutor(mode='inline')),
+                           replicas=ReplicaSet(primary, [replica]))
+
+
+def task(description):
+    return TaskValidation(taskname='Task 1', description=description, category='Category 1')
+
+
+async def replicate(replica, data):
+    """Изменение, дошедшее до реплики"""
+    await MySQLRepository(db=replica, service=TaskService(executor=QueryExecutor(mode='inline')),
+                          replicas=None).create(data)
+
+
+class TestRouting:
+    @pytest.mark.asyncio
+    async def test_writes_primary_reads_replica(self, repository):
+        # Arrange: реплика еще не получила изменение
+        await repository.create(TaskValidation(taskname='Task 1', description='Description',
+                                               category='Category 1'))
+
+        # Action
+        with pytest.raises(HTTPException) as e:
+            await repository.get_one(1)
+
+        # Assert
+        assert e.value.status_code == 404
+        token = _primary.set(True)
+        try:
+            # Чтение своих изменений - с основного сервера
+            assert (await repository.get_one(1))['taskname'] == 'Task 1'
+        finally:
+            _primary.reset(token)
+
+    @pytest.mark.asyncio
+    async def test_failover_to_primary(self, repository, servers):
+        # Arrange
+        primary, replica = servers
+        await repository.create(TaskValidation(taskname='Task 1', description='Description',
+                                               category='Category 1'))
+        replica.connect = MagicMock(side_effect=HTTPException(500, 'connection refused'))
+
+        # Action
+        row = await repository.get_one(1)
+
+        # Assert
+        assert row['taskname'] == 'Task 1'
+        assert replica.reachable is False
+        assert repository.replicas.pick() == (primary, 'no_healthy_replica')
+
+    @pytest.mark.asyncio
+    async def test_replica_read_not_cached(self, servers):
+        # Arrange: реплика отстает - у нее еще старое описание
+        primary, replica = servers
+        repository = MySQLRepository(
+            db=primary, service=TaskService(executor=QueryExecutor(mode='inline'),
+                                            cache=LRUCache()),
+            replicas=ReplicaSet(primary, [replica]))
+        await repository.create(task('old'))
+        await replicate(replica, task('old'))
+        await repository.update(task('new'), 1)
+
+        # Action
+        replica_row = await repository.get_one(1)
+        token = _primary.set(True)
+        try:
+            primary_row = await repository.get_one(1)
+        finally:
+            _primary.reset(token)
+
+        # Assert
+        assert replica_row['description'] == 'old'
+        assert primary_row['description'] == 'new'
+
+    @pytest.mark.asyncio
+    async def test_search_index_loaded_from_primary(self, servers):
+        # Arrange
+        primary, replica = servers
+        repository = MySQLRepository(
+            db=primary, service=TaskService(executor=QueryExecutor(mode='inline'),
+                                            search=MemorySearch()),
+            replicas=ReplicaSet(primary, [replica]))
+        await repository.create(task('Description'))
+
+        # Action: первый поиск загружает индекс, пока реплика отстает
+        assert await repository.search('task', 10) == ([], None)
+        await replicate(replica, task('Description'))
+        rows, _ = await repository.search('task', 10)
+
+        # Assert
+        assert [row['taskname'] for row in rows] == ['Task 1']
+
+    def test_status_reports_replicas(self, repository):
+        assert repository.status().replicas == {'replica:3306': True}
+
+
+class TestReplicaSet:
+    def test_round_robin(self):
+        # Arrange
+        primary, first, second = (MagicMock(ready=True, reachable=None, checked_at=None,
+                                            **{'pool_stats.return_value': None,
+                                               'errors.stats.return_value.total': 0})
+                                  for _ in range(3))
+        replicas = ReplicaSet(primary, [first, second])
+
+        # Action
+        picked = [replicas.pick()[0] for _ in range(4)]
+
+        # Assert
+        assert picked == [first, second, first, second]
+
+    def test_least_loaded(self):
+        # Arrange
+        primary, busy, idle = (MagicMock(ready=True, reachable=None, checked_at=None,
+                                         **{'errors.stats.return_value.total': 0})
+                               for _ in range(3))
+        busy.pool_stats.return_value = stats(8)
+        idle.pool_stats.return_value = stats(2)
+        replicas = ReplicaSet(primary, [busy, idle], LEAST_LOADED)
+
+        # Action
+        picked = {replicas.pick()[0] for _ in range(4)}
+
+        # Assert
+        assert picked == {idle}
+
+    def test_unhealthy_replica_skipped(self):
+        # Arrange
+        primary, replica = MagicMock(), MagicMock(ready=False, reachable=None, checked_at=None)
+        replica.pool_stats.return_value = None
+        replica.errors.stats.return_value.total = 0
+
+        # Action
+        db, reason = ReplicaSet(primary, [replica]).pick()
+
+        # Assert
+        assert (db, reason) == (primary, 'no_healthy_replica')
+
+    def test_create_replicas(self):
+        assert create_replicas(MagicMock(), DatabaseConfig()) is None
+        replicas = create_replicas(MagicMock(), DatabaseConfig(replicas=['db2', 'db3:3307']))
+        assert [replica.host for replica in replicas.replicas] == ['db2', 'db3:3307']
+
+        with pytest.raises(ValueError):
+            create_replicas(MagicMock(), DatabaseConfig(replicas=['db2'],
+                                                        replica_selection='random'))
+
+
+class TestReadYourWritesMiddleware:
+    @staticmethod
+    def call(method, cookie=None):
+        seen = {}
+
+        async def app(scope, receive, send):
+            seen['primary'] = _primary.get()
+            await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        headers = [] if cookie is None else [(b'cookie', f'a=1; {COOKIE}={cookie}'.encode())]
+        middleware = ReadYourWritesMiddleware(app, window=5.0)
+        asyncio.run(middleware({'type': 'http', 'method': method, 'headers': headers},
+                               None, send))
+        return seen['primary'], dict(messages[0]['headers'])
+
+    def test_write_sets_cookie(self):
+        primary, headers = self.call('POST')
+
+        assert primary is False
+        assert headers[b'set-cookie'].startswith(f'{COOKIE}='.encode())
+
+    def test_recent_write_reads_primary(self):
+        assert self.call('GET', time.time())[0] is True
+        assert self.call('GET', time.time() - 10)[0] is False
+        assert self.call('GET', 'broken')[0] is False
+        assert b'set-cookie' not in self.call('GET')[1]
@@ -0,0 +1,103 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.config import CacheConfig, SearchConfig, StorageConfig
+from app.services.executor import QueryExecutor
+from app.services.memory import MemoryRepository
+from app.services.mysql import MySQLRepository, TaskService
+from app.services.storage import create_repository
+
+
+def resource(log, name, cursor):
+    def dependency():
+        log.append(f'{name} acquire')
+        try:
+            yield cursor
+            log.append(f'{name} commit')
+        finally:
+            log.append(f'{name} release')
+    return dependency
+
+
+@pytest.fixture
+def log():
+    return []
+
+
+@pytest.fixture
+def repository(log, cursor):
+    db = MagicMock()
+    db.read_cursor = resource(log, 'read', cursor)
+    db.write_cursor = resource(log, 'write', cursor)
+    db.get_connection = resource(log, 'connection', cursor)
+    return MySQLRepository(db=db, service=TaskService(executor=QueryExecutor(mode='inline')))
+
+
+class TestCreateRepository:
+    def test_memory(self):
+        repository = create_repository(StorageConfig(backend='memory'), CacheConfig(),
+                                       SearchConfig())
+        assert isinstance(repository, MemoryRepository)
+
+    def test_memory_workers_err(self):
+        with pytest.raises(ValueError):
+            create_repository(StorageConfig(backend='memory'), CacheConfig(), SearchConfig(),
+                              workers=2)
+
+    def test_unknown_backend_err(self):
+        with pytest.raises(ValueError):
+            create_repository(StorageConfig(backend='oracle'), CacheConfig(), SearchConfig())
+
+
+class TestMySQLRepository:
+    @pytest.mark.asyncio
+    async def test_write_commits_in_one_call(self, repository, log, cursor, data):
+        # Arrange
+        cursor.rowcount = 1
+
+        # Action
+        await repository.create(data)
+
+        # Assert
+        assert log == ['write acquire', 'write commit', 'write release']
+        # INSERT и увеличение версии таблицы
+        assert cursor.execute.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_error_releases_without_commit(self, repository, log, cursor, data):
+        # Arrange
+        cursor.execute.side_effect = RuntimeError('boom')
+
+        # Action
+        with pytest.raises(RuntimeError):
+            await repository.create(data)
+
+        # Assert
+        assert log == ['write acquire', 'write release']
+
+    @pytest.mark.asyncio
+    async def test_get_one_returns_row(self, repository, log, cursor):
+        # Arrange
+        cursor.description = [('id',), ('taskname',)]
+        cursor.fetchall.return_value = [(1, 'Task 1')]
+
+        # Action
+        row = await repository.get_one(1)
+
+        # Assert
+        assert (row['id'], row['taskname']) == (1, 'Task 1')
+        assert log == ['read acquire', 'read commit', 'read release']
+
+    @pytest.mark.asyncio
+    async def test_bulk_uses_connection(self, repository, log):
+        # Arrange
+        repository.service.delete_bulk = MagicMock(return_value={'affected': 0,
+                                                                  'missing_ids': []})
+
+        # Action
+        await repository.delete_bulk([1], None, 500)
+
+        # Assert
+        assert log[0] == 'connection acquire'
+        repository.service.delete_bulk.assert_called_once()
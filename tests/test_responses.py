@@ -0,0 +1,55 @@
+import json
+from datetime import date, datetime
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import app.responses
+from app.responses import FastJSONResponse, encode
+
+ROW = {'id': 1, 'taskname': 'Задача 1', 'description': None, 'score': 1.5,
+       'creation_date': datetime(2023, 12, 11, 19, 35, 46),
+       'updated_at': datetime(2023, 12, 11, 19, 35, 46, 123456)}
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    # Проверяем обе реализации: с orjson и со стандартным json
+    if request.param == 'json':
+        monkeypatch.setattr(app.responses, 'orjson', None)
+    elif app.responses.orjson is None:
+        pytest.skip('orjson не установлен')
+    return encode
+
+
+def test_same_as_jsonable_encoder(encoder):
+    content = {'data': [ROW, ROW], 'next_cursor': None}
+    expected = JSONResponse(content=jsonable_encoder(content)).body
+
+    assert json.loads(encoder(content)) == json.loads(expected)
+
+
+def test_compact_utf8(encoder):
+    raw = encoder({'data': ROW})
+
+    assert b' ' not in raw.replace('Задача 1'.encode(), b'')
+    assert 'Задача 1'.encode() in raw
+    assert b'"2023-12-11T19:35:46.123456"' in raw
+
+
+def test_date(encoder):
+    assert encoder([date(2024, 1, 2)]) == b'["2024-01-02"]'
+
+
+def test_unsupported_type(encoder):
+    with pytest.raises(TypeError):
+        encoder({'value': object()})
+
+
+def test_response():
+    response = FastJSONResponse(content={'data': ROW}, headers={'ETag': '"1.1"'})
+
+    assert response.media_type == 'application/json'
+    assert response.headers['etag'] == '"1.1"'
+    assert json.loads(response.body)['data']['creation_date'] == '2023-12-11T19:35:46'
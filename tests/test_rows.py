@@ -0,0 +1,69 @@
+import json
+import pickle
+import sys
+from datetime import datetime
+
+import pytest
+
+import app.responses
+from app.responses import encode
+from app.rows import Row, make_row, make_rows, row_type
+
+DESCRIPTION = [('id', 3), ('taskname', 253), ('creation_date', 7)]
+CREATED = datetime(2023, 12, 11, 19, 35, 46)
+
+
+@pytest.fixture
+def row():
+    return make_rows(DESCRIPTION, [(1, 'Task 1', CREATED)])[0]
+
+
+def test_type_cached_per_columns():
+    assert row_type(('id', 'taskname')) is row_type(['id', 'taskname'])
+    assert row_type(('id',)) is not row_type(('id', 'taskname'))
+
+
+def test_mapping_access(row):
+    assert isinstance(row, Row)
+    assert row['id'] == 1
+    assert row.get('taskname') == 'Task 1'
+    assert row.get('missing', 'default') == 'default'
+    assert 'creation_date' in row
+    assert dict(row) == {'id': 1, 'taskname': 'Task 1', 'creation_date': CREATED}
+    assert {**row, 'score': 1.0}['score'] == 1.0
+    with pytest.raises(KeyError):
+        row['__class__']
+
+
+def test_equality(row):
+    assert row == {'id': 1, 'taskname': 'Task 1', 'creation_date': CREATED}
+    assert row != {'id': 2, 'taskname': 'Task 1', 'creation_date': CREATED}
+    assert row == make_row(('id', 'taskname', 'creation_date'), (1, 'Task 1', CREATED))
+
+
+def test_smaller_than_dict(row):
+    assert not hasattr(row, '__dict__')
+    assert sys.getsizeof(row) < sys.getsizeof(dict(row))
+
+
+def test_pickle(row):
+    # Строки кэшируются в Redis через pickle
+    assert pickle.loads(pickle.dumps(row)) == row
+
+
+def test_invalid_column_names_stay_dicts():
+    rows = make_rows([('COUNT(*)',), ('class',)], [(5, 'x')])
+
+    assert rows == [{'COUNT(*)': 5, 'class': 'x'}]
+    assert isinstance(rows[0], dict)
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_encode(row, use_orjson, monkeypatch):
+    if not use_orjson:
+        monkeypatch.setattr(app.responses, 'orjson', None)
+    elif app.responses.orjson is None:
+        pytest.skip('orjson не установлен')
+
+    assert json.loads(encode({'data': [row]})) == {
+        'data': [{'id': 1, 'taskname': 'Task 1', 'creation_date': '2023-12-11T19:35:46'}]}
@@ -0,0 +1,132 @@
+"""
+Тесты запуска сервера
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import run
+from app.config import ServerConfig, _default_workers
+from app.pool import PoolStats
+from app.routers import tasks
+
+
+def test_default_workers(monkeypatch):
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    assert _default_workers() == 3
+    assert ServerConfig().workers == 3
+
+    monkeypatch.delenv('WEB_CONCURRENCY')
+    assert _default_workers(1) == 1
+    assert _default_workers() >= 1
+
+
+def test_gunicorn_options():
+    options = run.gunicorn_options(ServerConfig(host='127.0.0.1', port=8080, workers=4,
+                                                graceful_timeout=10.0))
+    assert options['bind'] == '127.0.0.1:8080'
+    assert options['workers'] == 4
+    assert options['worker_class'] == 'uvicorn.workers.UvicornWorker'
+    assert options['graceful_timeout'] == 10
+    assert options['preload_app'] is False
+
+
+@patch('run.run_gunicorn')
+@patch('run.uvicorn.run')
+def test_serve_single_worker(uvicorn_run, run_gunicorn):
+    run.serve(ServerConfig(workers=1))
+    uvicorn_run.assert_called_once()
+    assert uvicorn_run.call_args.args[0] is run.app
+    run_gunicorn.assert_not_called()
+
+
+@patch('run.run_gunicorn')
+@patch('run.uvicorn.run')
+def test_serve_gunicorn(uvicorn_run, run_gunicorn):
+    server = ServerConfig(workers=2, manager='gunicorn')
+    run.serve(server)
+    run_gunicorn.assert_called_once_with(server)
+    uvicorn_run.assert_not_called()
+
+
+@patch('run.importlib.util.find_spec', return_value=None)
+@patch('run.run_gunicorn')
+@patch('run.uvicorn.run')
+def test_serve_uvicorn_fallback(uvicorn_run, run_gunicorn, _find_spec):
+    # Без gunicorn процессами управляет uvicorn, приложение передается строкой импорта
+    run.serve(ServerConfig(workers=2, manager='auto'))
+    run_gunicorn.assert_not_called()
+    assert uvicorn_run.call_args.args[0] == 'run:app'
+    assert uvicorn_run.call_args.kwargs['workers'] == 2
+
+
+def test_serve_unknown_manager():
+    with pytest.raises(ValueError):
+        run.serve(ServerConfig(workers=2, manager='unknown'))
+
+
+def test_ready(monkeypatch):
+    # Без контекстного менеджера TestClient не выполняет lifespan
+    client = TestClient(run.app)
+
+    monkeypatch.setattr(tasks.repository.db, 'ready', False)
+    monkeypatch.setattr(tasks.repository.db, 'startup_error', 'Connection error')
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert 'Connection error' in response.json()['detail']
+
+    monkeypatch.setattr(tasks.repository.db, 'ready', True)
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.json() == {'detail': 'ready'}
+
+
+@patch('run.tasks.repository')
+def test_lifespan_starts_and_closes_repository(repository):
+    # Arrange
+    repository.start = AsyncMock(return_value=True)
+    repository.monitor = AsyncMock()
+    repository.drain = AsyncMock()
+
+    # Action
+    with TestClient(run.app):
+        pass
+
+    # Assert
+    repository.start.assert_awaited_once()
+    repository.monitor.assert_awaited_once()
+    repository.drain.assert_awaited_once()
+    repository.close.assert_called_once()
+
+
+def test_health_live():
+    response = TestClient(run.app).get('/health/live')
+    assert response.status_code == 200
+    assert response.json()['status'] == 'ok'
+
+
+def test_health_ready(monkeypatch):
+    # Arrange
+    client = TestClient(run.app)
+    stats = PoolStats(size=2, in_use=1, idle=1, waiting=0, max_size=10, acquired=5,
+                      timeouts=0, wait_time_total=0.0, wait_time_max=0.0)
+    monkeypatch.setattr(tasks.repository.db, 'ready', True)
+    monkeypatch.setattr(tasks.repository.db, 'reachable', True)
+    monkeypatch.setattr(tasks.repository.db, 'pool_stats', lambda: stats)
+
+    # Action
+    response = client.get('/health/ready')
+
+    # Assert
+    assert response.status_code == 200
+    body = response.json()
+    assert body['status'] == 'ok'
+    assert body['pool']['saturation'] == 0.1
+
+    # База данных недоступна по фоновой проверке
+    monkeypatch.setattr(tasks.repository.db, 'reachable', False)
+    response = client.get('/health/ready')
+    assert response.status_code == 503
+    assert response.json()['problems'] == ['База данных недоступна']
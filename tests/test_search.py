@@ -0,0 +1,218 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.config import SearchConfig
+from app.services.mysql import TaskService
+from app.services.search import (InvertedIndex, MemorySearch, MySQLSearch, create_search,
+                                 tokenize)
+
+
+def test_tokenize():
+    assert tokenize('Draw a Picture, рисунок_1!') == ['draw', 'a', 'picture', 'рисунок_1']
+    assert tokenize(None) == []
+
+
+class TestInvertedIndex:
+    @pytest.fixture
+    def index(self):
+        index = InvertedIndex()
+        index.add(1, 'buy milk')
+        index.add(2, 'buy bread and milk milk')
+        index.add(3, 'read book')
+        index.add(4, 'buy book')
+        return index
+
+    def test_ranking(self, index):
+        # Action
+        found = index.search('milk', 10)
+
+        # Assert
+        # Во 2-й задаче слово встречается дважды
+        assert [task_id for _, task_id in found] == [2, 1]
+        assert found[0][0] > found[1][0]
+
+    def test_any_word_matches(self, index):
+        assert {task_id for _, task_id in index.search('milk book', 10)} == {1, 2, 3, 4}
+
+    def test_keyset_pages(self, index):
+        # Arrange
+        expected = index.search('buy milk book', 10)
+
+        # Action
+        first = index.search('buy milk book', 2)
+        second = index.search('buy milk book', 2, after=first[-1])
+        third = index.search('buy milk book', 2, after=second[-1])
+
+        # Assert
+        assert first + second + third == expected
+        assert not index.search('buy milk book', 2, after=expected[-1])
+
+    def test_update_and_remove(self, index):
+        # Action
+        index.add(1, 'sell car')
+        index.remove(3)
+
+        # Assert
+        assert [task_id for _, task_id in index.search('milk', 10)] == [2]
+        assert [task_id for _, task_id in index.search('book', 10)] == [4]
+        assert index.search('car', 10)[0][1] == 1
+        assert len(index) == 3
+
+
+class TestMemorySearch:
+    def test_load_and_fetch_rows(self, cursor):
+        # Arrange
+        cursor.fetchall.side_effect = [
+            [(1, 'buy milk', None), (2, 'read book', 'about milk')],
+            [(2, 'read book'), (1, 'buy milk')],
+        ]
+        cursor.configure_mock(description=[('id',), ('taskname',)])
+        search = MemorySearch()
+
+        # Action
+        rows, next_key = search.search(cursor, 'id, taskname', 'milk', 1, None)
+
+        # Assert
+        cursor.execute.assert_any_call('SELECT id, taskname, description FROM tasks')
+        assert len(rows) == 1 and rows[0]['id'] in (1, 2)
+        assert next_key == {'score': rows[0]['score'], 'id': rows[0]['id']}
+
+    def test_deleted_row_keeps_next_page(self, cursor):
+        # Arrange: задачу 1 удалили между поиском по индексу и чтением строк
+        cursor.fetchall.side_effect = [
+            [(1, 'milk', None), (2, 'milk', None), (3, 'milk', None)],
+            [(2, 'milk')],
+        ]
+        cursor.configure_mock(description=[('id',), ('taskname',)])
+        search = MemorySearch()
+
+        # Action
+        rows, next_key = search.search(cursor, 'id, taskname', 'milk', 2, None)
+
+        # Assert
+        assert [row['id'] for row in rows] == [2]
+        assert next_key == {'score': rows[0]['score'], 'id': 2}
+
+    def test_changes_after_load(self, cursor):
+        # Arrange
+        cursor.fetchall.side_effect = [[(1, 'buy milk', None)], [(1, 'buy milk')],
+                                       [(5, 'sell milk')]]
+        cursor.configure_mock(description=[('id',), ('taskname',)])
+        search = MemorySearch()
+        search.search(cursor, 'id, taskname', 'milk', 10, None)
+
+        # Action
+        search.add(5, 'sell milk', None)
+        search.remove(1)
+        rows, _ = search.search(cursor, 'id, taskname', 'milk', 10, None)
+
+        # Assert
+        cursor.execute.assert_called_with('SELECT id, taskname FROM tasks WHERE id IN (%s)', (5,))
+        assert [row['id'] for row in rows] == [5]
+
+    def test_changes_before_load_ignored(self):
+        search = MemorySearch()
+
+        search.add(1, 'buy milk', None)
+
+        assert len(search._index) == 0
+
+    def test_reset_reloads(self, cursor):
+        # Arrange
+        cursor.fetchall.return_value = []
+        search = MemorySearch()
+        search.search(cursor, 'id', 'milk', 10, None)
+
+        # Action
+        search.reset()
+        search.search(cursor, 'id', 'milk', 10, None)
+
+        # Assert
+        loads = [call for call in cursor.execute.call_args_list
+                 if call.args == ('SELECT id, taskname, description FROM tasks',)]
+        assert len(loads) == 2
+
+
+def test_mysql_search_query(cursor):
+    # Arrange
+    cursor.fetchall.return_value = [(3, 2.5), (4, 1.0)]
+    cursor.configure_mock(description=[('id',), ('score',)])
+    match = 'MATCH (taskname, description) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+
+    # Action
+    rows, next_key = MySQLSearch().search(cursor, 'id', 'milk', 1, {'score': 3.0, 'id': 2})
+
+    # Assert
+    cursor.execute.assert_called_once_with(
+        f'SELECT id, {match} AS score FROM tasks WHERE {match} '
+        'HAVING score < %s OR (score = %s AND id > %s) ORDER BY score DESC, id LIMIT %s',
+        ('milk', 'milk', 3.0, 3.0, 2, 2))
+    assert rows == [{'id': 3, 'score': 2.5}]
+    assert next_key == {'score': 2.5, 'id': 3}
+
+
+def test_create_search():
+    assert isinstance(create_search(SearchConfig(backend='mysql')), MySQLSearch)
+    assert isinstance(create_search(SearchConfig(backend='memory')), MemorySearch)
+    with pytest.raises(ValueError):
+        create_search(SearchConfig(backend='unknown'))
+
+
+class TestServiceIndexUpdates:
+    def test_create_update_delete(self, cursor, data):
+        # Arrange
+        search = MagicMock()
+        service = TaskService(search=search)
+        cursor.configure_mock(rowcount=1, lastrowid=7)
+
+        # Action
+        service.create(cursor, data)
+        service.update(cursor, data, 7)
+        service.delete(cursor, 7)
+
+        # Assert
+        # Курсор не из DB.write_cursor: изменения применяются сразу
+        assert search.add.call_count == 2
+        search.add.assert_called_with(7, data.taskname, data.description)
+        search.remove.assert_called_once_with(7)
+
+    def test_bulk_delete_removes(self, connection, cursor):
+        # Arrange
+        search = MagicMock()
+        service = TaskService(search=search)
+        cursor.fetchall.return_value = [(1,)]
+
+        # Action
+        service.delete_bulk(connection, [1], None, chunk_size=10)
+
+        # Assert
+        search.remove.assert_called_once_with(1)
+        search.reset.assert_not_called()
+
+    def test_bulk_update_text_reindexes(self, connection, cursor):
+        # Arrange
+        search = MagicMock()
+        service = TaskService(search=search)
+        cursor.fetchall.side_effect = [[(1,)], [(1, 'Task 1', 'New description')]]
+
+        # Action
+        service.update_bulk(connection, {'description': 'New description'}, [1], None,
+                            chunk_size=10)
+
+        # Assert
+        search.add.assert_called_once_with(1, 'Task 1', 'New description')
+        search.reset.assert_not_called()
+
+    def test_bulk_update_category_keeps_index(self, connection, cursor):
+        # Arrange
+        search = MagicMock()
+        service = TaskService(search=search)
+        cursor.fetchall.return_value = [(1,)]
+
+        # Action
+        service.update_bulk(connection, {'category': 'Category 2'}, [1], None, chunk_size=10)
+
+        # Assert
+        search.add.assert_not_called()
+        search.reset.assert_not_called()
@@ -0,0 +1,222 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import CacheConfig, SearchConfig, StorageConfig
+from app.schemes.task import TaskFilters, TaskValidation
+from app.services.executor import QueryExecutor
+from app.services.mysql import TaskService
+from app.services.storage import create_repository
+from app.services.search import MemorySearch
+from app.services.sqlite import SQLiteRepository
+
+
+def task(number, category='Category 1', description=None):
+    return TaskValidation(taskname=f'Task {number}',
+                          description=description or f'Description {number}',
+                          category=category)
+
+
+def open_repository(path, mode='inline'):
+    repository = SQLiteRepository(str(path), service=TaskService(
+        executor=QueryExecutor(mode=mode), search=MemorySearch()))
+    assert asyncio.run(repository.start())
+    return repository
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = open_repository(tmp_path / 'tasks.db')
+    yield repository
+    repository.close()
+
+
+class TestCrud:
+    @pytest.mark.asyncio
+    async def test_create_and_get_one(self, repository, data):
+        # Action
+        await repository.create(data)
+        row = await repository.get_one(1)
+
+        # Assert
+        assert (row['id'], row['taskname'], row['version']) == (1, 'Task 1', 1)
+        assert (await repository.table_version())[0] == 1
+
+    @pytest.mark.asyncio
+    async def test_create_err409_duplicate(self, repository, data):
+        await repository.create(data)
+
+        with pytest.raises(HTTPException) as e:
+            await repository.create(data)
+        assert e.value.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_get_one_err404(self, repository):
+        with pytest.raises(HTTPException) as e:
+            await repository.get_one(1)
+        assert e.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_update_bumps_version(self, repository):
+        # Arrange
+        await repository.create(task(1))
+
+        # Action
+        await repository.update(task(1, category='Category 2'), 1)
+
+        # Assert
+        row = await repository.get_one(1)
+        assert (row['category'], row['version']) == ('Category 2', 2)
+        assert (await repository.table_version())[0] == 2
+
+    @pytest.mark.asyncio
+    async def test_bulk_bumps_table_version_once(self, repository):
+        # Arrange
+        _, created_at = await repository.table_version()
+
+        # Action
+        await repository.create_bulk([task(number) for number in range(1, 4)], 500)
+        await repository.delete_bulk([1, 2], None, 500)
+
+        # Assert: одна транзакция - одно увеличение версии таблицы
+        version, updated_at = await repository.table_version()
+        assert version == 2
+        assert updated_at > created_at
+
+    @pytest.mark.asyncio
+    async def test_update_unchanged_err400(self, repository):
+        """Как в MySQL: UPDATE без изменений не затрагивает строку"""
+        await repository.create(task(1))
+
+        with pytest.raises(HTTPException) as e:
+            await repository.update(task(1), 1)
+        assert e.value.status_code == 400
+        assert (await repository.get_one(1))['version'] == 1
+
+    @pytest.mark.asyncio
+    async def test_update_err409_duplicate(self, repository):
+        await repository.create(task(1))
+        await repository.create(task(2))
+
+        with pytest.raises(HTTPException) as e:
+            await repository.update(task(2), 1)
+        assert e.value.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_delete_err404(self, repository):
+        await repository.create(task(1))
+        await repository.delete(1)
+
+        with pytest.raises(HTTPException) as e:
+            await repository.delete(1)
+        assert e.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_database_error_500(self, repository, data):
+        # Arrange
+        repository.close()
+
+        # Action
+        with pytest.raises(HTTPException) as e:
+            await repository.create(data)
+
+        # Assert
+        assert e.value.status_code == 500
+        assert repository.status().errors.errors == 1
+
+
+class TestReads:
+    @pytest.mark.asyncio
+    async def test_get_all_filters(self, repository):
+        # Arrange
+        await repository.create_bulk([task(number, category=f'Category {number % 2}')
+                                      for number in range(1, 6)], 2)
+
+        # Action
+        page, key = await repository.get_all(1, filters=TaskFilters(category='Category 1'))
+        second, _ = await repository.get_all(5, key, TaskFilters(category='Category 1'))
+
+        # Assert
+        assert [row['id'] for row in page] == [1]
+        assert [row['id'] for row in second] == [3, 5]
+
+    @pytest.mark.asyncio
+    async def test_bulk_and_search(self, repository):
+        # Arrange
+        results = await repository.create_bulk(
+            [task(1, description='buy milk'), task(2, description='walk'), task(1)], 500)
+
+        # Action
+        found, _ = await repository.search('milk', 10)
+        deleted = await repository.delete_bulk([2, 9], None, 500)
+
+        # Assert
+        assert [result['status'] for result in results] == [201, 201, 409]
+        assert [row['id'] for row in found] == [1]
+        assert deleted == {'affected': 1, 'missing_ids': [9]}
+
+    @pytest.mark.asyncio
+    async def test_bulk_adds_to_loaded_index(self, repository):
+        # Arrange: индекс загружен первым поиском
+        await repository.create(task(1, description='buy milk'))
+        await repository.search('milk', 10)
+        index = repository.service.index
+        loaded = index._index
+
+        # Action
+        await repository.create_bulk([task(2, description='more milk'), task(1)], 500)
+        found, _ = await repository.search('milk', 10)
+
+        # Assert: индекс не загружался заново, новые задачи добавлены
+        assert index._index is loaded
+        assert sorted(row['id'] for row in found) == [1, 2]
+
+    def test_iter_all(self, repository):
+        # Arrange
+        asyncio.run(repository.create_bulk([task(number) for number in range(1, 4)], 500))
+
+        # Action
+        batches = list(repository.iter_all(2))
+
+        # Assert
+        assert [[row['id'] for row in batch] for batch in batches] == [[1, 2], [3]]
+
+    def test_reader_per_thread(self, tmp_path):
+        # Arrange
+        repository = open_repository(tmp_path / 'tasks.db', mode='threadpool')
+        asyncio.run(repository.create(task(1)))
+        threads = set()
+        reader = repository._reader
+
+        def tracked():
+            threads.add(threading.get_ident())
+            return reader()
+        repository._reader = tracked
+
+        async def read():
+            return await asyncio.gather(*(repository.get_one(1) for _ in range(20)))
+
+        # Action
+        rows = asyncio.run(read())
+        readers = len(repository._readers)
+        repository.close()
+
+        # Assert
+        assert all(row['taskname'] == 'Task 1' for row in rows)
+        # У каждого потока свое соединение на чтение
+        assert readers == len(threads)
+
+
+class TestCreateRepository:
+    def test_sqlite(self, tmp_path):
+        repository = create_repository(
+            StorageConfig(backend='sqlite', sqlite_path=str(tmp_path / 'tasks.db')),
+            CacheConfig(), SearchConfig())
+        assert isinstance(repository, SQLiteRepository)
+
+    def test_mysql_search_err(self):
+        with pytest.raises(ValueError):
+            create_repository(StorageConfig(backend='sqlite'), CacheConfig(),
+                              SearchConfig(backend='mysql'))
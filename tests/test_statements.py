@@ -0,0 +1,81 @@
+"""
+Тесты кэша подготовленных выражений
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.statements import PreparedCursor, StatementCache
+
+
+def make_cache(max_size=2):
+    conn = MagicMock()
+    conn.cursor.side_effect = lambda **kwargs: MagicMock()
+    return StatementCache(conn, max_size=max_size), conn
+
+
+def test_cursor_per_statement():
+    # Arrange
+    cache, conn = make_cache()
+
+    # Action
+    first = cache.cursor('SELECT 1')
+    second = cache.cursor('SELECT 2')
+
+    # Assert
+    assert first is not second
+    assert cache.cursor('SELECT 1') is first
+    conn.cursor.assert_called_with(prepared=True)
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 2, 2)
+    assert stats.hit_rate == 1 / 3
+
+
+def test_eviction_closes_cursor():
+    # Arrange
+    cache, _ = make_cache(max_size=1)
+    old = cache.cursor('SELECT 1')
+
+    # Action
+    cache.cursor('SELECT 2')
+
+    # Assert
+    old.close.assert_called_once()
+    assert cache.stats().evictions == 1
+
+
+def test_prepared_cursor():
+    # Arrange
+    cache, _ = make_cache()
+    cursor = PreparedCursor(cache)
+
+    # Action
+    cursor.execute('SELECT * FROM tasks WHERE id = %s', [1])
+
+    # Assert
+    prepared = cache.cursor('SELECT * FROM tasks WHERE id = %s')
+    prepared.execute.assert_called_once_with('SELECT * FROM tasks WHERE id = %s', (1,))
+    assert cursor.rowcount == prepared.rowcount
+    assert cursor.fetchall() == prepared.fetchall.return_value
+
+
+def test_prepared_cursor_fetch_before_execute():
+    cursor = PreparedCursor(make_cache()[0])
+
+    with pytest.raises(RuntimeError):
+        cursor.fetchone()
+    assert cursor.rowcount == -1
+
+
+def test_close():
+    # Arrange
+    cache, _ = make_cache()
+    cursor = cache.cursor('SELECT 1')
+
+    # Action
+    cache.close()
+
+    # Assert
+    cursor.close.assert_called_once()
+    assert cache.stats().size == 0
@@ -4,7 +4,7 @@ import string
 import pytest as pytest
 from pydantic_core._pydantic_core import ValidationError
 
-from app.schemes.task import TaskValidation
+from app.schemes.task import BulkDelete, BulkUpdate, TaskValidation
 
 spec_chars = string.punctuation
 
@@ -28,3 +28,21 @@ def test_dto(desc, value, result):
         TaskValidation(taskname=value)
     except ValidationError:
         assert result == ValidationError
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {'ids': [1], 'category': 'Hobby'},
+    {'ids': []},
+])
+def test_bulk_selection_invalid(body):
+    with pytest.raises(ValidationError):
+        BulkDelete(**body)
+
+
+def test_bulk_update_changes():
+    data = BulkUpdate(ids=[1], changes={'category': 'Study'})
+    assert data.changes.model_dump(exclude_unset=True) == {'category': 'Study'}
+
+    with pytest.raises(ValidationError):
+        BulkUpdate(ids=[1], changes={})